@@ -0,0 +1,133 @@
+"""
+Compare the trio client (SAMPQuery_Client) with the asyncio one (SAMPQuery_AsyncioClient).
+
+Run it with ``python benchmarks/bench_backends.py``. It starts the emulator in
+another process, then drives each backend in turn for ``--duration`` seconds,
+one client per server and ``--concurrency`` queries in flight, and prints the
+queries per second, the p50/p99 latency and the CPU time per query of each.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+import typing as tp
+
+import trio
+
+from load import percentile, start_emulator
+
+from sampquery import SAMPQuery_Client
+from sampquery.aio import SAMPQuery_AsyncioClient
+from sampquery.emulator import raise_open_files_limit
+
+OPCODES = {"i": "info", "r": "rules", "c": "players", "d": "detailed_players"}
+
+
+def report(backend: str, latencies: list[float], failures: int, cpu: float, wall: float) -> None:
+    latencies.sort()
+    done = len(latencies)
+    print(
+        f"{backend:<8}{done / wall:>10.0f}{percentile(latencies, 0.5) * 1e3:>10.2f}"
+        f"{percentile(latencies, 0.99) * 1e3:>10.2f}{cpu / max(done, 1) * 1e6:>10.0f}{failures:>8}"
+    )
+
+
+async def run_trio(args: argparse.Namespace) -> None:
+    clients = [SAMPQuery_Client(args.host, args.port + i) for i in range(args.servers)]
+    await drive(args, clients, trio.current_time, trio.open_nursery, "trio")
+
+
+def run_asyncio(args: argparse.Namespace) -> None:
+    async def main() -> None:
+        clients = [SAMPQuery_AsyncioClient(args.host, args.port + i) for i in range(args.servers)]
+        loop = asyncio.get_running_loop()
+
+        class TaskGroup:  # the nursery-like subset asyncio.TaskGroup offers on 3.11+
+            async def __aenter__(self) -> TaskGroup:
+                self.tasks: list[asyncio.Task[None]] = []
+                return self
+
+            async def __aexit__(self, *exc_info: tp.Any) -> None:
+                await asyncio.gather(*self.tasks)
+
+            def start_soon(self, function: tp.Callable[..., tp.Awaitable[None]], *args: tp.Any) -> None:
+                self.tasks.append(loop.create_task(function(*args)))
+
+        try:
+            await drive(args, clients, loop.time, TaskGroup, "asyncio")
+        finally:
+            for client in clients:
+                client.close()
+
+    asyncio.run(main())
+
+
+async def drive(
+    args: argparse.Namespace,
+    clients: list[tp.Any],
+    clock: tp.Callable[[], float],
+    nursery: tp.Callable[[], tp.Any],
+    backend: str,
+) -> None:
+    """Keep ``--concurrency`` queries in flight on random clients for ``--duration`` seconds."""
+    methods = [OPCODES[opcode] for opcode in args.opcodes]
+    latencies: list[float] = []
+    failures = 0
+    rng = random.Random(args.seed)
+
+    async def worker(deadline: float) -> None:
+        nonlocal failures
+        while clock() < deadline:
+            client, method = rng.choice(clients), rng.choice(methods)
+            start = clock()
+            try:
+                await getattr(client, method)()
+            except Exception:
+                failures += 1
+                continue
+            latencies.append(clock() - start)
+
+    async with nursery() as tasks:  # connect and warm up every client first
+        for client in clients:
+            tasks.start_soon(client.info)
+    cpu, wall = time.process_time(), time.perf_counter()
+    deadline = clock() + args.duration
+    async with nursery() as tasks:
+        for _ in range(args.concurrency):
+            tasks.start_soon(worker, deadline)
+    report(backend, latencies, failures, time.process_time() - cpu, time.perf_counter() - wall)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=17000, help="the port of the first server")
+    parser.add_argument("--servers", type=int, default=200)
+    parser.add_argument("--players", type=int, default=30, help="the roster size of the emulated servers")
+    parser.add_argument("--latency", type=float, default=0.0, help="the latency of the emulated servers, in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="the jitter of the emulated servers, in seconds")
+    parser.add_argument("--loss", type=float, default=0.0, help="the packet loss of the emulated servers")
+    parser.add_argument("--opcodes", default="i", help="the queries to send, among i, r, c and d")
+    parser.add_argument("--concurrency", type=int, default=64, help="the number of queries in flight")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per backend")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if set(args.opcodes) - set(OPCODES):
+        parser.error("the opcodes must be among i, r, c and d")
+
+    raise_open_files_limit()
+    emulator = start_emulator(args)
+    try:
+        print(f"{'backend':<8}{'query/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'cpu us':>10}{'failed':>8}")
+        trio.run(run_trio, args)
+        run_asyncio(args)
+    finally:
+        emulator.terminate()
+        emulator.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Compare the offset-based parsers with the previous copy-the-rest-of-the-packet ones.
+
+Run it with ``python benchmarks/bench_parsing.py``. The previous parsers are kept
+here as they were (they slice the rest of the packet after every field, and run
+the charset detection on every string). For every packet it prints the time per
+parse and the bytes of packet copied by slicing it, for the previous parser
+(``legacy``), the current one (``offset``, whose texts are decoded on first
+access) and the current one decoding every text (``offset+text``). The bytes of
+each string copied once to decode it are not counted.
+"""
+
+import struct
+import timeit
+
+import cchardet as chdet
+
+from sampquery.player import SAMPQuery_PlayerList
+from sampquery.rule import SAMPQuery_RuleList
+
+
+def players_packet(count: int) -> bytes:
+    """Build the reply of a ``c`` query with ``count`` players."""
+    return struct.pack("<H", count) + b"".join(
+        bytes([len(name)]) + name + struct.pack("<i", i)
+        for i, name in ((i, f"Player_{i:04d}_Name".encode()) for i in range(count))
+    )
+
+
+def rules_packet(count: int) -> bytes:
+    """Build the reply of a ``r`` query with ``count`` rules."""
+    return struct.pack("<H", count) + b"".join(
+        bytes([len(name)]) + name + bytes([len(value)]) + value
+        for name, value in ((f"rule{i}".encode(), f"value {i}".encode()) for i in range(count))
+    )
+
+
+def legacy_unpack_string(data: bytes, len_type: str) -> tuple[str, bytes, str]:
+    """The previous ``SAMPQuery_Utils.unpack_string``, which sliced the rest of the data and detected every string."""
+    format = f"<{len_type}"
+    size = struct.calcsize(format)
+    str_len, data = (*struct.unpack_from(format, data), data[size:])
+    string, data = data[:str_len], data[str_len:]
+    # bytes() is a no-op on a bytes object, it only unwraps the SlicedBytes below for cchardet
+    encoding = chdet.detect(bytes(string))["encoding"] or "ascii"
+    return string.decode(encoding), data, encoding
+
+
+def legacy_players(data: bytes) -> list[tuple[str, int]]:
+    """The previous ``c`` parser, which sliced the remaining data after every field."""
+    pcount = struct.unpack_from("<H", data)[0]
+    data = data[2:]
+    players = []
+    for _ in range(pcount):
+        name, data, _ = legacy_unpack_string(data, "B")
+        score = struct.unpack_from("<i", data)[0]
+        data = data[4:]
+        players.append((name, score))
+    return players
+
+
+def legacy_rules(data: bytes) -> list[tuple[str, str, str]]:
+    """The previous ``r`` parser, which sliced the remaining data after every field."""
+    rcount = struct.unpack_from("<H", data)[0]
+    data = data[2:]
+    rules = []
+    for _ in range(rcount):
+        name, data, _ = legacy_unpack_string(data, "B")
+        value, data, encoding = legacy_unpack_string(data, "B")
+        rules.append((name, value, encoding))
+    return rules
+
+
+def players_with_text(data: bytes) -> list[tuple[str, int]]:
+    """The current ``c`` parser, decoding every name like the previous one did."""
+    return [(player.name, player.score) for player in SAMPQuery_PlayerList.from_data(data).players]
+
+
+def rules_with_text(data: bytes) -> list[tuple[str, str, str]]:
+    """The current ``r`` parser, decoding every text like the previous one did."""
+    return [(rule.name, rule.value, rule.encoding) for rule in SAMPQuery_RuleList.from_data(data).rules]
+
+
+class SlicedBytes(bytes):
+    """A packet counting the bytes copied every time it (or a slice of it) is sliced."""
+
+    copied = 0
+
+    def __getitem__(self, key):
+        item = super().__getitem__(key)
+        if isinstance(key, slice):
+            SlicedBytes.copied += len(item)
+            return SlicedBytes(item)
+        return item
+
+
+def sliced_bytes(parse, data: bytes) -> int:
+    """Return the bytes of ``data`` copied by slicing it during ``parse(data)``."""
+    SlicedBytes.copied = 0
+    parse(SlicedBytes(data))
+    return SlicedBytes.copied
+
+
+def main() -> None:
+    cases = [
+        ("c", 100, players_packet(100), legacy_players, SAMPQuery_PlayerList.from_data, players_with_text),
+        ("c", 1000, players_packet(1000), legacy_players, SAMPQuery_PlayerList.from_data, players_with_text),
+        ("r", 20, rules_packet(20), legacy_rules, SAMPQuery_RuleList.from_data, rules_with_text),
+        ("r", 200, rules_packet(200), legacy_rules, SAMPQuery_RuleList.from_data, rules_with_text),
+    ]
+    print(f"{'packet':<14}{'size':>8}{'parser':>13}{'us/parse':>11}{'sliced B':>11}")
+    for opcode, count, data, legacy, current, decoded in cases:
+        for label, parse in (("legacy", legacy), ("offset", current), ("offset+text", decoded)):
+            number = 20
+            elapsed = min(timeit.repeat(lambda: parse(data), number=number, repeat=3))
+            print(
+                f"{opcode} x{count:<11}{len(data):>8}{label:>13}"
+                f"{elapsed / number * 1e6:>11.1f}{sliced_bytes(parse, data):>11}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Measure the packets per second the dispatcher can receive and route.
+
+Run it with ``python benchmarks/bench_receive.py``. Another process floods a
+socket with ``i`` replies (routed to nobody, so only the receive path and the
+routing are measured) while the dispatcher reads it for ``--duration``
+seconds, once with a new ``bytes`` per ``recv`` and a trip to the scheduler per
+datagram (the receive loop before the buffer pool), and once with the
+``recv_into`` buffer pool draining every ready datagram per wakeup.
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import multiprocessing
+import socket
+import struct
+import time
+import typing as tp
+
+import trio
+
+from sampquery.buffers import MAX_DATAGRAM, udp_socket
+from sampquery.dispatcher import SAMPQuery_Dispatcher
+from sampquery.utils import SAMPQuery_Utils
+
+
+def reply(size: int) -> bytes:
+    """An ``i`` reply of about ``size`` bytes."""
+    name = b"x" * max(1, size - 40)
+    body = struct.pack("<?HH", False, 10, 100)
+    for text in (name, b"Freeroam", b"English"):
+        body += struct.pack("<I", len(text)) + text
+    return SAMPQuery_Utils.build_prefix("127.0.0.1", 7777) + b"i" + body
+
+
+def flood(port: int, size: int, stop: tp.Any) -> None:
+    """Send replies to ``port`` as fast as possible until ``stop`` is set."""
+    packet = reply(size)
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.connect(("127.0.0.1", port))
+        while not stop.is_set():
+            for _ in range(1000):
+                try:
+                    sock.send(packet)
+                except OSError:
+                    pass
+
+
+async def legacy_run(dispatcher: SAMPQuery_Dispatcher, task_status: tp.Any = trio.TASK_STATUS_IGNORED) -> None:
+    """The receive loop without the buffer pool."""
+    task_status.started()
+    while True:
+        try:
+            data = await dispatcher.socket.recv(dispatcher.bufsize)
+        except ConnectionError:
+            continue
+        dispatcher.deliver(data)
+
+
+async def measure(args: argparse.Namespace, pooled: bool) -> tuple[float, float]:
+    sock, raw = udp_socket()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 22)
+    await sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    dispatcher = SAMPQuery_Dispatcher(sock, MAX_DATAGRAM, raw=raw)
+    stop = multiprocessing.Event()
+    senders = [
+        multiprocessing.Process(target=flood, args=(port, args.size, stop), daemon=True)
+        for _ in range(args.senders)
+    ]
+    for sender in senders:
+        sender.start()
+    try:
+        async with trio.open_nursery() as nursery:
+            await nursery.start(dispatcher.run if pooled else functools.partial(legacy_run, dispatcher))
+            await trio.sleep(0.5)  # warm up
+            received, cpu = dispatcher.discarded, time.process_time()
+            await trio.sleep(args.duration)
+            received, cpu = dispatcher.discarded - received, time.process_time() - cpu
+            nursery.cancel_scope.cancel()
+    finally:
+        stop.set()
+        for sender in senders:
+            sender.join()
+        sock.close()
+    return received / args.duration, cpu / max(received, 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100, help="the size of the datagrams, in bytes")
+    parser.add_argument("--senders", type=int, default=2, help="the number of flooding processes")
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds per receive loop")
+    args = parser.parse_args()
+
+    print(f"{'receive loop':<16}{'packets/s':>12}{'cpu us':>10}")
+    for name, pooled in (("recv", False), ("pool", True)):
+        rate, cpu = trio.run(measure, args, pooled)
+        print(f"{name:<16}{rate:>12.0f}{cpu * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
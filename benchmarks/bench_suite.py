@@ -0,0 +1,182 @@
+"""
+Measure every reply parser on the synthetic corpus of ``corpus.py``.
+
+Run it with ``python benchmarks/bench_suite.py``. For every payload and parser it
+prints the parses per second, the peak memory allocated by one parse and the
+memory kept by its result. Parsers ending with ``+text`` also decode every text
+of the result, the others leave them to be decoded on first access.
+
+The decoder of each case is reused between parses, like a client reuses the
+decoder of its server, so the charset detection only runs on the first parse.
+
+Save the results with ``--save baseline.json`` and compare a later run with
+``--compare baseline.json``: the parsers slower than the baseline by more than
+``--tolerance`` are reported and the exit code is 1.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import re
+import sys
+import time
+import tracemalloc
+import typing as tp
+
+from corpus import Case, corpus
+
+from sampquery.decoder import SAMPQuery_Decoder
+from sampquery.player import SAMPQuery_PlayerColumns, SAMPQuery_PlayerList
+from sampquery.rule import SAMPQuery_RuleList
+from sampquery.server import SAMPQuery_Server
+from sampquery.utils import SAMPQuery_Utils
+
+Parser = tp.Callable[[bytes, SAMPQuery_Decoder], tp.Any]
+
+
+def decoded_players(players: tp.Any) -> tp.Any:
+    for player in players:
+        player.name
+    return players
+
+
+PARSERS: dict[str, dict[str, Parser]] = {
+    "i": {
+        "Server": SAMPQuery_Server.from_data,
+        "Server+text": lambda data, decoder: [
+            (s.name, s.gamemode, s.language) for s in [SAMPQuery_Server.from_data(data, decoder)]
+        ],
+    },
+    "r": {
+        "RuleList": SAMPQuery_RuleList.from_data,
+        "RuleList+text": lambda data, decoder: [
+            rule.value for rule in SAMPQuery_RuleList.from_data(data, decoder).rules
+        ],
+    },
+    "c": {
+        "PlayerList": SAMPQuery_PlayerList.from_data,
+        "PlayerList+text": lambda data, decoder: decoded_players(
+            SAMPQuery_PlayerList.from_data(data, decoder)
+        ),
+        "PlayerColumns": SAMPQuery_PlayerColumns.from_data,
+        "PlayerColumns+text": lambda data, decoder: decoded_players(
+            SAMPQuery_PlayerColumns.from_data(data, decoder)
+        ),
+    },
+    "d": {
+        "PlayerList": SAMPQuery_PlayerList.from_detailed_data,
+        "PlayerList+text": lambda data, decoder: decoded_players(
+            SAMPQuery_PlayerList.from_detailed_data(data, decoder)
+        ),
+        "PlayerColumns": SAMPQuery_PlayerColumns.from_detailed_data,
+        "PlayerColumns+text": lambda data, decoder: decoded_players(
+            SAMPQuery_PlayerColumns.from_detailed_data(data, decoder)
+        ),
+    },
+    "x": {
+        "unpack_string": lambda data, decoder: SAMPQuery_Utils.unpack_string(data, "H", decoder),
+    },
+}
+"""The parsers of each opcode"""
+
+
+def ops_per_second(parse: tp.Callable[[], tp.Any], duration: float) -> float:
+    """Return the best rate of ``parse`` over 3 runs of about ``duration`` seconds."""
+    number = 1
+    while True:  # find a number of calls lasting a tenth of the duration
+        start = time.perf_counter()
+        for _ in range(number):
+            parse()
+        elapsed = time.perf_counter() - start
+        if elapsed >= duration / 10:
+            break
+        number *= 2
+    best = elapsed / number
+    for _ in range(3):
+        calls = max(1, int(number * duration / 3 / elapsed))
+        start = time.perf_counter()
+        for _ in range(calls):
+            parse()
+        best = min(best, (time.perf_counter() - start) / calls)
+    return 1 / best
+
+
+def allocations(parse: tp.Callable[[], tp.Any]) -> tuple[int, int]:
+    """Return the peak memory allocated by one call of ``parse`` and the memory kept by its result."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        result = parse()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak - before, current - before
+
+
+def run(cases: list[Case], pattern: str, duration: float) -> dict[str, dict[str, float]]:
+    results = {}
+    print(f"{'case':<26}{'parser':<20}{'bytes':>8}{'ops/s':>12}{'peak B':>10}{'kept B':>10}")
+    for case in cases:
+        for label, parser in PARSERS[case.opcode].items():
+            name = f"{case.name}/{label}"
+            if not re.search(pattern, name):
+                continue
+            decoder = SAMPQuery_Decoder()
+            parse = lambda: parser(case.data, decoder)  # noqa: E731
+            parse()  # detect the charset once
+            rate = ops_per_second(parse, duration)
+            peak, kept = allocations(parse)
+            results[name] = {"ops": rate, "peak": peak, "kept": kept}
+            print(f"{case.name:<26}{label:<20}{len(case.data):>8}{rate:>12.0f}{peak:>10}{kept:>10}")
+    return results
+
+
+def compare(results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]], tolerance: float) -> int:
+    """Print the changes against the baseline and return the number of regressions."""
+    regressions = 0
+    print(f"\n{'parser':<46}{'ops/s':>9}{'peak B':>9}{'kept B':>9}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        ops = result["ops"] / base["ops"] - 1
+        slower = ops < -tolerance
+        regressions += slower
+        print(
+            f"{name:<46}{ops:>+9.1%}{result['peak'] - base['peak']:>+9.0f}"
+            f"{result['kept'] - base['kept']:>+9.0f}{'  REGRESSION' if slower else ''}"
+        )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", "--filter", default="", help="only run the cases matching this regex, e.g 'c/.*/1000'")
+    parser.add_argument("--duration", type=float, default=0.3, help="seconds spent measuring each parser")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the corpus")
+    parser.add_argument("--save", metavar="FILE", help="save the results as a baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare the results with a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="slowdown reported as a regression (0.1 = 10%%)")
+    args = parser.parse_args()
+
+    results = run(corpus(args.seed), args.filter, args.duration)
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump({"python": sys.version, "seed": args.seed, "results": results}, file, indent=1)
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if baseline["seed"] != args.seed:
+            print("The baseline was saved with another corpus seed", file=sys.stderr)
+            return 2
+        return 1 if compare(results, baseline["results"], args.tolerance) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Synthetic reply payloads (without their header) for the ``i``, ``r``, ``c``, ``d`` and ``x`` queries.
+
+Every payload is built from a seeded random generator, so the same corpus is
+generated on every run and the benchmark results can be compared.
+"""
+
+from __future__ import annotations
+
+import random
+import struct
+
+from dataclasses import dataclass
+
+ALPHABETS = {
+    "ascii": "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_[].",
+    "cp1251": "абвгдежзийклмнопрстуфхцчшщъыьэюяАБВГДЕЖЗИЙКЛМНОПРСТУФХЦЧШЩЭЮЯ",
+    "cp1252": "àáâãäåçèéêëìíîïñòóôõöùúûüýÿÀÁÂÄÇÈÉÊËÑÓÖÚÜß",
+    "utf-8": "äöüßжяđšłśżğışαβγ漢字한국",
+}
+"""The non ASCII characters of the texts of each encoding (ASCII only for ascii)"""
+
+ENCODINGS = tuple(ALPHABETS)
+PLAYER_COUNTS = (0, 10, 100, 1000)
+NAME_LENGTHS = {"short": (3, 8), "long": (16, 24)}
+"""The range of the length of the player names, in characters"""
+
+
+@dataclass
+class Case:
+    """
+    A payload to parse
+
+    :param str opcode: The query the payload answers
+    :param str encoding: The encoding of its texts
+    :param int count: The number of players (or rules, or RCON characters)
+    :param str names: The length of the player names
+    :param bytes data: The payload
+    """
+
+    opcode: str
+    encoding: str
+    count: int
+    names: str
+    data: bytes
+
+    @property
+    def name(self) -> str:
+        return f"{self.opcode}/{self.encoding}/{self.count}/{self.names}"
+
+
+def text(rng: random.Random, encoding: str, length: int) -> bytes:
+    """Build an encoded text of ``length`` characters, about a third of them non ASCII."""
+    ascii, extra = ALPHABETS["ascii"], ALPHABETS[encoding]
+    chars = [
+        rng.choice(extra) if rng.random() < 0.35 else rng.choice(ascii) for _ in range(length)
+    ]
+    return "".join(chars).encode(encoding)
+
+
+def string(data: bytes, len_type: str) -> bytes:
+    return struct.pack(f"<{len_type}", len(data)) + data
+
+
+def info(rng: random.Random, encoding: str, players: int) -> bytes:
+    return (
+        struct.pack("<?HH", False, players, 1000)
+        + string(text(rng, encoding, 48), "I")
+        + string(text(rng, encoding, 24), "I")
+        + string(text(rng, encoding, 12), "I")
+    )
+
+
+def rules(rng: random.Random, encoding: str, count: int) -> bytes:
+    return struct.pack("<H", count) + b"".join(
+        string(f"rule_{i}".encode(), "B") + string(text(rng, encoding, rng.randint(2, 40)), "B")
+        for i in range(count)
+    )
+
+
+def players(rng: random.Random, encoding: str, count: int, names: tuple[int, int]) -> bytes:
+    return struct.pack("<H", count) + b"".join(
+        string(text(rng, encoding, rng.randint(*names)), "B") + struct.pack("<i", rng.randint(-100, 10**5))
+        for _ in range(count)
+    )
+
+
+def detailed_players(
+    rng: random.Random, encoding: str, count: int, names: tuple[int, int]
+) -> bytes:
+    return struct.pack("<H", count) + b"".join(
+        bytes([i % 256])
+        + string(text(rng, encoding, rng.randint(*names)), "B")
+        + struct.pack("<ii", rng.randint(-100, 10**5), rng.randint(0, 500))
+        for i in range(count)
+    )
+
+
+def rcon(rng: random.Random, encoding: str, length: int) -> bytes:
+    return string(text(rng, encoding, length), "H")
+
+
+def corpus(seed: int = 0) -> list[Case]:
+    """Build every case of the corpus."""
+    rng = random.Random(seed)
+    cases = []
+    for encoding in ENCODINGS:
+        cases.append(Case("i", encoding, 0, "-", info(rng, encoding, 0)))
+        for count in (20, 200):
+            cases.append(Case("r", encoding, count, "-", rules(rng, encoding, count)))
+        cases.append(Case("x", encoding, 120, "-", rcon(rng, encoding, 120)))
+        for count in PLAYER_COUNTS:
+            for label, lengths in NAME_LENGTHS.items():
+                if not count and label != "short":
+                    continue
+                cases.append(Case("c", encoding, count, label, players(rng, encoding, count, lengths)))
+                cases.append(
+                    Case("d", encoding, count, label, detailed_players(rng, encoding, count, lengths))
+                )
+    return cases
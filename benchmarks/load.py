@@ -0,0 +1,132 @@
+"""
+Drive SAMPQuery_Client against a fleet of emulated servers and report its throughput.
+
+Run it with ``python benchmarks/load.py --servers 1000 --duration 10``. It starts
+``python -m sampquery.emulator`` in another process (so the emulator does not
+count in the CPU time of the clients), opens one client per server and keeps
+``--concurrency`` queries in flight on random servers. It prints the queries per
+second, the p50/p99 latency, the CPU time per query and the retransmissions.
+
+Pass ``--external`` to drive an emulator (or a fleet of real servers on
+consecutive ports, carefully) started separately.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import subprocess
+import sys
+import time
+
+import trio
+
+from sampquery import SAMPQuery_Client
+from sampquery.emulator import raise_open_files_limit
+
+QUERIES = {
+    "i": SAMPQuery_Client.info,
+    "r": SAMPQuery_Client.rules,
+    "c": SAMPQuery_Client.players,
+    "d": SAMPQuery_Client.detailed_players,
+}
+
+
+def percentile(values: list[float], ratio: float) -> float:
+    """Return the value below which ``ratio`` of the sorted ``values`` are."""
+    if not values:
+        return float("nan")
+    return values[min(len(values) - 1, int(ratio * len(values)))]
+
+
+async def load(args: argparse.Namespace) -> None:
+    clients = [SAMPQuery_Client(args.host, args.port + i) for i in range(args.servers)]
+    queries = [QUERIES[opcode] for opcode in args.opcodes]
+    latencies: list[float] = []
+    failures = 0
+    rng = random.Random(args.seed)
+
+    async def worker(deadline: float) -> None:
+        nonlocal failures
+        while trio.current_time() < deadline:
+            client, query = rng.choice(clients), rng.choice(queries)
+            start = trio.current_time()
+            try:
+                await query(client)
+            except Exception:
+                failures += 1
+                continue
+            latencies.append(trio.current_time() - start)
+
+    async with trio.open_nursery() as nursery:  # connect and warm up every client first
+        for client in clients:
+            nursery.start_soon(client.info)
+
+    cpu, wall = time.process_time(), time.perf_counter()
+    deadline = trio.current_time() + args.duration
+    async with trio.open_nursery() as nursery:
+        for _ in range(args.concurrency):
+            nursery.start_soon(worker, deadline)
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+
+    latencies.sort()
+    done = len(latencies)
+    stats = [stats for client in clients for stats in client.retries.values()]
+    packets = sum(s.packets for s in stats)
+    print(f"servers      {args.servers} ({args.opcodes}, concurrency {args.concurrency})")
+    print(f"queries      {done} in {wall:.1f}s, {failures} failed")
+    print(f"throughput   {done / wall:.0f} queries/s")
+    print(f"latency      p50 {percentile(latencies, 0.5) * 1e3:.2f} ms, p99 {percentile(latencies, 0.99) * 1e3:.2f} ms")
+    print(f"cpu          {cpu / max(done, 1) * 1e6:.0f} us/query ({cpu / wall:.0%} of a core)")
+    print(f"retransmits  {packets - sum(s.queries for s in stats)} of {packets} packets")
+
+
+def start_emulator(args: argparse.Namespace) -> subprocess.Popen[str]:
+    """Start ``python -m sampquery.emulator`` with the options of the command line, and wait for it."""
+    emulator = subprocess.Popen(
+        [
+            sys.executable, "-m", "sampquery.emulator",
+            "--host", args.host, "--port", str(args.port), "--servers", str(args.servers),
+            "--players", str(args.players), "--latency", str(args.latency),
+            "--jitter", str(args.jitter), "--loss", str(args.loss), "--seed", str(args.seed),
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    assert emulator.stdout
+    if not emulator.stdout.readline().startswith("ready"):
+        emulator.kill()
+        sys.exit("The emulator did not start")
+    return emulator
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=17000, help="the port of the first server")
+    parser.add_argument("--servers", type=int, default=1000)
+    parser.add_argument("--players", type=int, default=30, help="the roster size of the emulated servers")
+    parser.add_argument("--latency", type=float, default=0.005, help="the latency of the emulated servers, in seconds")
+    parser.add_argument("--jitter", type=float, default=0.002, help="the jitter of the emulated servers, in seconds")
+    parser.add_argument("--loss", type=float, default=0.0, help="the packet loss of the emulated servers")
+    parser.add_argument("--opcodes", default="ircd", help="the queries to send, among i, r, c and d")
+    parser.add_argument("--concurrency", type=int, default=256, help="the number of queries in flight")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--external", action="store_true", help="do not start the emulator")
+    args = parser.parse_args()
+    if set(args.opcodes) - set(QUERIES):
+        parser.error("the opcodes must be among i, r, c and d")
+
+    raise_open_files_limit()
+    emulator = None if args.external else start_emulator(args)
+    try:
+        trio.run(load, args)
+    finally:
+        if emulator is not None:
+            emulator.terminate()
+            emulator.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""In this example, we will query several servers at once and print them as they answer."""
+
+import trio
+import sampquery as sampq
+
+SERVERS = [
+    ("144.217.174.214", 6969),
+    ("144.217.174.214", 8888),
+    ("54.37.142.75", 7777),
+]
+
+async def main() -> None:
+    scanner = sampq.SAMPQuery_Scanner(opcodes=b"ir", concurrency=64, timeout=3.0)
+    async with scanner.scan(SERVERS) as results:
+        async for result in results:
+            if result.info is None:
+                print(f"{result.ip}:{result.port} did not answer: {result.errors}")
+                continue
+            print(f"{result.ip}:{result.port} | {result.info.name} ({result.info.players}/{result.info.max_players})")
+
+if __name__ == '__main__':
+    trio.run(main)
@@ -1,10 +1,52 @@
 """SAMP Query ― better GTA SA:MP query client."""
 
+from .aio import SAMPQuery_AsyncioClient
+from .cache import SAMPQuery_Cache
 from .client import SAMPQuery_Client
+from .gateway import SAMPQuery_Gateway
+from .metrics import SAMPQuery_Instrumentation, SAMPQuery_Metrics
+from .probe import SAMPQuery_PingStats, SAMPQuery_PingWindow, SAMPQuery_Prober
+from .ratelimit import SAMPQuery_RateLimiter, SAMPQuery_RateLimitStats
+from .retry import SAMPQuery_RetryPolicy, SAMPQuery_RetryStats
+from .rcon import SAMPQuery_RconSession
+from .registry import SAMPQuery_Registry
+from .resolver import SAMPQuery_Resolver
+from .rtt import SAMPQuery_RTTEstimator
+from .scanner import SAMPQuery_Scanner, SAMPQuery_ScanResult
+from .store import SAMPQuery_Snapshot, SAMPQuery_StoreReader, SAMPQuery_StoreWriter
+from .sync import SAMPQuery_LoopThread, SAMPQuery_SyncClient
+from .watch import SAMPQuery_Event, SAMPQuery_Watcher
 
 __name__ = "sampquery"
 __version__ = "0.0.8"
 __author__ = "larayavrs"
 __email__ = "larayavrs@gmail.com"
 
-__all__ = ["SAMPQuery_Client"]
+__all__ = [
+    "SAMPQuery_AsyncioClient",
+    "SAMPQuery_Cache",
+    "SAMPQuery_Client",
+    "SAMPQuery_Event",
+    "SAMPQuery_Gateway",
+    "SAMPQuery_Instrumentation",
+    "SAMPQuery_LoopThread",
+    "SAMPQuery_Metrics",
+    "SAMPQuery_PingStats",
+    "SAMPQuery_PingWindow",
+    "SAMPQuery_Prober",
+    "SAMPQuery_RateLimiter",
+    "SAMPQuery_RateLimitStats",
+    "SAMPQuery_RconSession",
+    "SAMPQuery_Registry",
+    "SAMPQuery_Resolver",
+    "SAMPQuery_RetryPolicy",
+    "SAMPQuery_RetryStats",
+    "SAMPQuery_RTTEstimator",
+    "SAMPQuery_Scanner",
+    "SAMPQuery_ScanResult",
+    "SAMPQuery_Snapshot",
+    "SAMPQuery_StoreReader",
+    "SAMPQuery_StoreWriter",
+    "SAMPQuery_SyncClient",
+    "SAMPQuery_Watcher",
+]
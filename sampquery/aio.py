@@ -0,0 +1,409 @@
+"""
+This module is used to interact with a SA:MP/OMP server from asyncio, without trio
+"""
+
+from __future__ import annotations
+
+import asyncio
+import socket
+import typing as tp
+
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager, suppress
+from dataclasses import dataclass, field
+from random import getrandbits
+
+from .decoder import SAMPQuery_Decoder
+from .utils import SAMPQuery_Utils
+from .server import SAMPQuery_Server
+from .player import PLAYER_LIST_LIMIT, SAMPQuery_PlayerColumns, SAMPQuery_PlayerList
+from .rcon import idle_gap, parse_line
+from .rule import SAMPQuery_RuleList
+from .rtt import SAMPQuery_RTTEstimator
+from .retry import SAMPQuery_RetryPolicy, SAMPQuery_RetryStats
+
+from .exceptions import (
+    SAMPQuery_DisabledRCON,
+    SAMPQuery_InvalidRCON,
+    SAMPQuery_TooManyPlayers,
+    SAMPQuery_TruncatedPlayers,
+)
+
+T = tp.TypeVar("T")
+
+
+class SAMPQuery_DatagramProtocol(asyncio.DatagramProtocol):
+    """
+    Hands every datagram received on the endpoint to the query waiting for its
+    routing key (see ``SAMPQuery_Utils.reply_key``), like SAMPQuery_Dispatcher
+    does for trio.
+    """
+
+    def __init__(self) -> None:
+        self.transport: asyncio.DatagramTransport | None = None
+        self.discarded = 0
+        """Number of datagrams nobody was waiting for"""
+        self.__waiters: dict[bytes, list[asyncio.Future[bytes]]] = {}
+        self.__subscribers: dict[bytes, asyncio.Queue[bytes]] = {}
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = tp.cast(asyncio.DatagramTransport, transport)
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        for waiters in self.__waiters.values():
+            for future in waiters:
+                if not future.done():
+                    future.set_exception(exc or ConnectionError("The endpoint was closed"))
+        self.__waiters.clear()
+
+    def error_received(self, exc: Exception) -> None:
+        # ICMP port unreachable: the queries time out as if the packet was lost
+        pass
+
+    def datagram_received(self, data: bytes, addr: tp.Any) -> None:
+        key = SAMPQuery_Utils.reply_key(data)
+        subscriber = self.__subscribers.get(key)
+        if subscriber is not None:
+            subscriber.put_nowait(data)
+            return
+        waiters = self.__waiters.pop(key, None)
+        if not waiters:
+            self.discarded += 1
+            return
+        for future in waiters:  # concurrent identical queries share one answer
+            if not future.done():
+                future.set_result(data)
+
+    def expect(self, key: bytes) -> asyncio.Future[bytes]:
+        """
+        Register interest in the next datagram starting with ``key``.
+
+        :param bytes key: The routing key of the expected reply
+        :return asyncio.Future[bytes]: The future the reply is set on
+        """
+        future: asyncio.Future[bytes] = asyncio.get_running_loop().create_future()
+        self.__waiters.setdefault(key, []).append(future)
+        return future
+
+    def forget(self, key: bytes, future: asyncio.Future[bytes]) -> None:
+        """
+        Stop waiting for a reply (e.g after a timeout).
+
+        :param bytes key: The routing key of the expected reply
+        :param asyncio.Future[bytes] future: The future returned by ``expect``
+        """
+        waiters = self.__waiters.get(key)
+        if waiters and future in waiters:
+            waiters.remove(future)
+            if not waiters:
+                del self.__waiters[key]
+
+    @contextmanager
+    def subscribe(self, key: bytes) -> Iterator[asyncio.Queue[bytes]]:
+        """
+        Receive every datagram starting with ``key`` (e.g the lines of a RCON reply)
+        for as long as the context is open.
+
+        :param bytes key: The routing key of the expected replies
+        :return asyncio.Queue[bytes]: The queue the datagrams are put in
+        """
+        if key in self.__subscribers:
+            raise RuntimeError(f"Someone is already subscribed to {key!r}")
+        queue: asyncio.Queue[bytes] = asyncio.Queue()
+        self.__subscribers[key] = queue
+        try:
+            yield queue
+        finally:
+            del self.__subscribers[key]
+
+
+@dataclass
+class SAMPQuery_AsyncioClient:
+    """
+    The asyncio counterpart of SAMPQuery_Client, over a datagram endpoint. It
+    parses the replies the same way and can be used by many tasks at the same
+    time. It has no cache, SAMPQuery_Cache and SAMPQuery_Resolver are trio only.
+
+    Example::
+
+        async with SAMPQuery_AsyncioClient("127.0.0.1", 7777) as client:
+            info, rules = await asyncio.gather(client.info(), client.rules())
+
+    :param str ip: The IP or hostname of the server, resolved every time the endpoint is opened
+    :param int port: The port of the server
+    :param str rcon_password: The rcon password of the server
+    :param bytes prefix: The prefix needed for the queries
+    :param SAMPQuery_Decoder decoder: Decodes the texts of the server, remembering its charset between queries
+    :param bool columnar: Return the player lists as SAMPQuery_PlayerColumns
+    :param SAMPQuery_RTTEstimator rtt: The round trip time of the server, measured on every query, which sets the timeouts
+    :param SAMPQuery_RetryPolicy retry: How the queries without reply are sent again (RCON commands never are)
+    :param dict[bytes, SAMPQuery_RetryStats] retries: The attempts made so far, by opcode
+    """
+
+    ip: str
+    port: int
+    rcon_password: str | None = field(default=None, repr=False)
+    prefix: bytes | None = field(default=None, repr=False)
+    decoder: SAMPQuery_Decoder = field(default_factory=SAMPQuery_Decoder, repr=False)
+    columnar: bool = field(default=False, repr=False)
+    rtt: SAMPQuery_RTTEstimator = field(default_factory=SAMPQuery_RTTEstimator, repr=False)
+    retry: SAMPQuery_RetryPolicy = field(default_factory=SAMPQuery_RetryPolicy, repr=False)
+    retries: dict[bytes, SAMPQuery_RetryStats] = field(default_factory=dict, repr=False)
+    address: str | None = field(default=None, init=False, repr=False)
+    """The IP ``ip`` resolved to when the endpoint was opened"""
+    __protocol: SAMPQuery_DatagramProtocol | None = field(default=None, repr=False)
+    __connecting: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+    __refused: int | None = field(default=None, repr=False)
+
+    async def __aenter__(self) -> SAMPQuery_AsyncioClient:
+        return self
+
+    async def __aexit__(self, *exc_info: tp.Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the endpoint, it is opened again by the next query."""
+        if self.__protocol is not None and self.__protocol.transport is not None:
+            self.__protocol.transport.close()
+        self.__protocol = None
+
+    async def __connect(self) -> SAMPQuery_DatagramProtocol:
+        """Open the endpoint, once for all the tasks, and save the prefix needed for the queries."""
+        async with self.__connecting:
+            if self.__protocol is not None:
+                return self.__protocol
+            return await self.__open()
+
+    async def __open(self) -> SAMPQuery_DatagramProtocol:
+        loop = asyncio.get_running_loop()
+        address = self.ip
+        if not SAMPQuery_Utils.is_ipv4(address):
+            # resolved on every open, so a long-lived client follows the DNS changes
+            address = str((await loop.getaddrinfo(
+                self.ip, self.port, family=socket.AF_INET, proto=socket.IPPROTO_UDP
+            ))[0][4][0])
+        _, protocol = await loop.create_datagram_endpoint(
+            SAMPQuery_DatagramProtocol, remote_addr=(address, self.port)
+        )
+        self.__protocol = protocol
+        self.address = address
+        self.prefix = SAMPQuery_Utils.build_prefix(address, self.port)
+        return protocol
+
+    async def __query(self, opcode: bytes, payload: bytes = b"") -> bytes:
+        """
+        Send a packet and wait for its reply, sending it again as the retry policy
+        says when no reply arrives.
+
+        :param bytes opcode: The opcode of the packet
+        :param bytes payload: The payload of the packet
+        :return bytes: The reply, without its header
+        :raises TimeoutError: If no attempt got a reply
+        """
+        protocol = self.__protocol or await self.__connect()
+        assert self.prefix and protocol.transport
+        header = self.prefix + opcode + payload
+        key = SAMPQuery_Utils.reply_key(header)
+        stats = self.retries.setdefault(opcode, SAMPQuery_RetryStats())
+        stats.queries += 1
+        future = protocol.expect(key)
+        try:
+            data = await self.__attempts(protocol.transport, header, future, stats)
+        finally:
+            protocol.forget(key, future)
+            future.cancel()
+        if data is None:
+            stats.failed += 1
+            raise TimeoutError(
+                f"The server did not respond to {stats.last + 1} attempts within the timeout period."
+            )
+        return data[len(header):]
+
+    async def __attempts(
+        self,
+        transport: asyncio.DatagramTransport,
+        header: bytes,
+        future: asyncio.Future[bytes],
+        stats: SAMPQuery_RetryStats,
+    ) -> bytes | None:
+        """Send a packet until ``future`` gets its reply, as the retry policy says, None if it never does."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.retry.deadline
+        for attempt, timeout in enumerate(self.retry.timeouts(self.rtt.timeout)):
+            timeout = min(timeout, deadline - loop.time())
+            if timeout <= 0:
+                break
+            stats.packets += 1
+            stats.last = attempt
+            start = loop.time()
+            transport.sendto(header)
+            try:
+                data = await asyncio.wait_for(asyncio.shield(future), timeout)
+            except asyncio.TimeoutError:
+                if not future.done():
+                    continue
+                data = future.result()  # the reply came with the timeout
+            if not attempt:
+                self.rtt.update(loop.time() - start)
+            else:  # the round trip of a retransmitted query is ambiguous (Karn's rule)
+                stats.retried += 1
+            return data
+        return None
+
+    async def __parsed(
+        self, opcode: bytes, parse: Callable[[bytes, SAMPQuery_Decoder], T]
+    ) -> T:
+        return parse(await self.__query(opcode), self.decoder)
+
+    @property
+    def __player_list_type(self) -> type[SAMPQuery_PlayerList] | type[SAMPQuery_PlayerColumns]:
+        """The class the player lists are parsed into"""
+        return SAMPQuery_PlayerColumns if self.columnar else SAMPQuery_PlayerList
+
+    async def ping(self) -> float:
+        """
+        Send a ping packet to the server and return the time it took to receive the packet
+
+        :return float: The time it took to receive the packet
+        """
+        payload = getrandbits(32).to_bytes(4, "little")
+        start = asyncio.get_running_loop().time()
+        data = await self.__query(b"p", payload)
+        assert not data
+        return asyncio.get_running_loop().time() - start
+
+    async def info(self) -> SAMPQuery_Server:
+        """
+        This method is used to get the server information
+
+        :return SAMPQuery_Server: The server information
+        """
+        return await self.__parsed(b"i", SAMPQuery_Server.from_data)
+
+    async def rules(self) -> SAMPQuery_RuleList:
+        """
+        This method is used to get the rules list
+
+        :return SAMPQuery_RuleList: The rules list
+        """
+        return await self.__parsed(b"r", SAMPQuery_RuleList.from_data)
+
+    async def players(self) -> SAMPQuery_PlayerList | SAMPQuery_PlayerColumns:
+        """
+        This method is used to get the player list.
+
+        :return SAMPQuery_PlayerList | SAMPQuery_PlayerColumns: The player list.
+        :raises SAMPQuery_TooManyPlayers: If the server refused the list, having more than 100 players.
+        :raises SAMPQuery_TruncatedPlayers: If the server cut the list short.
+        :raises TimeoutError: If the server does not respond in time.
+        """
+        return await self.__player_list(b"c", self.__player_list_type.from_data, "player list")
+
+    async def detailed_players(self) -> SAMPQuery_PlayerList | SAMPQuery_PlayerColumns:
+        """
+        This method is used to get the detailed player list.
+
+        :return SAMPQuery_PlayerList | SAMPQuery_PlayerColumns: The detailed player list.
+        :raises SAMPQuery_TooManyPlayers: If the server refused the list, having more than 100 players.
+        :raises SAMPQuery_TruncatedPlayers: If the server cut the list short.
+        :raises TimeoutError: If the server does not respond in time.
+        """
+        return await self.__player_list(b"d", self.__player_list_type.from_detailed_data, "detailed player list")
+
+    async def __player_list(
+        self,
+        opcode: bytes,
+        parse: Callable[[bytes, SAMPQuery_Decoder], SAMPQuery_PlayerList | SAMPQuery_PlayerColumns],
+        what: str,
+    ) -> SAMPQuery_PlayerList | SAMPQuery_PlayerColumns:
+        """
+        Query a player list directly, and only ask the player count when it goes
+        unanswered, and do not ask it again until the player count is back to
+        100 or below, like SAMPQuery_Client does.
+
+        :param bytes opcode: ``c`` or ``d``
+        :param parse: The parser of the reply
+        :param str what: The name of the list, for the errors
+        :return SAMPQuery_PlayerList | SAMPQuery_PlayerColumns: The player list
+        """
+        count: int | None
+        if self.__refused is not None:
+            count = self.__refused = (await self.info()).players
+            if count > PLAYER_LIST_LIMIT:
+                raise SAMPQuery_TooManyPlayers(
+                    f"Server has too many players ({count}) to send the {what}."
+                )
+            self.__refused = None
+        try:
+            players = await self.__parsed(opcode, parse)
+        except TimeoutError as e:
+            count = None
+            with suppress(TimeoutError):
+                count = (await self.info()).players
+            if count is not None and count > PLAYER_LIST_LIMIT:
+                self.__refused = count
+                raise SAMPQuery_TooManyPlayers(
+                    f"Server has too many players ({count}) and did not answer the {what}."
+                ) from e
+            raise TimeoutError(
+                f"Failed to retrieve {what} due to a timeout. The server may be unresponsive."
+            ) from e
+        except Exception as e:
+            raise RuntimeError(f"An unexpected error occurred: {str(e)}") from e
+        if players.truncated:
+            raise SAMPQuery_TruncatedPlayers(
+                f"Server cut the {what} short: {len(players)} of {players.count} players.", players
+            )
+        return players
+
+    async def rcon(self, command: str) -> str:
+        """
+        This method is used to execute a command on the server using RCON.
+
+        :param str command: The command to execute.
+        :return str: The response from the server.
+
+        :raises SAMPQuery_DisabledRCON: If the RCON password is missing or disabled.
+        :raises SAMPQuery_InvalidRCON: If the RCON password is invalid.
+        """
+        if not self.rcon_password:
+            raise SAMPQuery_DisabledRCON(
+                "RCON password is missing. Please provide a valid RCON password."
+            )
+        if not self.rtt.samples:
+            await self.ping()
+        protocol = self.__protocol or await self.__connect()
+        assert self.prefix and protocol.transport
+        payload = (
+            getrandbits(32).to_bytes(4, "little")
+            + self.rcon_password.encode()
+            + command.encode()
+        )
+        header = self.prefix + b"x" + payload
+        loop = asyncio.get_running_loop()
+        lines: list[str] = []
+        with protocol.subscribe(SAMPQuery_Utils.reply_key(header)) as queue:
+            sent = loop.time()
+            protocol.transport.sendto(header)
+            # the lines of a response leave the server together, so a pause ends it
+            deadline = sent + self.rtt.timeout
+            while True:
+                try:
+                    data = await asyncio.wait_for(queue.get(), deadline - loop.time())
+                except asyncio.TimeoutError:
+                    break
+                if not data.startswith(header):
+                    continue
+                if not lines:
+                    self.rtt.update(loop.time() - sent)
+                lines.append(parse_line(memoryview(data)[len(header):], self.decoder))
+                deadline = loop.time() + idle_gap(self.rtt)
+        if not lines:
+            raise SAMPQuery_DisabledRCON(
+                "RCON password is missing. Please provide a valid RCON password."
+            )
+        if lines[0].startswith("Invalid RCON password"):
+            raise SAMPQuery_InvalidRCON(
+                "Invalid RCON password. Please check your RCON password."
+            )
+        return "\n".join(lines)
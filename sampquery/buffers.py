@@ -0,0 +1,147 @@
+"""
+This module is used to receive datagrams into reusable buffers instead of a new bytes object each
+"""
+
+from __future__ import annotations
+
+import socket
+import threading
+
+from collections.abc import Iterator
+
+import trio
+
+MAX_DATAGRAM = 65535
+"""The largest UDP payload, so a datagram is never truncated"""
+
+
+class SAMPQuery_BufferPool:
+    """
+    Receives datagrams with ``recv_into`` one after the other into large
+    preallocated slabs, and hands out read-only views of them: no bytes object
+    is allocated, nor copied, per datagram. A slab is reused once no view of
+    it is alive anymore, which Python tells by refusing to resize a buffer
+    with exports.
+
+    The parsed results keep views of their reply for the texts they decode
+    on first access, so a result kept around (e.g in a cache) would keep its
+    slab alive: the replies are copied out of the slab before being parsed
+    into anything that outlives the receive.
+
+    Use ``SAMPQuery_BufferPool.current()`` to share the pool of the thread.
+
+    :param int slab_size: The size of a slab, at least ``MAX_DATAGRAM``
+    :param int maxfree: The maximum number of retired slabs kept to be reused
+    """
+
+    __local = threading.local()
+
+    def __init__(self, slab_size: int = 1 << 18, maxfree: int = 8) -> None:
+        if slab_size < MAX_DATAGRAM:
+            raise ValueError(f"A slab must hold at least {MAX_DATAGRAM} bytes")
+        self.slab_size = slab_size
+        self.maxfree = maxfree
+        self.allocated = 0
+        """Number of slabs allocated so far"""
+        self.__retired: list[bytearray] = []
+        self.__slab = self.__allocate()
+        self.__offset = 0
+
+    @classmethod
+    def current(cls) -> SAMPQuery_BufferPool:
+        """Return the pool of the current thread (the trio loop of the thread uses it alone)."""
+        pool: SAMPQuery_BufferPool | None = getattr(cls.__local, "pool", None)
+        if pool is None:
+            pool = cls.__local.pool = cls()
+        return pool
+
+    def recv(self, sock: socket.socket, size: int = MAX_DATAGRAM) -> memoryview:
+        """
+        Receive one datagram from a non-blocking socket.
+
+        :param socket.socket sock: The socket, in non-blocking mode
+        :param int size: The maximum size of the datagram
+        :return memoryview: A read-only view of the datagram
+        :raises BlockingIOError: If no datagram is ready
+        """
+        if self.slab_size - self.__offset < size:
+            self.__retire()
+        start = self.__offset
+        received = sock.recv_into(memoryview(self.__slab)[start:start + size])
+        self.__offset = start + received
+        return memoryview(self.__slab)[start:start + received].toreadonly()
+
+    def __retire(self) -> None:
+        """Put the current slab aside and start filling a free one."""
+        self.__retired.append(self.__slab)
+        for index, slab in enumerate(self.__retired):
+            if _is_free(slab):
+                del self.__retired[index]
+                break
+        else:
+            slab = self.__allocate()
+            if len(self.__retired) > self.maxfree:
+                # the oldest is still in use, its views keep it alive until they are gone
+                del self.__retired[0]
+        self.__slab = slab
+        self.__offset = 0
+
+    def __allocate(self) -> bytearray:
+        self.allocated += 1
+        return bytearray(self.slab_size)
+
+
+def udp_socket() -> tuple[trio.socket.SocketType, socket.socket]:
+    """
+    Open a UDP socket for trio, keeping the stdlib socket it wraps: the pool
+    reads the ready datagrams from the latter, without a trip to the scheduler each.
+
+    :return: The socket as trio knows it, and the same socket for the stdlib (non-blocking)
+    """
+    raw = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    return trio.socket.from_stdlib_socket(raw), raw
+
+
+def _is_free(slab: bytearray) -> bool:
+    """True if no view of ``slab`` is alive: a buffer with exports can not be resized."""
+    try:
+        slab.append(0)
+    except BufferError:
+        return False
+    slab.pop()
+    return True
+
+
+async def receive_batch(
+    trio_socket: trio.socket.SocketType,
+    sock: socket.socket,
+    pool: SAMPQuery_BufferPool,
+    size: int = MAX_DATAGRAM,
+    limit: int = 256,
+) -> Iterator[memoryview]:
+    """
+    Wait until a socket is readable, then read every datagram ready on it (up
+    to ``limit``) without going back to the scheduler between them.
+
+    :param trio.socket.SocketType trio_socket: The socket, as trio knows it
+    :param socket.socket sock: The same socket for the stdlib, non-blocking (see ``udp_socket``)
+    :param SAMPQuery_BufferPool pool: The pool to receive into
+    :param int size: The maximum size of a datagram
+    :param int limit: The maximum number of datagrams read per wakeup, so a flood does not starve the other tasks
+    :return: The datagrams received
+    """
+    await trio.lowlevel.wait_readable(trio_socket)
+    return _drain(sock, pool, size, limit)
+
+
+def _drain(
+    sock: socket.socket, pool: SAMPQuery_BufferPool, size: int, limit: int
+) -> Iterator[memoryview]:
+    for _ in range(limit):
+        try:
+            yield pool.recv(sock, size)
+        except BlockingIOError:
+            return
+        except ConnectionError:
+            # ICMP port unreachable from one target must not stop the others
+            continue
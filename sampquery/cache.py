@@ -0,0 +1,179 @@
+"""
+This module is used to cache the query results of the servers
+"""
+
+from __future__ import annotations
+
+import copy
+import time
+import typing as tp
+
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass, field
+
+import trio
+
+
+T = tp.TypeVar("T")
+
+SAMPQuery_CacheKey = tuple[str, int, bytes]
+"""An ``(ip, port, opcode)`` triple"""
+
+
+K = tp.TypeVar("K", bound=Hashable)
+
+
+class SAMPQuery_Flight(tp.Generic[K]):
+    """
+    A query being fetched, shared by every caller asking for it meanwhile
+
+    :param K key: The key being fetched
+    """
+
+    __slots__ = ("key", "done", "landed", "value", "error")
+
+    def __init__(self, key: K) -> None:
+        self.key = key
+        self.done = trio.Event()
+        self.landed = False
+        self.value: tp.Any = None
+        self.error: Exception | None = None
+
+
+@dataclass
+class SAMPQuery_Cache:
+    """
+    A TTL cache for the query results, shared by any number of clients.
+
+    A fresh entry is returned as is. An expired entry is still returned during
+    the ``stale_while_revalidate`` window while a single background query
+    refreshes it. Concurrent misses for the same server and opcode trigger a
+    single query, whose result (or error) every caller gets.
+
+    The cached objects are shared between the callers, treat them as read-only.
+
+    :param dict[bytes, float] ttls: Seconds an entry stays fresh, by opcode
+    :param float default_ttl: Seconds an entry stays fresh for the opcodes missing in ``ttls``
+    :param float stale_while_revalidate: Seconds an expired entry can still be served while refreshed
+    :param int maxsize: The maximum number of entries, the least recently used are evicted first
+    """
+
+    ttls: dict[bytes, float] = field(
+        default_factory=lambda: {b"i": 5.0, b"r": 60.0, b"c": 5.0, b"d": 5.0}
+    )
+    default_ttl: float = 5.0
+    stale_while_revalidate: float = 30.0
+    maxsize: int = 4096
+    hits: int = field(default=0, init=False)
+    misses: int = field(default=0, init=False)
+    __entries: OrderedDict[SAMPQuery_CacheKey, tuple[float, tp.Any]] = field(
+        default_factory=OrderedDict, init=False, repr=False
+    )
+    __flights: dict[SAMPQuery_CacheKey, SAMPQuery_Flight[SAMPQuery_CacheKey]] = field(
+        default_factory=dict, init=False, repr=False
+    )
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    async def get(
+        self,
+        key: SAMPQuery_CacheKey,
+        fetch: Callable[[], Awaitable[T]],
+        alive: Callable[[], bool] | None = None,
+    ) -> T:
+        """
+        Return the cached result for ``key``, fetching it if needed.
+
+        :param SAMPQuery_CacheKey key: The ``(ip, port, opcode)`` of the query
+        :param fetch: The async function performing the query
+        :param alive: Tells whether ``fetch`` can still run in the background (e.g its client is not closed); if not, the expired entry is dropped instead of refreshed
+        :return: The cached or freshly fetched result
+        """
+        entry = self.__entries.get(key)
+        if entry is not None:
+            stored, value = entry
+            age = time.monotonic() - stored
+            ttl = self.ttls.get(key[2], self.default_ttl)
+            if age <= ttl + self.stale_while_revalidate:
+                self.hits += 1
+                self.__entries.move_to_end(key)
+                if age > ttl and key not in self.__flights:
+                    trio.lowlevel.spawn_system_task(self.__refresh, key, fetch, alive)
+                return tp.cast(T, value)
+        self.misses += 1
+        while True:
+            flight = self.__flights.get(key)
+            if flight is None:
+                flight = SAMPQuery_Flight(key)
+                self.__flights[key] = flight
+                await self.__fly(flight, fetch)
+            else:
+                await flight.done.wait()
+            if flight.error is not None:
+                # a copy per waiter, so their tracebacks do not pile up on one exception
+                raise copy.copy(flight.error) from flight.error
+            if flight.landed:
+                return tp.cast(T, flight.value)
+            # the task fetching it was cancelled, so someone else has to
+
+    def set(self, key: SAMPQuery_CacheKey, value: tp.Any) -> None:
+        """
+        Store a result, evicting the least recently used entries if needed.
+
+        :param SAMPQuery_CacheKey key: The ``(ip, port, opcode)`` of the query
+        :param value: The result to store
+        """
+        self.__entries[key] = (time.monotonic(), value)
+        self.__entries.move_to_end(key)
+        while len(self.__entries) > self.maxsize:
+            self.__entries.popitem(last=False)
+
+    def invalidate(self, ip: str | None = None, port: int | None = None) -> None:
+        """
+        Drop the cached entries of one server, or every entry.
+
+        :param ip: The IP of the server, None to drop everything
+        :type ip: str | None
+        :param port: The port of the server
+        :type port: int | None
+        """
+        if ip is None:
+            self.__entries.clear()
+            return
+        for key in [k for k in self.__entries if k[0] == ip and port in (None, k[1])]:
+            del self.__entries[key]
+
+    async def __fly(
+        self,
+        flight: SAMPQuery_Flight[SAMPQuery_CacheKey],
+        fetch: Callable[[], Awaitable[tp.Any]],
+    ) -> None:
+        """Run the query of a flight and publish its outcome to its waiters."""
+        try:
+            flight.value = await fetch()
+            flight.landed = True
+            self.set(flight.key, flight.value)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            flight.error = e  # raised to the caller and to every waiter
+            flight.landed = True
+        finally:
+            del self.__flights[flight.key]
+            flight.done.set()
+
+    async def __refresh(
+        self,
+        key: SAMPQuery_CacheKey,
+        fetch: Callable[[], Awaitable[tp.Any]],
+        alive: Callable[[], bool] | None,
+    ) -> None:
+        """Refresh an expired entry in the background, keeping it if the query fails."""
+        if alive is not None and not alive():
+            # refreshing would reopen a socket nobody is left to close
+            self.__entries.pop(key, None)
+            return
+        if key not in self.__flights:
+            flight = SAMPQuery_Flight(key)
+            self.__flights[key] = flight
+            await self.__fly(flight, fetch)
@@ -0,0 +1,200 @@
+"""
+This module is used to run the scanner and the HTTP gateway from the command line
+
+Example::
+
+    sampquery scan servers.txt --opcodes ir --concurrency 512 > results.ndjson
+    sampquery serve --port 8080 --deadline 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+import typing as tp
+
+from collections import Counter
+from collections.abc import AsyncIterator, Sequence
+
+import trio
+
+from .gateway import SAMPQuery_Gateway
+from .ratelimit import SAMPQuery_RateLimiter
+from .scanner import SAMPQuery_Scanner, SAMPQuery_ScanResult, SAMPQuery_Target, parse_target
+
+READ_HINT = 1 << 16  # bytes of target list read per thread hop
+
+
+class ScanSummary:
+    """What is printed on stderr at the end of a scan"""
+
+    def __init__(self) -> None:
+        self.targets = 0
+        self.skipped = 0
+        self.answered = 0
+        self.errors: Counter[tuple[str, str]] = Counter()
+        self.start = time.perf_counter()
+        self.limiter: SAMPQuery_RateLimiter | None = None
+
+    def add(self, result: SAMPQuery_ScanResult) -> None:
+        self.targets += 1
+        self.answered += result.ok
+        for opcode, error in result.errors.items():
+            self.errors[opcode, "timeout" if error == "timeout" else error.split(":", 1)[0]] += 1
+
+    def print(self, file: tp.TextIO) -> None:
+        elapsed = time.perf_counter() - self.start
+        print(f"targets   {self.targets} ({self.skipped} invalid lines skipped)", file=file)
+        print(f"answered  {self.answered}, {self.targets - self.answered} with a failed query", file=file)
+        for (opcode, reason), count in sorted(self.errors.items()):
+            print(f"  {opcode}: {count} {reason}", file=file)
+        rate = self.targets / elapsed if elapsed else 0.0
+        print(f"elapsed   {elapsed:.1f}s, {rate:.0f} servers/s", file=file)
+        if self.limiter is not None:
+            stats = self.limiter.stats
+            print(
+                f"paced     {stats.delayed} of {stats.packets} packets delayed, "
+                f"{stats.mean_wait * 1e3:.1f} ms mean, {stats.max_wait * 1e3:.1f} ms max wait",
+                file=file,
+            )
+
+
+async def read_targets(path: str, summary: ScanSummary) -> AsyncIterator[SAMPQuery_Target]:
+    """
+    Read the targets of a file (``-`` for stdin) a chunk at a time, so the
+    list is never held in memory however long it is.
+    """
+    stream = trio.wrap_file(sys.stdin) if path == "-" else await trio.open_file(path)
+    try:
+        # AsyncIOWrapper.readlines takes the hint, but its annotations do not
+        while lines := await trio.to_thread.run_sync(stream.wrapped.readlines, READ_HINT):
+            for line in lines:
+                try:
+                    target = parse_target(line)
+                except ValueError as e:
+                    summary.skipped += 1
+                    print(f"skipped {line.strip()!r}: {e}", file=sys.stderr)
+                    continue
+                if target is not None:
+                    yield target
+    finally:
+        if path != "-":
+            await stream.aclose()
+
+
+def build_limiter(args: argparse.Namespace) -> SAMPQuery_RateLimiter | None:
+    """The rate limiter asked for by ``--pps``, ``--per-ip`` and ``--inflight``, if any."""
+    if args.pps or args.per_ip or args.inflight:
+        return SAMPQuery_RateLimiter(pps=args.pps, per_ip=args.per_ip, inflight=args.inflight)
+    return None
+
+
+async def scan(args: argparse.Namespace) -> int:
+    """Scan the targets and write one NDJSON line per server as soon as it completes."""
+    limiter = build_limiter(args)
+    scanner = SAMPQuery_Scanner(
+        opcodes=args.opcodes.encode(),
+        concurrency=args.concurrency,
+        timeout=args.timeout,
+        sockets=args.sockets,
+        codepage=args.codepage,
+        limiter=limiter,
+    )
+    summary = ScanSummary()
+    summary.limiter = limiter
+    output = sys.stdout
+    async with scanner.scan(read_targets(args.input, summary)) as results:
+        async for result in results:
+            summary.add(result)
+            if args.only_ok and not result.ok:
+                continue
+            output.write(json.dumps(result.to_dict(), ensure_ascii=False) + "\n")
+            output.flush()
+    if not args.quiet:
+        summary.print(sys.stderr)
+    return 0 if summary.answered or not summary.targets else 1
+
+
+async def serve(args: argparse.Namespace) -> int:
+    """Answer HTTP requests until interrupted."""
+    gateway = SAMPQuery_Gateway(
+        opcodes=args.opcodes.encode(),
+        timeout=args.timeout,
+        deadline=args.deadline,
+        concurrency=args.concurrency,
+        sockets=args.sockets,
+        max_targets=args.max_targets,
+        codepage=args.codepage,
+        limiter=build_limiter(args),
+    )
+    async with trio.open_nursery() as nursery:
+        listeners = await nursery.start(gateway.serve, args.port, args.host)
+        if not args.quiet:
+            host, port = listeners[0].socket.getsockname()[:2]
+            print(f"listening on http://{host}:{port}", file=sys.stderr)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="sampquery", description="Query SA:MP and open.mp servers.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    queries = argparse.ArgumentParser(add_help=False)
+    queries.add_argument("-o", "--opcodes", default="i", help="the queries to send, among i, r, c and d (default: i)")
+    queries.add_argument("-c", "--concurrency", type=int, default=256, help="the number of servers queried at once (default: 256)")
+    queries.add_argument("--sockets", type=int, default=1, help="the number of sockets to spread the servers over (default: 1)")
+    queries.add_argument("--codepage", help="a fixed codepage for the non UTF-8 texts, instead of detecting it")
+    queries.add_argument("--pps", type=float, help="the packets per second sent overall")
+    queries.add_argument("--per-ip", type=float, help="the packets per second sent to one IP (its ports share it)")
+    queries.add_argument("--inflight", type=int, help="the maximum number of queries waiting for their reply")
+
+    scan_parser = commands.add_parser(
+        "scan",
+        parents=[queries],
+        help="query a list of servers and write one JSON line per server",
+        description="Read ip:port targets (one per line, # for comments) and write one JSON line per "
+        "server to stdout as soon as it is done. A summary is printed on stderr at the end.",
+    )
+    scan_parser.add_argument("input", nargs="?", default="-", help="the target list, stdin by default")
+    scan_parser.add_argument("-t", "--timeout", type=float, default=5.0, help="seconds to wait for each reply (default: 5)")
+    scan_parser.add_argument("--only-ok", action="store_true", help="only write the servers that answered every query")
+    scan_parser.add_argument("-q", "--quiet", action="store_true", help="do not print the summary")
+
+    serve_parser = commands.add_parser(
+        "serve",
+        parents=[queries],
+        help="answer the queries over HTTP, as JSON",
+        description="Serve GET /server/<ip>:<port> (one JSON object), POST /batch with a JSON list of "
+        '"ip:port" (one NDJSON line per server, streamed) and GET /health. The query endpoints take '
+        "?opcodes= and a shorter ?deadline=.",
+    )
+    serve_parser.add_argument("--host", default="127.0.0.1", help="the address to listen on (default: 127.0.0.1)")
+    serve_parser.add_argument("-p", "--port", type=int, default=8080, help="the port to listen on (default: 8080)")
+    serve_parser.add_argument("-t", "--timeout", type=float, default=2.0, help="seconds to wait for each reply (default: 2)")
+    serve_parser.add_argument("-d", "--deadline", type=float, default=5.0, help="the longest a request can take, in seconds (default: 5)")
+    serve_parser.add_argument("--max-targets", type=int, default=1000, help="the maximum number of servers in a batch (default: 1000)")
+    serve_parser.add_argument("-q", "--quiet", action="store_true", help="do not print the address listened on")
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.opcodes or set(args.opcodes) - set("ircd"):
+        parser.error("the opcodes must be among i, r, c and d")
+    if args.concurrency < 1 or args.sockets < 1:
+        parser.error("the concurrency and the sockets must be at least 1")
+    if args.command == "serve" and (args.timeout <= 0 or args.deadline <= 0):
+        parser.error("the timeout and the deadline must be positive")
+    try:
+        return trio.run(serve if args.command == "serve" else scan, args)
+    except KeyboardInterrupt:
+        return 130
+    except BrokenPipeError:  # e.g piped into head
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,55 +4,142 @@ This module is used to interact with a given game server
 
 from __future__ import annotations
 
-import trio
+import math
+import socket
+import time
 import typing as tp
 
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+from contextlib import AbstractAsyncContextManager, asynccontextmanager, nullcontext, suppress
 from dataclasses import dataclass, field
 from random import getrandbits
 
-from .utils import SAMPQuery_Utils
+import trio
+
+from .buffers import MAX_DATAGRAM, SAMPQuery_BufferPool, udp_socket
+from .cache import SAMPQuery_Cache
+from .decoder import SAMPQuery_Decoder
+from .metrics import SAMPQuery_Instrumentation
+from .dispatcher import SAMPQuery_Dispatcher
+from .ratelimit import SAMPQuery_RateLimiter
+from .resolver import SAMPQuery_Resolver
+from .utils import SAMPQuery_Buffer, SAMPQuery_Utils
 from .server import SAMPQuery_Server
-from .player import SAMPQuery_PlayerList
+from .player import PLAYER_LIST_LIMIT, SAMPQuery_PlayerColumns, SAMPQuery_PlayerList
 from .rule import SAMPQuery_RuleList
+from .probe import SAMPQuery_PingStats, SAMPQuery_Prober
+from .rcon import SAMPQuery_RconSession, idle_gap, read_response
+from .rtt import SAMPQuery_RTTEstimator
+from .retry import SAMPQuery_RetryPolicy, SAMPQuery_RetryStats
+from .watch import SAMPQuery_Event, SAMPQuery_Watcher
 
 from .exceptions import ( 
     SAMPQuery_TooManyPlayers, 
+    SAMPQuery_TruncatedPlayers,
     SAMPQuery_DisabledRCON, 
     SAMPQuery_InvalidRCON 
 )
 
+T = tp.TypeVar("T")
+
 
 @dataclass
 class SAMPQuery_Client:
     """
     This class is used for interact with a SA:MP/OMP server.
 
-    :param str ip: The IP of the server
+    :param str ip: The IP or hostname of the server, as configured (resolved again on every connect)
     :param int port: The port of the server
     :param str rcon_password: The rcon password of the server
     :param bytes prefix: The prefix needed for the queries
+    :param SAMPQuery_Cache cache: An optional cache for the results of info, rules, players and detailed_players
+    :param SAMPQuery_Decoder decoder: Decodes the texts of the server, remembering its charset between queries
+    :param bool columnar: Return the player lists as SAMPQuery_PlayerColumns (clients sharing a cache should agree on it)
+    :param SAMPQuery_RTTEstimator rtt: The round trip time of the server, measured on every query, which sets the timeouts
+    :param SAMPQuery_RetryPolicy retry: How the queries without reply are sent again (RCON commands never are)
+    :param dict[bytes, SAMPQuery_RetryStats] retries: The attempts made so far, by opcode
+    :param SAMPQuery_Resolver resolver: Resolves the hostname of the server, the resolver of the process by default
+    :param SAMPQuery_RateLimiter | None limiter: Paces the packets and caps the queries in flight, usually shared by many clients
+    :param SAMPQuery_Instrumentation | None instrumentation: The hooks told about every packet, reply and parse (e.g SAMPQuery_Metrics)
     """
 
     ip: str
     port: int
     rcon_password: str | None = field(default=None, repr=False)
     prefix: bytes | None = field(default=None, repr=False)
+    cache: SAMPQuery_Cache | None = field(default=None, repr=False)
+    decoder: SAMPQuery_Decoder = field(default_factory=SAMPQuery_Decoder, repr=False)
+    columnar: bool = field(default=False, repr=False)
+    rtt: SAMPQuery_RTTEstimator = field(default_factory=SAMPQuery_RTTEstimator, repr=False)
+    retry: SAMPQuery_RetryPolicy = field(default_factory=SAMPQuery_RetryPolicy, repr=False)
+    retries: dict[bytes, SAMPQuery_RetryStats] = field(default_factory=dict, repr=False)
+    resolver: SAMPQuery_Resolver = field(default_factory=lambda: SAMPQuery_Resolver.default, repr=False)
+    limiter: SAMPQuery_RateLimiter | None = field(default=None, repr=False)
+    instrumentation: SAMPQuery_Instrumentation | None = field(default=None, repr=False)
+    address: str | None = field(default=None, init=False, repr=False)
+    """The IP ``ip`` resolved to when the socket was opened"""
     __socket: trio.socket.SocketType | None = field(default=None, repr=False)
+    __raw: socket.socket | None = field(default=None, repr=False)
+    __dispatcher: SAMPQuery_Dispatcher | None = field(default=None, repr=False)
+    __refused: int | None = field(default=None, repr=False)
+    __lock: trio.Lock = field(default_factory=trio.Lock, repr=False)
+    __connecting: trio.Lock = field(default_factory=trio.Lock, repr=False)
 
     async def __connect(self) -> None:
         """Connect to the server and save the prefix needed for the queries."""
-        family, type, proto, _, (ip, *_) = (await trio.socket.getaddrinfo(
-            self.ip,
-            self.port,
-            family=trio.socket.AF_INET,
-            proto=trio.socket.IPPROTO_UDP
-        ))[0]
-        self.ip = ip
-        self.__socket = _socket = trio.socket.socket(family, type, proto)
-        await _socket.connect((self.ip, self.port))
-        self.prefix = (
-            b"SAMP" + trio.socket.inet_aton(self.ip) + self.port.to_bytes(2, "little")
-        )
+        async with self.__connecting:  # the first queries may run concurrently
+            if self.__socket:
+                return
+            # resolved on every connect, so the TTL of the resolver applies to a long-lived client
+            address = await self.resolver.resolve(self.ip)
+            # the stdlib socket reads every ready datagram without a trip to the scheduler
+            _socket, raw = udp_socket()
+            try:
+                await _socket.connect((address, self.port))
+            except BaseException:
+                _socket.close()
+                raise
+            self.address = address
+            self.prefix = SAMPQuery_Utils.build_prefix(address, self.port)
+            self.__raw = raw
+            self.__socket = _socket
+
+    @property
+    def connected(self) -> bool:
+        """True while the client holds an open socket"""
+        return self.__socket is not None
+
+    @property
+    def _dispatching(self) -> bool:
+        """True while a task owns the socket (see ``dispatching``), which can not be closed then"""
+        return self.__dispatcher is not None
+
+    def close(self) -> None:
+        """
+        Close the socket of the client, a new one is opened by the next query.
+        It can be called outside of trio (e.g at exit).
+
+        :raises RuntimeError: If the client is dispatching
+        """
+        if self.__dispatcher is not None:
+            raise RuntimeError("Can not close a client while it is dispatching")
+        if self.__raw is not None:
+            # what the trio socket does on close, which only works inside trio
+            with suppress(RuntimeError):  # outside of trio, no task waits on it
+                trio.lowlevel.notify_closing(self.__raw)
+            self.__raw.close()
+        self.__socket = self.__raw = None
+
+    async def aclose(self) -> None:
+        """Close the socket of the client (see ``close``)."""
+        self.close()
+        await trio.lowlevel.checkpoint()
+
+    async def __aenter__(self) -> SAMPQuery_Client:
+        return self
+
+    async def __aexit__(self, *exc_info: tp.Any) -> None:
+        await self.aclose()
 
     async def __send(self, opcode: bytes, payload: bytes = b"") -> None:
         """
@@ -64,28 +151,232 @@ class SAMPQuery_Client:
         if not self.__socket:
             await self.__connect()
         assert self.__socket and self.prefix
-        await self.__socket.send(self.prefix + opcode + payload)
+        if self.limiter is not None:
+            await self.limiter.acquire(self.address or self.ip)
+        packet = self.prefix + opcode + payload
+        await self.__socket.send(packet)
+        if self.instrumentation is not None:
+            self.instrumentation.sent(self.__server, opcode.decode(), len(packet))
+
+    @property
+    def __server(self) -> str:
+        """The ``ip:port`` of the server, as the instrumentation labels it"""
+        return f"{self.ip}:{self.port}"
+
+    @asynccontextmanager
+    async def dispatching(self) -> AsyncIterator[SAMPQuery_Client]:
+        """
+        Let one background task own the socket while the context is open. Every
+        reply is handed to the query waiting for it (matched by opcode, and by
+        nonce for ``p``, ``o`` and ``x``), so the client can be used by many
+        tasks at the same time.
+
+        Example::
+
+            async with client.dispatching(), trio.open_nursery() as nursery:
+                nursery.start_soon(client.info)
+                nursery.start_soon(client.rules)
+        """
+        if not self.__socket:
+            await self.__connect()
+        assert self.__socket
+        async with trio.open_nursery() as nursery:
+            dispatcher = SAMPQuery_Dispatcher(self.__socket, raw=self.__raw)
+            await nursery.start(dispatcher.run)
+            self.__dispatcher = dispatcher
+            try:
+                yield self
+            finally:
+                self.__dispatcher = None
+                nursery.cancel_scope.cancel()
+
+    async def __query(self, opcode: bytes, payload: bytes = b"") -> SAMPQuery_Buffer:
+        """
+        Send a packet and wait for its reply, sending it again as the retry policy
+        says when no reply arrives. Every reply echoes the prefix, the opcode and
+        the payload (and so the nonce) of its query, so a reply to any attempt
+        answers the query.
+
+        :param bytes opcode: The opcode of the packet
+        :param bytes payload: The payload of the packet
+        :return SAMPQuery_Buffer: The reply, without its header (a view of the receive buffer)
+        :raises TimeoutError: If no attempt got a reply
+        """
+        if not self.__socket:
+            await self.__connect()
+        assert self.prefix
+        header = self.prefix + opcode + payload
+        stats = self.retries.setdefault(opcode, SAMPQuery_RetryStats())
+        stats.queries += 1
+        direct = self.__dispatcher is None
+        # one query at a time when nobody dispatches the replies
+        async with self.__lock if direct else nullcontext(), self.__slot():
+            deadline = trio.current_time() + self.retry.deadline
+            for attempt, timeout in enumerate(self.retry.timeouts(self.rtt.timeout)):
+                timeout = min(timeout, deadline - trio.current_time())
+                if timeout <= 0:
+                    break
+                stats.packets += 1
+                stats.last = attempt
+                if attempt and self.instrumentation is not None:
+                    self.instrumentation.retried(self.__server, opcode.decode(), attempt)
+                start = trio.current_time()
+                try:
+                    data = await self.__attempt(opcode, payload, header, timeout)
+                except TimeoutError:
+                    if self.instrumentation is not None:
+                        self.instrumentation.timed_out(self.__server, opcode.decode(), attempt)
+                    continue
+                if self.instrumentation is not None:
+                    self.instrumentation.received(
+                        self.__server, opcode.decode(), len(header) + len(data), trio.current_time() - start
+                    )
+                if not attempt:
+                    self.rtt.update(trio.current_time() - start)
+                else:
+                    # the round trip of a retransmitted query is ambiguous (Karn's rule)
+                    stats.retried += 1
+                return data
+        stats.failed += 1
+        raise TimeoutError(
+            f"The server did not respond to {stats.last + 1} attempts within the timeout period."
+        )
+
+    async def __attempt(
+        self, opcode: bytes, payload: bytes, header: bytes, timeout: float
+    ) -> SAMPQuery_Buffer:
+        """
+        Send a packet once and wait for its reply.
+
+        :param bytes opcode: The opcode of the packet
+        :param bytes payload: The payload of the packet
+        :param bytes header: The header of the reply
+        :param float timeout: The time to wait for the reply
+        :return SAMPQuery_Buffer: The reply, without its header (a view of the receive buffer)
+        :raises TimeoutError: If no reply arrives in time
+        """
+        if self.__dispatcher is None:
+            self.__discard_late_replies()
+            await self.__send(opcode, payload)
+            return await self.__receive(header=header, timeout=timeout)
+        if self.limiter is not None:
+            await self.limiter.acquire(self.address or self.ip)
+        if self.instrumentation is not None:
+            self.instrumentation.sent(self.__server, opcode.decode(), len(header))
+        data = await self.__dispatcher.query(
+            SAMPQuery_Utils.reply_key(header), header, timeout=timeout
+        )
+        return data[len(header):]
+
+    def __slot(self) -> AbstractAsyncContextManager[None]:
+        """Hold an in-flight slot of the rate limiter, if the client has one."""
+        return nullcontext() if self.limiter is None else self.limiter.slot()
 
-    async def __receive(self, header: tp.Optional[bytes] = b"") -> bytes:
+    async def __cached(
+        self, opcode: bytes, parse: Callable[[bytes, SAMPQuery_Decoder], T]
+    ) -> T:
         """
-        Receive a query from the server.
+        Query the server and parse its reply, through the cache if the client has one.
+
+        :param bytes opcode: The opcode of the query
+        :param parse: The parser of the reply
+        :return: The parsed reply
+        """
+
+        async def fetch() -> T:
+            # a copy, as the result may be kept: its texts would pin the receive slab
+            data = bytes(await self.__query(opcode))
+            if self.instrumentation is None:
+                return parse(data, self.decoder)
+            start = time.perf_counter()
+            result = parse(data, self.decoder)
+            self.instrumentation.parsed(self.__server, opcode.decode(), time.perf_counter() - start)
+            return result
+
+        if self.cache is None:
+            return await fetch()
+        return await self.cache.get((self.ip, self.port, opcode), fetch, lambda: self.connected)
+
+    @asynccontextmanager
+    async def __replies(
+        self, header: bytes
+    ) -> AsyncIterator[Callable[[], Awaitable[SAMPQuery_Buffer]]]:
+        """
+        Collect every reply starting with ``header`` while the context is open,
+        for the queries answered by more than one packet.
+
+        :param bytes header: The header of the replies
+        :return: An async function returning the next reply without its header
+        """
+        if self.__dispatcher is None:
+            async with self.__lock:
+                # the caller bounds the wait for the replies
+                yield lambda: self.__receive(header=header, timeout=math.inf)
+            return
+        with self.__dispatcher.subscribe(SAMPQuery_Utils.reply_key(header)) as channel:
+
+            async def receive() -> SAMPQuery_Buffer:
+                while True:
+                    data = await channel.receive()
+                    if data[:len(header)] == header:
+                        return data[len(header):]
+
+            yield receive
+
+    async def __receive(
+        self, header: bytes = b"", timeout: float | None = None
+    ) -> SAMPQuery_Buffer:
+        """
+        Receive a query from the server. The datagrams are read into the buffer
+        pool of the thread, every one already waiting without going back to
+        the scheduler, and the reply is returned as a view of it.
 
         :param bytes header: The header of the packet to receive
-        :return bytes: The packet received
+        :param timeout: The time to wait for the packet, the timeout of the round trip time estimator by default
+        :type timeout: float | None
+        :return SAMPQuery_Buffer: The packet received, without its header
         :raises TimeoutError: If the server does not respond within the timeout period.
         """
-        assert self.__socket
+        assert self.__socket and self.__raw
+        pool = SAMPQuery_BufferPool.current()
+        discarded = 0
         try:
-            with trio.move_on_after(20):  # TODO: verify if this is enough for longer queries
+            with trio.move_on_after(self.rtt.timeout if timeout is None else timeout):
                 while True:
-                    data = await self.__socket.recv(4096)  # 4096 bytes per packet
-                    if data.startswith(header):
+                    try:
+                        data = pool.recv(self.__raw, MAX_DATAGRAM)
+                    except (BlockingIOError, ConnectionError):
+                        await trio.lowlevel.wait_readable(self.__socket)
+                        continue
+                    if data[:len(header)] == header:
                         return data[len(header):]
+                    discarded += 1
             raise TimeoutError("The server did not respond within the timeout period.")
         except TimeoutError as e:
             raise TimeoutError(
                 f"Failed to receive data from the server. Reason: {str(e)}"
             ) from e
+        finally:
+            if discarded and self.instrumentation is not None:
+                self.instrumentation.discarded(self.__server, discarded)
+
+    def __discard_late_replies(self) -> None:
+        """
+        Drop the datagrams already waiting on the socket. Without dispatching,
+        queries are made one at a time, so these can only be the late replies to
+        the earlier attempts of an answered query, which the next identical
+        query must not take for its own reply.
+        """
+        assert self.__raw
+        discarded = 0
+        try:
+            while True:
+                self.__raw.recv(1)  # the rest of the datagram is dropped
+                discarded += 1
+        except (BlockingIOError, ConnectionError):
+            pass
+        if discarded and self.instrumentation is not None:
+            self.instrumentation.discarded(self.__server, discarded)
 
     async def __ping(self) -> float:
         """
@@ -95,9 +386,7 @@ class SAMPQuery_Client:
         """
         payload = getrandbits(32).to_bytes(4, "little")
         starttime = trio.current_time()
-        await self.__send(b"p", payload)
-        assert self.prefix
-        data = await self.__receive(header=self.prefix + b"p" + payload)
+        data = await self.__query(b"p", payload)
         assert not data
         return trio.current_time() - starttime
 
@@ -107,12 +396,11 @@ class SAMPQuery_Client:
 
         :return bool: True if the server is OpenMP server, False otherwise
         """
-        ping = await self.__ping()
+        if not self.rtt.samples:
+            await self.__ping()
         payload = getrandbits(32).to_bytes(4, "little")
-        with trio.move_on_after(SAMPQuery_Utils.MAX_LATENCY_VARIABILITY * ping):
-            await self.__send(b"o", payload)
-            assert self.prefix
-            data = await self.__receive(header=self.prefix + b"o" + payload)
+        with trio.move_on_after(self.rtt.timeout):
+            data = await self.__query(b"o", payload)
             assert not data
             return True
         return False
@@ -123,35 +411,23 @@ class SAMPQuery_Client:
 
         :return SAMPQuery_Server: The server information
         """
-        await self.__send(b"i")
-        assert self.prefix
-        data = await self.__receive(header=self.prefix + b"i")
-        return SAMPQuery_Server.from_data(data)
+        return await self.__cached(b"i", SAMPQuery_Server.from_data)
+
+    @property
+    def __player_list_type(self) -> type[SAMPQuery_PlayerList] | type[SAMPQuery_PlayerColumns]:
+        """The class the player lists are parsed into"""
+        return SAMPQuery_PlayerColumns if self.columnar else SAMPQuery_PlayerList
 
-    async def players(self) -> SAMPQuery_PlayerList:
+    async def players(self) -> SAMPQuery_PlayerList | SAMPQuery_PlayerColumns:
         """
         This method is used to get the player list.
 
-        :return SAMPQuery_PlayerList: The player list.
-        :raises SAMPQuery_TooManyPlayers: If the server has too many connected players.
+        :return SAMPQuery_PlayerList | SAMPQuery_PlayerColumns: The player list.
+        :raises SAMPQuery_TooManyPlayers: If the server refused the list, having more than 100 players.
+        :raises SAMPQuery_TruncatedPlayers: If the server cut the list short.
         :raises TimeoutError: If the server does not respond in time.
         """
-        server_info = await self.info()
-        if server_info.players > 100:  # maximum limit according to SA:MP documentation
-            raise SAMPQuery_TooManyPlayers(
-                f"Server has too many players ({server_info.players}) and cannot retrieve the player list."
-            )
-        await self.__send(b"c")
-        assert self.prefix
-        try:
-            data = await self.__receive(header=self.prefix + b"c")
-            return SAMPQuery_PlayerList.from_data(data)
-        except TimeoutError as e:
-            raise TimeoutError(
-                "Failed to retrieve player list due to a timeout. The server may be unresponsive."
-            ) from e
-        except Exception as e:
-            raise RuntimeError(f"An unexpected error occurred: {str(e)}") from e
+        return await self.__player_list(b"c", self.__player_list_type.from_data, "player list")
 
     async def rules(self) -> SAMPQuery_RuleList:
         """
@@ -159,36 +435,69 @@ class SAMPQuery_Client:
 
         :return SAMPQuery_RuleList: The rules list
         """
-        await self.__send(b"r")
-        assert self.prefix
-        data = await self.__receive(header=self.prefix + b"r")
-        return SAMPQuery_RuleList.from_data(data)
+        return await self.__cached(b"r", SAMPQuery_RuleList.from_data)
 
-    async def detailed_players(self) -> SAMPQuery_PlayerList:
+    async def detailed_players(self) -> SAMPQuery_PlayerList | SAMPQuery_PlayerColumns:
         """
         This method is used to get the detailed player list.
 
-        :return SAMPQuery_PlayerList: The detailed player list.
-        :raises SAMPQuery_TooManyPlayers: If the server has too many connected players.
+        :return SAMPQuery_PlayerList | SAMPQuery_PlayerColumns: The detailed player list.
+        :raises SAMPQuery_TooManyPlayers: If the server refused the list, having more than 100 players.
+        :raises SAMPQuery_TruncatedPlayers: If the server cut the list short.
         :raises TimeoutError: If the server does not respond in time.
         """
-        server_info = await self.info()
-        if server_info.players > 100:
-            raise SAMPQuery_TooManyPlayers(
-                f"Server has too many players ({server_info.players}) and cannot retrieve the detailed player list."
-            )
-        # yeah, if the player count is within the limit, proceed with the query
-        await self.__send(b"d")
-        assert self.prefix
+        return await self.__player_list(b"d", self.__player_list_type.from_detailed_data, "detailed player list")
+
+    async def __player_list(
+        self,
+        opcode: bytes,
+        parse: Callable[[bytes, SAMPQuery_Decoder], SAMPQuery_PlayerList | SAMPQuery_PlayerColumns],
+        what: str,
+    ) -> SAMPQuery_PlayerList | SAMPQuery_PlayerColumns:
+        """
+        Query a player list directly: open.mp servers send it whatever their
+        number of players, in one datagram of up to 64 KiB. Only when it goes
+        unanswered is the player count asked, to tell a SA:MP server refusing
+        it above 100 players from an unresponsive one.
+
+        Once refused, the list is not asked again until the player count (of
+        ``info``, which the cache may answer) is back to 100 or below: every
+        call would otherwise wait out the whole retry policy.
+
+        :param bytes opcode: ``c`` or ``d``
+        :param parse: The parser of the reply
+        :param str what: The name of the list, for the errors
+        :return SAMPQuery_PlayerList | SAMPQuery_PlayerColumns: The player list
+        """
+        count: int | None
+        if self.__refused is not None:
+            count = self.__refused = (await self.info()).players
+            if count > PLAYER_LIST_LIMIT:
+                raise SAMPQuery_TooManyPlayers(
+                    f"Server has too many players ({count}) to send the {what}."
+                )
+            self.__refused = None
         try:
-            data = await self.__receive(header=self.prefix + b"d")
-            return SAMPQuery_PlayerList.from_detailed_data(data)
+            players = await self.__cached(opcode, parse)
         except TimeoutError as e:
+            count = None
+            with suppress(TimeoutError):
+                count = (await self.info()).players
+            if count is not None and count > PLAYER_LIST_LIMIT:
+                self.__refused = count
+                raise SAMPQuery_TooManyPlayers(
+                    f"Server has too many players ({count}) and did not answer the {what}."
+                ) from e
             raise TimeoutError(
-                "Failed to retrieve detailed player list due to a timeout. The server may be unresponsive."
+                f"Failed to retrieve {what} due to a timeout. The server may be unresponsive."
             ) from e
         except Exception as e:
             raise RuntimeError(f"An unexpected error occurred: {str(e)}") from e
+        if players.truncated:
+            raise SAMPQuery_TruncatedPlayers(
+                f"Server cut the {what} short: {len(players)} of {players.count} players.", players
+            )
+        return players
         
     async def lagcomp(self) -> str:
         """
@@ -203,10 +512,9 @@ class SAMPQuery_Client:
             raise ValueError("The 'lagcomp' rule is not available on this server.")
         if lagcomp_rule.value.lower() == "on":
             return "skinshot"
-        elif lagcomp_rule.value.lower() == "off":
+        if lagcomp_rule.value.lower() == "off":
             return "lagshot"
-        else:
-            raise ValueError(f"Unexpected value for 'lagcomp': {lagcomp_rule.value}")
+        raise ValueError(f"Unexpected value for 'lagcomp': {lagcomp_rule.value}")
         
     async def rcon(self, command: str) -> str:
         """
@@ -217,44 +525,113 @@ class SAMPQuery_Client:
 
         :raises SAMPQuery_DisabledRCON: If the RCON password is missing or disabled.
         :raises SAMPQuery_InvalidRCON: If the RCON password is invalid.
+        :raises TimeoutError: If the server does not respond.
         """
         if not self.rcon_password:
             raise SAMPQuery_DisabledRCON(
                 "RCON password is missing. Please provide a valid RCON password."
             )
-        ping = await self.__ping()
+        if not self.rtt.samples:
+            await self.__ping()
         payload = (
             getrandbits(32).to_bytes(4, "little") 
             + self.rcon_password.encode() 
             + command.encode()
         )
-        await self.__send(b"x", payload) # 0x78 packet for RCON purposes
         assert self.prefix
+        header = self.prefix + b"x" + payload
         try:
-            with trio.move_on_after(
-                SAMPQuery_Utils.MAX_LATENCY_VARIABILITY * ping
-            ) as cancel_scope:
-                while True:
-                    start = trio.current_time()
-                    data = await self.__receive(header=self.prefix + b"x" + payload)
-                    receive_duraton = trio.current_time() - start
-                    line, data, _ = SAMPQuery_Utils.unpack_string(data, 'H')
-                    assert not data
-                    response = line + '\n'
-                    cancel_scope.deadline += receive_duraton
-            if not response:
-                raise SAMPQuery_DisabledRCON(
-                    "RCON password is missing. Please provide a valid RCON password."
+            async with self.__replies(header) as receive, self.__slot():
+                sent = trio.current_time()
+                await self.__send(b"x", payload) # 0x78 packet for RCON purposes
+                # the lines of a response leave the server together, so a pause ends it
+                lines, first, size = await read_response(
+                    receive, self.rtt.timeout, idle_gap(self.rtt), self, len(header)
                 )
-            if response.startswith(b"Invalid RCON password"):
-                raise SAMPQuery_InvalidRCON(
-                    "Invalid RCON password. Please check your RCON password."
-                )
-            return response[:-1].decode("utf-8")
         except TimeoutError as e:
             raise TimeoutError(
                 "Failed to retrieve RCON response due to a timeout. The server may be unresponsive."
             ) from e
+        if first is not None:
+            self.rtt.update(first - sent)
+            if self.instrumentation is not None:
+                self.instrumentation.received(self.__server, "x", size, first - sent)
+        response = "\n".join(lines)
+        if not lines:
+            raise SAMPQuery_DisabledRCON(
+                "RCON password is missing. Please provide a valid RCON password."
+            )
+        if response.startswith("Invalid RCON password"):
+            raise SAMPQuery_InvalidRCON(
+                "Invalid RCON password. Please check your RCON password."
+            )
+        return response
+
+    @asynccontextmanager
+    async def rcon_session(self, idle: float | None = None) -> AsyncIterator[SAMPQuery_RconSession]:
+        """
+        Open a RCON session to run many commands: no ping before each of them,
+        several in flight at once, and every response complete as soon as its
+        lines stop coming. The client dispatches its replies while the session
+        is open, if it did not already.
+
+        Example::
+
+            async with client.rcon_session() as session:
+                outputs = await session.pipeline(f"kick {id}" for id in cheaters)
+
+        :param idle: Seconds without a new line after which a response is complete, adapted to the round trip variation by default
+        :type idle: float | None
+        :return SAMPQuery_RconSession: The session
+        :raises SAMPQuery_DisabledRCON: If the RCON password is missing
+        """
+        if not self.rcon_password:
+            raise SAMPQuery_DisabledRCON(
+                "RCON password is missing. Please provide a valid RCON password."
+            )
+        if not self.rtt.samples:
+            await self.__ping()  # once, to size the wait for the first line
+        if self.__dispatcher is not None:
+            yield SAMPQuery_RconSession(self, self.__dispatcher, idle)
+            return
+        async with self.dispatching():
+            assert self.__dispatcher is not None
+            yield SAMPQuery_RconSession(self, self.__dispatcher, idle)
+
+    async def watch(
+        self,
+        interval: float = 5.0,
+        what: Iterable[str] = ("info", "players", "rules"),
+        initial: bool = False,
+    ) -> AsyncIterator[SAMPQuery_Event]:
+        """
+        Poll the server every ``interval`` seconds and yield what changed: players
+        joining or leaving (by ID and name), scores, pings, info fields and rules.
+        The polls bypass the cache, and a poll without reply is skipped.
+
+        Example::
+
+            async for event in client.watch(interval=2, what=("players",)):
+                print(event.kind, event.key, event.old, event.new)
+
+        :param float interval: Seconds between the polls
+        :param what: What to watch, among ``info``, ``players`` (the detailed list) and ``rules``
+        :param bool initial: Report the first poll as changes too
+        :return: The change events
+        """
+        opcodes = {"info": b"i", "players": b"d", "rules": b"r"}
+        queries = [opcodes[name] for name in what]
+        watcher = SAMPQuery_Watcher(self.decoder, initial)
+        while True:
+            deadline = trio.current_time() + interval
+            for opcode in queries:
+                try:
+                    data = await self.__query(opcode)
+                except TimeoutError:
+                    continue
+                for event in watcher.update(opcode, data):
+                    yield event
+            await trio.sleep_until(deadline)
 
     async def ping_history(self, samples: int = 5, interval: float = 1.0) -> list[float]:
         """
@@ -272,6 +649,25 @@ class SAMPQuery_Client:
                 await trio.sleep(interval)
         return results
 
+    async def probe(self, count: int = 10, interval: float = 0.1) -> SAMPQuery_PingStats:
+        """
+        Ping the server ``count`` times, a ping every ``interval`` seconds without
+        waiting for the previous reply, and summarize the round trips. Unlike
+        ``ping_history``, a lost ping counts as loss instead of raising.
+
+        :param int count: The number of pings
+        :param float interval: Seconds between two pings
+        :return SAMPQuery_PingStats: The min/avg/p50/p95/max round trip, jitter and loss
+        """
+        prober = SAMPQuery_Prober(
+            interval=interval,
+            timeout=self.rtt.timeout,
+            window=count,
+            limiter=self.limiter,
+            resolver=self.resolver,
+        )
+        return (await prober.measure([(self.ip, self.port)], count))[self.ip, self.port]
+
     async def server_version(self) -> str:
         """
         Retrieve the server version.
@@ -291,6 +687,8 @@ class SAMPQuery_Client:
         :return: List of players that meet the criteria.
         """
         players = await self.detailed_players()
+        if isinstance(players, SAMPQuery_PlayerColumns):
+            return players.with_score(min_score).players
         return [p for p in players if getattr(p, "score", 0) >= min_score]
 
     async def free_slots(self) -> int:
@@ -0,0 +1,85 @@
+"""
+This module is used to decode the texts sent by a server
+"""
+
+from __future__ import annotations
+
+import codecs
+import typing as tp
+
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+import cchardet as chdet
+
+
+@dataclass
+class SAMPQuery_Decoder:
+    """
+    Decodes the texts of one server. ASCII and valid UTF-8 texts are decoded
+    right away. The charset of the other texts is detected once, on a text long
+    enough for the detection to be reliable (the hostname, the rules...), and
+    remembered for every later text of the same server.
+
+    :param str | None codepage: A fixed codepage for the non UTF-8 texts, which disables the detection
+    :param str fallback: The codepage used while no text was long enough to detect the charset
+    :param int min_detect_length: The minimum length of a text to run the detection on
+    :param str | None encoding: The charset detected so far for this server
+    """
+
+    codepage: str | None = None
+    fallback: str = "cp1252"
+    min_detect_length: int = 16
+    encoding: str | None = None
+    __samples: list[tp.Any] = field(default_factory=list, repr=False)
+
+    def learn(self, samples: Iterable[SAMPQuery_Text]) -> None:
+        """
+        Keep texts of the server (e.g every rule value) to detect its charset on,
+        all at once, if a text ever needs the detection. Nothing is decoded nor
+        copied until then.
+
+        :param samples: Raw texts of the server
+        """
+        if not self.codepage and not self.encoding:
+            self.__samples = list(samples)
+
+    def decode(self, raw: SAMPQuery_Text) -> tuple[str, str]:
+        """
+        Decode a text of the server.
+
+        :param SAMPQuery_Text raw: The raw text
+        :return tuple[str, str]: The decoded text and the encoding used
+        """
+        raw = bytes(raw)
+        if raw.isascii():
+            return raw.decode("ascii"), "ascii"
+        if self.codepage:
+            return raw.decode(self.codepage, "replace"), self.codepage
+        try:
+            return raw.decode("utf-8"), "utf-8"
+        except UnicodeDecodeError:
+            pass
+        encoding = self.encoding
+        if encoding is None:
+            samples, self.__samples = self.__samples, []
+            sample = b" ".join(text for s in samples if not (text := bytes(s)).isascii())
+            if len(sample) < len(raw):
+                sample = raw
+            if len(sample) < self.min_detect_length:
+                return raw.decode(self.fallback, "replace"), self.fallback
+            encoding = self.__detect(sample)
+        return raw.decode(encoding, "replace"), encoding
+
+    def __detect(self, sample: bytes) -> str:
+        """Run the charset detection and remember its result."""
+        try:
+            encoding = codecs.lookup(chdet.detect(sample)["encoding"] or self.fallback).name
+        except LookupError:  # a charset python does not know
+            encoding = self.fallback
+        self.encoding = encoding
+        return encoding
+
+
+SAMPQuery_Text = bytes | bytearray | memoryview
+"""A raw text, as found in a packet"""
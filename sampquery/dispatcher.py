@@ -0,0 +1,186 @@
+"""
+This module routes the datagrams received on a shared socket to the tasks waiting for them
+"""
+
+from __future__ import annotations
+
+import socket as _socket
+import typing as tp
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+import trio
+
+from .buffers import MAX_DATAGRAM, SAMPQuery_BufferPool, receive_batch
+from .utils import SAMPQuery_Buffer, SAMPQuery_Utils
+
+
+class SAMPQuery_Pending:
+    """
+    A query waiting for its reply
+
+    :param bytes key: The routing key the reply must start with
+    """
+
+    __slots__ = ("key", "event", "data")
+
+    def __init__(self, key: bytes) -> None:
+        self.key = key
+        self.event = trio.Event()
+        self.data: SAMPQuery_Buffer | None = None
+
+
+class SAMPQuery_Dispatcher:
+    """
+    Owns the receiving side of a UDP socket and hands every datagram to the
+    queries waiting for its routing key (see ``SAMPQuery_Utils.reply_key``).
+
+    Replies to opcodes without a nonce are delivered to every query waiting
+    for that key, so concurrent identical queries share one answer.
+
+    Given the stdlib socket trio wraps (see ``udp_socket``), the datagrams are
+    read into the slabs of a SAMPQuery_BufferPool, every ready one per wakeup,
+    and delivered as read-only views. Without it, they are received one per
+    trip to the scheduler.
+
+    :param trio.socket.SocketType socket: The socket to read from and send to
+    :param int bufsize: The maximum size of a received datagram
+    :param SAMPQuery_BufferPool | None pool: The pool to receive into, the pool of the thread by default
+    :param socket.socket | None raw: The stdlib socket wrapped by ``socket``
+    """
+
+    def __init__(
+        self,
+        socket: trio.socket.SocketType,
+        bufsize: int = MAX_DATAGRAM,
+        pool: SAMPQuery_BufferPool | None = None,
+        raw: _socket.socket | None = None,
+    ) -> None:
+        self.socket = socket
+        self.bufsize = bufsize
+        self.pool = pool
+        self.raw = raw
+        self.discarded = 0
+        """Number of datagrams nobody was waiting for"""
+        self.__waiters: dict[bytes, list[SAMPQuery_Pending]] = {}
+        self.__subscribers: dict[bytes, trio.MemorySendChannel[SAMPQuery_Buffer]] = {}
+
+    def expect(self, key: bytes) -> SAMPQuery_Pending:
+        """
+        Register interest in the next datagram starting with ``key``.
+
+        :param bytes key: The routing key of the expected reply
+        :return SAMPQuery_Pending: The handle to wait on
+        """
+        pending = SAMPQuery_Pending(key)
+        self.__waiters.setdefault(key, []).append(pending)
+        return pending
+
+    def forget(self, pending: SAMPQuery_Pending) -> None:
+        """
+        Stop waiting for a reply (e.g after a timeout).
+
+        :param SAMPQuery_Pending pending: The handle returned by ``expect``
+        """
+        waiters = self.__waiters.get(pending.key)
+        if waiters and pending in waiters:
+            waiters.remove(pending)
+            if not waiters:
+                del self.__waiters[pending.key]
+
+    @contextmanager
+    def subscribe(
+        self, key: bytes, capacity: int = 64
+    ) -> Iterator[trio.MemoryReceiveChannel[SAMPQuery_Buffer]]:
+        """
+        Receive every datagram starting with ``key`` (e.g the lines of a RCON reply)
+        for as long as the context is open. Datagrams that do not fit in the
+        buffer are discarded.
+
+        :param bytes key: The routing key of the expected replies
+        :param int capacity: How many datagrams can be buffered
+        :return: The channel the datagrams are delivered to
+        """
+        if key in self.__subscribers:
+            raise RuntimeError(f"Someone is already subscribed to {key!r}")
+        send_channel, receive_channel = trio.open_memory_channel[SAMPQuery_Buffer](capacity)
+        self.__subscribers[key] = send_channel
+        try:
+            with receive_channel:
+                yield receive_channel
+        finally:
+            del self.__subscribers[key]
+            send_channel.close()
+
+    def deliver(self, data: SAMPQuery_Buffer) -> bool:
+        """
+        Hand a datagram to the queries waiting for it.
+
+        :param SAMPQuery_Buffer data: The received datagram
+        :return bool: False if nobody was waiting for it
+        """
+        key = SAMPQuery_Utils.reply_key(data)
+        subscriber = self.__subscribers.get(key)
+        if subscriber is not None:
+            try:
+                subscriber.send_nowait(data)
+                return True
+            except trio.WouldBlock:
+                self.discarded += 1
+                return False
+        waiters = self.__waiters.pop(key, None)
+        if not waiters:
+            self.discarded += 1
+            return False
+        for pending in waiters:
+            pending.data = data
+            pending.event.set()
+        return True
+
+    async def query(
+        self,
+        key: bytes,
+        packet: bytes,
+        timeout: float,
+        address: tuple[str, int] | None = None,
+    ) -> SAMPQuery_Buffer:
+        """
+        Send a packet and wait for the reply routed to ``key``.
+
+        :param bytes key: The routing key of the expected reply
+        :param bytes packet: The packet to send
+        :param float timeout: Seconds to wait for the reply
+        :param address: Destination, if the socket is not connected
+        :type address: tuple[str, int] | None
+        :return SAMPQuery_Buffer: The whole reply, header included (a view of the receive buffer)
+        :raises TimeoutError: If no reply arrives in time
+        """
+        pending = self.expect(key)
+        try:
+            with trio.move_on_after(timeout):
+                if address is None:
+                    await self.socket.send(packet)
+                else:
+                    await self.socket.sendto(packet, address)
+                await pending.event.wait()
+        finally:
+            self.forget(pending)
+        if pending.data is None:
+            raise TimeoutError("The server did not respond within the timeout period.")
+        return pending.data
+
+    async def run(self, *, task_status: tp.Any = trio.TASK_STATUS_IGNORED) -> None:
+        """Read datagrams forever and dispatch them, until cancelled."""
+        pool = self.pool or SAMPQuery_BufferPool.current()
+        task_status.started()
+        if self.raw is None:
+            while True:
+                try:
+                    data = await self.socket.recv(self.bufsize)
+                except ConnectionError:
+                    continue
+                self.deliver(data)
+        while True:
+            for view in await receive_batch(self.socket, self.raw, pool, self.bufsize):
+                self.deliver(view)
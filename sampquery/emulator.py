@@ -0,0 +1,318 @@
+"""
+This module is used to emulate SA:MP/open.mp servers answering the queries, to test
+and load test the clients without touching real servers.
+
+Run ``python -m sampquery.emulator --servers 1000 --port 17000`` to emulate a
+fleet of servers on the local ports 17000 to 17999.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import struct
+import typing as tp
+
+from dataclasses import dataclass, field
+
+import trio
+
+from .utils import SAMPQuery_Utils
+
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None  # type: ignore[assignment]
+
+
+@dataclass
+class SAMPQuery_VirtualServer:
+    """
+    The state of an emulated server and how its replies are delivered.
+
+    :param str name: The hostname
+    :param str gamemode: The gamemode
+    :param str language: The language
+    :param bool password: Whether the server is password protected
+    :param int max_players: The maximum number of players
+    :param list[tuple[str, int, int]] players: The ``(name, score, ping)`` of every player, in id order
+    :param dict[str, str] rules: The rules
+    :param str | None rcon_password: The RCON password, None disables RCON
+    :param bool omp: Whether to answer the open.mp ``o`` query
+    :param int | None list_limit: Above this number of players, the player lists are not answered (100 on SA:MP)
+    :param str encoding: The encoding of the texts
+    :param float latency: The delay before every reply, in seconds
+    :param float jitter: The maximum random deviation of the delay, in seconds
+    :param float loss: The probability for a query to get no reply
+    """
+
+    name: str = "Virtual Server"
+    gamemode: str = "Freeroam"
+    language: str = "English"
+    password: bool = False
+    max_players: int = 1000
+    players: list[tuple[str, int, int]] = field(default_factory=list)
+    rules: dict[str, str] = field(
+        default_factory=lambda: {
+            "lagcomp": "On",
+            "mapname": "San Andreas",
+            "version": "0.3.7-R2",
+            "weather": "10",
+            "worldtime": "12:00",
+        }
+    )
+    rcon_password: str | None = None
+    omp: bool = False
+    list_limit: int | None = None
+    encoding: str = "cp1252"
+    latency: float = 0.0
+    jitter: float = 0.0
+    loss: float = 0.0
+    __bodies: dict[bytes, bytes] = field(default_factory=dict, repr=False)
+
+    def invalidate(self) -> None:
+        """Forget the replies built so far, after changing the state of the server."""
+        self.__bodies.clear()
+
+    def answer(self, packet: bytes) -> list[bytes]:
+        """
+        Build the replies to a query, whatever the latency and the loss.
+
+        :param bytes packet: The query
+        :return list[bytes]: The datagrams to send back, none if the query gets no reply
+        """
+        if len(packet) <= SAMPQuery_Utils.PREFIX_LENGTH or not packet.startswith(b"SAMP"):
+            return []
+        header = SAMPQuery_Utils.reply_key(packet)
+        opcode = packet[SAMPQuery_Utils.PREFIX_LENGTH:SAMPQuery_Utils.PREFIX_LENGTH + 1]
+        if opcode == b"p" or (opcode == b"o" and self.omp):
+            return [header]
+        if opcode == b"x":
+            return [packet + self.__string(line, "H") for line in self.__rcon(packet[len(opcode) + SAMPQuery_Utils.PREFIX_LENGTH:])]
+        body = self.__bodies.get(opcode)
+        if body is None:
+            body = self.__body(opcode)
+            if body is None:
+                return []
+            self.__bodies[opcode] = body
+        return [header + body]
+
+    def rcon(self, command: str) -> list[str]:
+        """
+        Run a RCON command, override it to emulate more commands.
+
+        :param str command: The command
+        :return list[str]: The lines of the response
+        """
+        if command.startswith("echo "):
+            return [command[5:]]
+        return ["Unknown command or variable:", command]
+
+    def __rcon(self, payload: bytes) -> list[str]:
+        """Check the password of a RCON query (nonce, password and command) and run its command."""
+        if not self.rcon_password:
+            return []
+        password = self.rcon_password.encode(self.encoding)
+        if payload[4:4 + len(password)] != password:
+            return ["Invalid RCON password."]
+        return self.rcon(payload[4 + len(password):].decode(self.encoding, "replace"))
+
+    def __body(self, opcode: bytes) -> bytes | None:
+        """Build the reply to a query without nonce, without its header."""
+        if opcode == b"i":
+            return (
+                struct.pack("<?HH", self.password, len(self.players), self.max_players)
+                + self.__string(self.name, "I")
+                + self.__string(self.gamemode, "I")
+                + self.__string(self.language, "I")
+            )
+        if opcode == b"r":
+            return struct.pack("<H", len(self.rules)) + b"".join(
+                self.__string(name, "B") + self.__string(value, "B")
+                for name, value in self.rules.items()
+            )
+        if opcode in {b"c", b"d"}:
+            if self.list_limit is not None and len(self.players) > self.list_limit:
+                return None
+            if opcode == b"c":
+                return struct.pack("<H", len(self.players)) + b"".join(
+                    self.__string(name, "B") + struct.pack("<i", score)
+                    for name, score, _ in self.players
+                )
+            return struct.pack("<H", len(self.players)) + b"".join(
+                struct.pack("<B", player_id % 256)
+                + self.__string(name, "B")
+                + struct.pack("<ii", score, ping)
+                for player_id, (name, score, ping) in enumerate(self.players)
+            )
+        return None
+
+    def __string(self, text: str, len_type: str) -> bytes:
+        raw = text.encode(self.encoding, "replace")
+        return struct.pack(f"<{len_type}", len(raw)) + raw
+
+
+@dataclass
+class SAMPQuery_Emulator:
+    """
+    Emulate many servers, one UDP port each.
+
+    :param dict[int, SAMPQuery_VirtualServer] servers: The servers, by port
+    :param str host: The address to listen on
+    :param int | None seed: The seed of the latency jitter and of the loss
+    """
+
+    servers: dict[int, SAMPQuery_VirtualServer]
+    host: str = "127.0.0.1"
+    seed: int | None = None
+    received: int = 0
+    """Number of queries received"""
+    sent: int = 0
+    """Number of replies sent"""
+    __random: random.Random = field(default_factory=random.Random, repr=False)
+
+    def __post_init__(self) -> None:
+        self.__random.seed(self.seed)
+
+    @classmethod
+    def fleet(
+        cls,
+        count: int,
+        port: int = 17000,
+        players: int = 10,
+        host: str = "127.0.0.1",
+        seed: int | None = None,
+        **options: tp.Any,
+    ) -> SAMPQuery_Emulator:
+        """
+        Emulate ``count`` servers on consecutive ports.
+
+        :param int count: The number of servers
+        :param int port: The port of the first server
+        :param int players: The number of players of each server
+        :param str host: The address to listen on
+        :param seed: The seed of the latency jitter, of the loss and of the scores
+        :type seed: int | None
+        :param options: The other fields of every SAMPQuery_VirtualServer (latency, loss...)
+        :return SAMPQuery_Emulator: The emulator
+        """
+        rng = random.Random(seed)
+        servers = {
+            port + i: SAMPQuery_VirtualServer(
+                name=f"Virtual Server #{i}",
+                players=[
+                    (f"Player_{j}", rng.randint(0, 10000), rng.randint(10, 300))
+                    for j in range(players)
+                ],
+                **options,
+            )
+            for i in range(count)
+        }
+        return cls(servers=servers, host=host, seed=seed)
+
+    @property
+    def addresses(self) -> list[tuple[str, int]]:
+        """The ``(host, port)`` of every server"""
+        return [(self.host, port) for port in self.servers]
+
+    async def run(self, *, task_status: tp.Any = trio.TASK_STATUS_IGNORED) -> None:
+        """Bind the port of every server and answer the queries, until cancelled."""
+        async with trio.open_nursery() as nursery:
+            for port, server in self.servers.items():
+                _socket = trio.socket.socket(trio.socket.AF_INET, trio.socket.SOCK_DGRAM)
+                await _socket.bind((self.host, port))
+                nursery.start_soon(self.__serve, _socket, server, nursery)
+            task_status.started()
+
+    async def __serve(
+        self, _socket: trio.socket.SocketType, server: SAMPQuery_VirtualServer, nursery: trio.Nursery
+    ) -> None:
+        with _socket:
+            while True:
+                try:
+                    packet, address = await _socket.recvfrom(4096)
+                except ConnectionError:
+                    continue
+                self.received += 1
+                if server.loss and self.__random.random() < server.loss:
+                    continue
+                replies = server.answer(packet)
+                if not replies:
+                    continue
+                delay = server.latency
+                if server.jitter:
+                    delay += self.__random.uniform(-server.jitter, server.jitter)
+                if delay > 0:
+                    nursery.start_soon(self.__send_later, _socket, replies, address, delay)
+                else:
+                    await self.__send(_socket, replies, address)
+
+    async def __send_later(
+        self, _socket: trio.socket.SocketType, replies: list[bytes], address: tp.Any, delay: float
+    ) -> None:
+        await trio.sleep(delay)
+        await self.__send(_socket, replies, address)
+
+    async def __send(
+        self, _socket: trio.socket.SocketType, replies: list[bytes], address: tp.Any
+    ) -> None:
+        for reply in replies:
+            try:
+                await _socket.sendto(reply, address)
+            except OSError:  # the client is gone
+                return
+            self.sent += 1
+
+
+def raise_open_files_limit() -> None:
+    """Raise the limit of open files to its maximum, to open a socket per server."""
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Emulate SA:MP servers on local ports.")
+    parser.add_argument("--host", default="127.0.0.1", help="the address to listen on")
+    parser.add_argument("--port", type=int, default=17000, help="the port of the first server")
+    parser.add_argument("--servers", type=int, default=100, help="the number of servers")
+    parser.add_argument("--players", type=int, default=10, help="the number of players of each server")
+    parser.add_argument("--list-limit", type=int, help="do not answer the player lists above this number of players")
+    parser.add_argument("--latency", type=float, default=0.0, help="the delay of the replies, in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="the random deviation of the delay, in seconds")
+    parser.add_argument("--loss", type=float, default=0.0, help="the probability for a query to get no reply")
+    parser.add_argument("--rcon-password", help="the RCON password of every server")
+    parser.add_argument("--omp", action="store_true", help="answer the open.mp query")
+    parser.add_argument("--seed", type=int, help="the seed of the jitter, the loss and the scores")
+    args = parser.parse_args()
+
+    raise_open_files_limit()
+    emulator = SAMPQuery_Emulator.fleet(
+        args.servers,
+        port=args.port,
+        players=args.players,
+        host=args.host,
+        seed=args.seed,
+        list_limit=args.list_limit,
+        latency=args.latency,
+        jitter=args.jitter,
+        loss=args.loss,
+        rcon_password=args.rcon_password,
+        omp=args.omp,
+    )
+
+    async def serve() -> None:
+        async with trio.open_nursery() as nursery:
+            await nursery.start(emulator.run)
+            print(f"ready: {args.servers} servers on {args.host}:{args.port}-{args.port + args.servers - 1}", flush=True)
+
+    try:
+        trio.run(serve)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,8 @@ In this module we handle exceptions raised by the library
 
 from __future__ import annotations
 
+import typing as tp
+
 
 class SAMPQuery_MissingRCON(Exception):
     """Raised when RCON password is missing"""
@@ -30,4 +32,16 @@ class SAMPQuery_Timeout(Exception):
 
 class SAMPQuery_TooManyPlayers(Exception):
     """Raised when the server has too many connected players to retrieve data."""
-    pass
\ No newline at end of file
+    pass
+
+
+class SAMPQuery_InvalidReply(ValueError):
+    """Raised when a reply of the server does not follow the protocol"""
+
+
+class SAMPQuery_TruncatedPlayers(Exception):
+    """Raised when the server cut its player list short, the players it did send are in ``players``"""
+
+    def __init__(self, message: str, players: tp.Any) -> None:
+        super().__init__(message)
+        self.players = players
\ No newline at end of file
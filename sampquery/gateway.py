@@ -0,0 +1,372 @@
+"""
+This module is used to serve the queries over HTTP, as JSON, to the services that do not speak UDP
+
+Example::
+
+    sampquery serve --port 8080 --opcodes ir
+
+    curl 127.0.0.1:8080/server/127.0.0.1:7777
+    curl -d '["127.0.0.1:7777", "127.0.0.1:7778"]' '127.0.0.1:8080/batch?deadline=2'
+"""
+
+from __future__ import annotations
+
+import json
+import typing as tp
+
+from collections import Counter
+from collections.abc import Sequence
+from contextlib import AbstractAsyncContextManager, suppress
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import trio
+
+from .buffers import udp_socket
+from .dispatcher import SAMPQuery_Dispatcher
+from .ratelimit import SAMPQuery_RateLimiter
+from .resolver import SAMPQuery_Resolver
+from .scanner import SAMPQuery_Scanner, SAMPQuery_ScanResult, SAMPQuery_Target, parse_target
+
+MAX_HEAD = 16384
+"""The largest request line and headers, in bytes"""
+
+HEAD_TIMEOUT = 10.0
+"""Seconds a client has to send its request line and headers"""
+
+SEND_TIMEOUT = 5.0
+"""Seconds a client has to take the end of a response past its deadline, before it is dropped"""
+
+
+class _HTTPError(Exception):
+    """A request answered with an error status and a JSON ``{"error": message}`` body"""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class _Request:
+    method: str
+    path: str
+    query: dict[str, list[str]]
+    body: bytes
+    streaming: bool = False
+    """True once a streamed response began, which can not turn into an error anymore"""
+
+
+@dataclass
+class SAMPQuery_Gateway:
+    """
+    A small HTTP/1.1 server answering with the queries of SA:MP servers:
+
+    - ``GET /server/<ip>:<port>`` answers one JSON object, with the status
+      200 if the server answered every query, 504 if it did not answer in
+      time and 502 otherwise;
+    - ``POST /batch`` with a JSON list of ``"ip:port"`` (or ``{"targets": [...]}``)
+      streams one NDJSON line per server as soon as it completes;
+    - ``GET /health`` answers ``{"ok": true}``.
+
+    Both query endpoints take the ``opcodes`` (among ``i``, ``r``, ``c`` and
+    ``d``) and a shorter ``deadline`` in their query string. Every request
+    goes through the same few UDP sockets, opened once for the gateway, so
+    concurrent requests for a server share its replies. The deadline is
+    hard: a server still unanswered when it expires gets the ``deadline``
+    error, and the response ends.
+
+    Example::
+
+        gateway = SAMPQuery_Gateway(opcodes=b"ir", deadline=3.0)
+        await gateway.serve(8080)
+
+    :param bytes opcodes: The queries sent when a request does not choose them
+    :param float timeout: Seconds to wait for each reply, at most the deadline of the request
+    :param float deadline: The longest a request can take, in seconds
+    :param int concurrency: The maximum number of servers of a batch queried at the same time
+    :param int sockets: The number of sockets to spread the servers over
+    :param int max_targets: The maximum number of servers in a batch
+    :param int max_body: The largest request body, in bytes
+    :param str | None codepage: A fixed codepage for the non UTF-8 texts, instead of detecting it per server
+    :param SAMPQuery_RateLimiter | None limiter: Paces the packets of every request together
+    :param SAMPQuery_Resolver resolver: Resolves the hostnames among the targets, the resolver of the process by default
+    """
+
+    opcodes: bytes = b"i"
+    timeout: float = 2.0
+    deadline: float = 5.0
+    concurrency: int = 256
+    sockets: int = 1
+    max_targets: int = 1000
+    max_body: int = 1 << 20
+    codepage: str | None = None
+    limiter: SAMPQuery_RateLimiter | None = field(default=None, repr=False)
+    resolver: SAMPQuery_Resolver = field(default_factory=lambda: SAMPQuery_Resolver.default, repr=False)
+    requests: int = field(default=0, init=False)
+    errors: int = field(default=0, init=False)
+    __dispatchers: list[SAMPQuery_Dispatcher] = field(default_factory=list, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        # the scanner validates the rest
+        SAMPQuery_Scanner(opcodes=self.opcodes, concurrency=self.concurrency, sockets=self.sockets)
+        if self.timeout <= 0 or self.deadline <= 0:
+            raise ValueError("The timeout and the deadline must be positive")
+
+    async def serve(
+        self, port: int = 8080, host: str | None = "127.0.0.1", *, task_status: tp.Any = trio.TASK_STATUS_IGNORED
+    ) -> None:
+        """
+        Open the UDP sockets and answer HTTP requests until cancelled.
+
+        :param int port: The TCP port to listen on, 0 for any free one
+        :param host: The address to listen on, None for every interface
+        :type host: str | None
+        :param task_status: Given by ``nursery.start``, which returns the listeners once they accept connections
+        """
+        async with trio.open_nursery() as nursery:
+            try:
+                for _ in range(self.sockets):
+                    _socket, raw = udp_socket()
+                    await _socket.bind(("0.0.0.0", 0))
+                    dispatcher = SAMPQuery_Dispatcher(_socket, raw=raw)
+                    self.__dispatchers.append(dispatcher)
+                    await nursery.start(dispatcher.run)
+                # started with the listeners, so a caller can read the port it was given
+                await trio.serve_tcp(self.__handle, port, host=host, task_status=task_status)
+            finally:
+                for dispatcher in self.__dispatchers:
+                    dispatcher.socket.close()
+                self.__dispatchers.clear()
+
+    async def __handle(self, stream: trio.SocketStream) -> None:
+        """Answer the request of one connection, then close it."""
+        self.requests += 1
+        request = None
+        try:
+            with trio.move_on_after(HEAD_TIMEOUT) as scope:
+                head, rest = await _read_head(stream)
+            if scope.cancelled_caught or not head:
+                return
+            try:
+                request = await self.__read_request(stream, head, rest)
+                await self.__route(stream, request)
+            except _HTTPError as e:
+                await _send_json(stream, e.status, {"error": str(e)})
+        except (trio.BrokenResourceError, trio.ClosedResourceError):
+            pass  # the client went away
+        except Exception:  # pylint: disable=broad-exception-caught
+            # one bad request must not stop the gateway, nor leave its client without an answer
+            self.errors += 1
+            if request is None or not request.streaming:
+                with suppress(trio.BrokenResourceError, trio.ClosedResourceError):
+                    with trio.move_on_after(SEND_TIMEOUT):
+                        await _send_json(stream, 500, {"error": "internal error"})
+
+    async def __read_request(self, stream: trio.SocketStream, head: bytes, rest: bytes) -> _Request:
+        """Parse the request line and the headers, and read the body."""
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ")
+        except ValueError:
+            raise _HTTPError(400, "malformed request line") from None
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if "chunked" in headers.get("transfer-encoding", ""):
+            raise _HTTPError(411, "the body must have a Content-Length")
+        value = headers.get("content-length", "0")
+        if not value.isdigit():
+            raise _HTTPError(400, "invalid Content-Length")
+        length = int(value)
+        if length > self.max_body:
+            raise _HTTPError(413, f"the body is larger than {self.max_body} bytes")
+        body = bytearray(rest)
+        with trio.move_on_after(HEAD_TIMEOUT):
+            while len(body) < length:
+                data = await stream.receive_some(length - len(body))
+                if not data:
+                    break
+                body += data
+        if len(body) < length:
+            raise _HTTPError(400, "the body is incomplete")
+        url = urlsplit(target)
+        return _Request(method, unquote(url.path), parse_qs(url.query), bytes(body[:length]))
+
+    async def __route(self, stream: trio.SocketStream, request: _Request) -> None:
+        """Answer a request according to its path."""
+        if request.path == "/health":
+            _expect_method(request, "GET")
+            await _send_json(stream, 200, {"ok": True})
+        elif request.path.startswith("/server/"):
+            _expect_method(request, "GET")
+            try:
+                target = parse_target(request.path[len("/server/"):])
+            except ValueError as e:
+                raise _HTTPError(400, str(e)) from None
+            if target is None:
+                raise _HTTPError(400, "missing server")
+            await self.__single(stream, target, *self.__options(request))
+        elif request.path == "/batch":
+            _expect_method(request, "POST")
+            targets = self.__targets(request.body)
+            await self.__batch(stream, request, targets, *self.__options(request))
+        else:
+            raise _HTTPError(404, f"no such endpoint {request.path!r}")
+
+    def __options(self, request: _Request) -> tuple[bytes, float]:
+        """The opcodes and the deadline of a request, from its query string."""
+        opcodes = request.query.get("opcodes", [""])[-1].encode() or self.opcodes
+        if set(opcodes) - set(b"ircd"):
+            raise _HTTPError(400, "the opcodes must be among i, r, c and d")
+        deadline = self.deadline
+        if "deadline" in request.query:
+            try:
+                deadline = float(request.query["deadline"][-1])
+            except ValueError:
+                raise _HTTPError(400, "invalid deadline") from None
+            if not deadline > 0:
+                raise _HTTPError(400, "the deadline must be positive")
+        return bytes(dict.fromkeys(opcodes)), min(deadline, self.deadline)
+
+    def __targets(self, body: bytes) -> list[SAMPQuery_Target]:
+        """The servers of a batch, from its JSON body."""
+        try:
+            document = json.loads(body)
+        except ValueError as e:
+            raise _HTTPError(400, f"invalid JSON: {e}") from None
+        if isinstance(document, dict):
+            document = document.get("targets")
+        if not isinstance(document, list) or not all(isinstance(item, str) for item in document):
+            raise _HTTPError(400, 'expected a list of "ip:port" strings')
+        if len(document) > self.max_targets:
+            raise _HTTPError(413, f"a batch holds at most {self.max_targets} servers")
+        targets = []
+        for item in document:
+            try:
+                target = parse_target(item)
+            except ValueError as e:
+                raise _HTTPError(400, f"{item!r}: {e}") from None
+            if target is None:
+                raise _HTTPError(400, f"{item!r}: missing server")
+            targets.append(target)
+        return targets
+
+    async def __single(
+        self, stream: trio.SocketStream, target: SAMPQuery_Target, opcodes: bytes, deadline: float
+    ) -> None:
+        """Query one server and answer its result."""
+        end = trio.current_time() + deadline
+        result = None
+        async with self.__scan([target], opcodes, deadline) as results:
+            with trio.move_on_at(end):
+                result = await results.receive()
+        line = result.to_dict() if result is not None else _expired(target, opcodes)
+        errors = line.get("errors", {}).values()
+        status = 200 if line["ok"] else 504 if all(e in {"timeout", "deadline"} for e in errors) else 502
+        with trio.move_on_at(end + SEND_TIMEOUT):
+            await _send_json(stream, status, line)
+
+    async def __batch(
+        self,
+        stream: trio.SocketStream,
+        request: _Request,
+        targets: list[SAMPQuery_Target],
+        opcodes: bytes,
+        deadline: float,
+    ) -> None:
+        """Query many servers and stream their results as NDJSON, in completion order."""
+        end = trio.current_time() + deadline
+        pending = Counter(targets)
+        remaining = len(targets)
+        with trio.move_on_at(end + SEND_TIMEOUT):
+            request.streaming = True
+            await stream.send_all(_head(200, "application/x-ndjson"))
+            async with self.__scan(targets, opcodes, deadline) as results:
+                while remaining:
+                    ready: list[SAMPQuery_ScanResult] = []
+                    with trio.move_on_at(end):
+                        ready.append(await results.receive())
+                    if not ready:
+                        break
+                    # every result ready at once goes in one chunk
+                    while True:
+                        try:
+                            ready.append(results.receive_nowait())
+                        except (trio.WouldBlock, trio.EndOfChannel):
+                            break
+                    for result in ready:
+                        pending[result.ip, result.port] -= 1
+                    remaining -= len(ready)
+                    await stream.send_all(_chunk(ready))
+            expired = [_expired(target, opcodes) for target, count in pending.items() for _ in range(count)]
+            if expired:
+                await stream.send_all(_chunk(expired))
+            await stream.send_all(b"0\r\n\r\n")
+
+    def __scan(
+        self, targets: list[SAMPQuery_Target], opcodes: bytes, deadline: float
+    ) -> AbstractAsyncContextManager[trio.MemoryReceiveChannel[SAMPQuery_ScanResult]]:
+        """Scan servers over the sockets of the gateway."""
+        scanner = SAMPQuery_Scanner(
+            opcodes=opcodes,
+            concurrency=self.concurrency,
+            timeout=min(self.timeout, deadline),
+            codepage=self.codepage,
+            resolver=self.resolver,
+            limiter=self.limiter,
+        )
+        return scanner.scan(targets, self.__dispatchers)
+
+
+async def _read_head(stream: trio.SocketStream) -> tuple[bytes, bytes]:
+    """Read up to the end of the headers; return them and the start of the body (empty if the client left)."""
+    data = bytearray()
+    while True:
+        end = data.find(b"\r\n\r\n")
+        if end >= 0:
+            return bytes(data[:end]), bytes(data[end + 4:])
+        if len(data) > MAX_HEAD:
+            await _send_json(stream, 431, {"error": "the request headers are too large"})
+            return b"", b""
+        chunk = await stream.receive_some(4096)
+        if not chunk:
+            return b"", b""
+        data += chunk
+
+
+def _expect_method(request: _Request, method: str) -> None:
+    if request.method != method:
+        raise _HTTPError(405, f"{request.path} only accepts {method}")
+
+
+def _expired(target: SAMPQuery_Target, opcodes: bytes) -> dict[str, tp.Any]:
+    """The line of a server still unanswered at the deadline."""
+    ip, port = target
+    return {"ip": ip, "port": port, "ok": False, "errors": {chr(opcode): "deadline" for opcode in opcodes}}
+
+
+def _head(status: int, content_type: str, length: int | None = None) -> bytes:
+    """The status line and headers of a response, chunked if its length is not known."""
+    lines = [
+        f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+        f"Content-Type: {content_type}",
+        "Connection: close",
+        "Transfer-Encoding: chunked" if length is None else f"Content-Length: {length}",
+    ]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+
+def _chunk(lines: Sequence[SAMPQuery_ScanResult | dict[str, tp.Any]]) -> bytes:
+    """One HTTP chunk of NDJSON lines."""
+    data = "".join(
+        json.dumps(line.to_dict() if isinstance(line, SAMPQuery_ScanResult) else line, ensure_ascii=False) + "\n"
+        for line in lines
+    ).encode()
+    return f"{len(data):x}\r\n".encode() + data + b"\r\n"
+
+
+async def _send_json(stream: trio.SocketStream, status: int, document: tp.Any) -> None:
+    data = json.dumps(document, ensure_ascii=False).encode()
+    await stream.send_all(_head(status, "application/json", len(data)) + data)
@@ -0,0 +1,219 @@
+"""
+This module is used to measure where the time of the queries goes, and to expose it to Prometheus
+"""
+
+from __future__ import annotations
+
+import typing as tp
+
+from bisect import bisect_left
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+
+from .ratelimit import SAMPQuery_RateLimiter
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+"""The upper bounds of the reply time histograms, in seconds"""
+
+PARSE_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 1e-2)
+"""The upper bounds of the parse time histograms, in seconds"""
+
+
+class SAMPQuery_Instrumentation:
+    """
+    The hooks a client calls while querying, which do nothing here: subclass
+    it and override the ones you need (or use SAMPQuery_Metrics), then pass
+    it as ``instrumentation=`` to the clients. Without instrumentation the
+    client does not even measure.
+
+    ``server`` is ``"ip:port"`` and ``opcode`` the query (``i``, ``r``, ``c``,
+    ``d``, ``p``, ``o``, ``x``) in every hook.
+    """
+
+    def sent(self, server: str, opcode: str, size: int) -> None:
+        """A packet of ``size`` bytes was sent (a query or a retransmission)."""
+
+    def received(self, server: str, opcode: str, size: int, latency: float) -> None:
+        """A reply of ``size`` bytes arrived ``latency`` seconds after its packet was sent."""
+
+    def parsed(self, server: str, opcode: str, duration: float) -> None:
+        """A reply was parsed in ``duration`` seconds."""
+
+    def discarded(self, server: str, count: int) -> None:
+        """``count`` packets were read from the socket and dropped (late or mismatched replies)."""
+
+    def timed_out(self, server: str, opcode: str, attempt: int) -> None:
+        """The ``attempt``-th packet of a query (0 for the first) got no reply in time."""
+
+    def retried(self, server: str, opcode: str, attempt: int) -> None:
+        """The packet of a query was sent again, for the ``attempt``-th time."""
+
+
+@dataclass
+class SAMPQuery_Histogram:
+    """
+    A Prometheus histogram: the count of the values below each bound, their sum and count.
+
+    :param tuple[float, ...] bounds: The upper bounds of the buckets, sorted
+    """
+
+    bounds: tuple[float, ...] = LATENCY_BUCKETS
+    counts: list[int] = field(default_factory=list)
+    sum: float = 0.0
+    count: int = 0
+
+    def __post_init__(self) -> None:
+        if not self.counts:
+            self.counts = [0] * (len(self.bounds) + 1)  # the last one is +Inf
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> Iterator[tuple[str, int]]:
+        """The ``le`` label and the cumulative count of every bucket, +Inf included."""
+        total = 0
+        for bound, count in zip(self.bounds, self.counts):
+            total += count
+            yield repr(bound), total
+        yield "+Inf", self.count
+
+
+Labels = tuple[str, ...]
+
+
+@dataclass
+class SAMPQuery_Metrics(SAMPQuery_Instrumentation):
+    """
+    Collects the hooks of the clients into histograms and counters, by server
+    and opcode, and renders them in the Prometheus text format.
+
+    Example::
+
+        metrics = SAMPQuery_Metrics()
+        client = SAMPQuery_Client("127.0.0.1", 7777, instrumentation=metrics)
+        await client.info()
+        print(metrics.render())
+
+    :param bool servers: Label the series by server too (one series per server, keep it off for big fleets)
+    :param SAMPQuery_RateLimiter | None limiter: A rate limiter whose waits are rendered as well
+    :param tuple[float, ...] latency_buckets: The bounds of the reply time histograms, in seconds
+    :param tuple[float, ...] parse_buckets: The bounds of the parse time histograms, in seconds
+    """
+
+    servers: bool = True
+    limiter: SAMPQuery_RateLimiter | None = None
+    latency_buckets: tuple[float, ...] = LATENCY_BUCKETS
+    parse_buckets: tuple[float, ...] = PARSE_BUCKETS
+    latency: dict[Labels, SAMPQuery_Histogram] = field(default_factory=dict, repr=False)
+    parse: dict[Labels, SAMPQuery_Histogram] = field(default_factory=dict, repr=False)
+    counters: dict[tuple[str, Labels], float] = field(default_factory=dict, repr=False)
+
+    COUNTERS: tp.ClassVar[dict[str, tuple[str, Labels]]] = {
+        "sampquery_sent_packets_total": ("Packets sent, retransmissions included", ("server", "opcode")),
+        "sampquery_sent_bytes_total": ("Bytes sent", ("server", "opcode")),
+        "sampquery_received_bytes_total": ("Bytes of the replies received", ("server", "opcode")),
+        "sampquery_discarded_packets_total": ("Late or mismatched packets dropped", ("server",)),
+        "sampquery_timeouts_total": ("Packets left without reply in time", ("server", "opcode")),
+        "sampquery_retries_total": ("Packets sent again", ("server", "opcode")),
+    }
+
+    def __labels(self, server: str, *rest: str) -> Labels:
+        return (server, *rest) if self.servers else ("", *rest)
+
+    def __count(self, name: str, labels: Labels, value: float = 1) -> None:
+        key = (name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def sent(self, server: str, opcode: str, size: int) -> None:
+        labels = self.__labels(server, opcode)
+        self.__count("sampquery_sent_packets_total", labels)
+        self.__count("sampquery_sent_bytes_total", labels, size)
+
+    def received(self, server: str, opcode: str, size: int, latency: float) -> None:
+        labels = self.__labels(server, opcode)
+        self.__count("sampquery_received_bytes_total", labels, size)
+        histogram = self.latency.get(labels)
+        if histogram is None:
+            histogram = self.latency[labels] = SAMPQuery_Histogram(self.latency_buckets)
+        histogram.observe(latency)
+
+    def parsed(self, server: str, opcode: str, duration: float) -> None:
+        labels = self.__labels(server, opcode)
+        histogram = self.parse.get(labels)
+        if histogram is None:
+            histogram = self.parse[labels] = SAMPQuery_Histogram(self.parse_buckets)
+        histogram.observe(duration)
+
+    def discarded(self, server: str, count: int) -> None:
+        self.__count("sampquery_discarded_packets_total", self.__labels(server), count)
+
+    def timed_out(self, server: str, opcode: str, attempt: int) -> None:
+        self.__count("sampquery_timeouts_total", self.__labels(server, opcode))
+
+    def retried(self, server: str, opcode: str, attempt: int) -> None:
+        self.__count("sampquery_retries_total", self.__labels(server, opcode))
+
+    def render(self) -> str:
+        """
+        Render every series in the Prometheus text exposition format (version 0.0.4).
+
+        :return str: The metrics, to serve on ``/metrics``
+        """
+        lines: list[str] = []
+        self.__render_histograms(
+            lines, "sampquery_reply_seconds", "Time from sending a packet to its reply", self.latency
+        )
+        self.__render_histograms(lines, "sampquery_parse_seconds", "Time to parse a reply", self.parse)
+        for name, (description, names) in self.COUNTERS.items():
+            series = [(labels, value) for (counter, labels), value in self.counters.items() if counter == name]
+            if not series:
+                continue
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in series:
+                lines.append(f"{name}{self.__format(names, labels)} {_number(value)}")
+        if self.limiter is not None:
+            stats = self.limiter.stats
+            for name, description, value in (
+                ("sampquery_ratelimit_packets_total", "Packets paced by the rate limiter", stats.packets),
+                ("sampquery_ratelimit_delayed_total", "Packets that waited for a token", stats.delayed),
+                ("sampquery_ratelimit_wait_seconds_total", "Time spent waiting for tokens", stats.waited),
+                ("sampquery_ratelimit_queued_total", "Queries that waited for an in-flight slot", stats.queued),
+                ("sampquery_ratelimit_queued_seconds_total", "Time spent waiting for in-flight slots", stats.queued_time),
+            ):
+                lines.append(f"# HELP {name} {description}")
+                lines.append(f"# TYPE {name} counter")
+                lines.append(f"{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def __render_histograms(
+        self, lines: list[str], name: str, description: str, histograms: dict[Labels, SAMPQuery_Histogram]
+    ) -> None:
+        if not histograms:
+            return
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} histogram")
+        names = ("server", "opcode")
+        for labels, histogram in histograms.items():
+            for le, count in histogram.cumulative():
+                lines.append(f"{name}_bucket{self.__format(names + ('le',), labels + (le,))} {count}")
+            lines.append(f"{name}_sum{self.__format(names, labels)} {_number(histogram.sum)}")
+            lines.append(f"{name}_count{self.__format(names, labels)} {histogram.count}")
+
+    def __format(self, names: Labels, values: Labels) -> str:
+        pairs = [
+            f'{name}="{_escape(value)}"'
+            for name, value in zip(names, values)
+            if self.servers or name != "server"
+        ]
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
@@ -4,16 +4,30 @@ This module is used to handle the players information data from the server
 
 from __future__ import annotations
 
+import struct
+import typing as tp
+
+from array import array
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass
-from .utils import SAMPQuery_Utils
 
-import struct
+from .decoder import SAMPQuery_Decoder
+from .utils import SAMPQuery_Buffer, SAMPQuery_LazyText, SAMPQuery_Utils
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, only used to vectorize SAMPQuery_PlayerColumns
+    np = None  # type: ignore[assignment, unused-ignore]
+
+PLAYER_LIST_LIMIT = 100
+"""Above this number of players, SA:MP servers leave the ``c`` and ``d`` queries unanswered (open.mp answers them)"""
 
 
 @dataclass
-class SAMPQuery_Player:
+class SAMPQuery_Player(SAMPQuery_LazyText):
     """
-    Class to represent a player into the server
+    Class to represent a player into the server. When parsed from a reply, the
+    name is decoded on first access.
 
     :param str name: The name of the player
     :param int player_id: The ID of the player
@@ -26,34 +40,89 @@ class SAMPQuery_Player:
     score: int
     ping: int
 
+    SCORE: tp.ClassVar[struct.Struct] = struct.Struct("<i")
+    """The score of a player of the ``c`` query"""
+
+    DETAILS: tp.ClassVar[struct.Struct] = struct.Struct("<ii")
+    """The score and ping of a player of the ``d`` query"""
+
     @classmethod
-    def from_data(cls, data: bytes) -> tuple[SAMPQuery_Player, bytes]:
+    def from_data(
+        cls, data: bytes, decoder: SAMPQuery_Decoder | None = None
+    ) -> tuple[SAMPQuery_Player, bytes]:
         """
         Creates an instance of SAMPQuery_Player from raw data
 
         :param bytes data: The raw data to parse into player information
+        :param decoder: The decoder of the server the data comes from
+        :type decoder: SAMPQuery_Decoder | None
         :return tuple[SAMPQuery_Player, bytes]: An instance of SAMPQuery_Player with the parsed data and the remaining data
         """
-        name, data, _ = SAMPQuery_Utils.unpack_string(data, "B")
-        score = struct.unpack_from("<i", data)[0]
-        data = data[4:]
-        return cls(name=name, player_id=0, score=score, ping=0), data
+        player, offset = cls.from_buffer(memoryview(data), 0, decoder)
+        return player, data[offset:]
 
     @classmethod
-    def from_detailed_data(cls, data: bytes) -> tuple[SAMPQuery_Player, bytes]:
+    def from_buffer(
+        cls, view: memoryview, offset: int, decoder: SAMPQuery_Decoder | None = None
+    ) -> tuple[SAMPQuery_Player, int]:
+        """
+        Creates an instance of SAMPQuery_Player from the player found at ``offset`` of a ``c`` reply
+
+        :param memoryview view: The raw data of the whole reply
+        :param int offset: The offset of the player in the data
+        :param decoder: The decoder of the server the data comes from
+        :type decoder: SAMPQuery_Decoder | None
+        :return tuple[SAMPQuery_Player, int]: The parsed player and the offset of the next one
+        """
+        name, offset = SAMPQuery_Utils.unpack_raw_string_from(view, offset, "B")
+        score = cls.SCORE.unpack_from(view, offset)[0]
+        player = cls.with_raw_texts(
+            decoder or SAMPQuery_Decoder(), {"name": name}, player_id=0, score=score, ping=0
+        )
+        return player, offset + cls.SCORE.size
+
+    @classmethod
+    def from_detailed_data(
+        cls, data: bytes, decoder: SAMPQuery_Decoder | None = None
+    ) -> tuple[SAMPQuery_Player, bytes]:
         """
         Creates an instance of SAMPQuery_Player from detailed player data (opcode 'd').
 
         :param bytes data: The raw data to parse into player information.
+        :param decoder: The decoder of the server the data comes from.
+        :type decoder: SAMPQuery_Decoder | None
         :return tuple[SAMPQuery_Player, bytes]: An instance of SAMPQuery_Player with the parsed data and the remaining data.
         """
         if len(data) < 10:
             raise ValueError("Insufficient data to unpack detailed player information.")
+        player, offset = cls.from_detailed_buffer(memoryview(data), 0, decoder)
+        return player, data[offset:]
 
-        name, data, _ = SAMPQuery_Utils.unpack_string(data, "B")
-        player_id, score, ping = struct.unpack_from("<Bii", data)
-        data = data[9:]
-        return cls(name=name, player_id=player_id, score=score, ping=ping), data
+    @classmethod
+    def from_detailed_buffer(
+        cls, view: memoryview, offset: int, decoder: SAMPQuery_Decoder | None = None
+    ) -> tuple[SAMPQuery_Player, int]:
+        """
+        Creates an instance of SAMPQuery_Player from the player found at ``offset`` of a ``d`` reply
+
+        :param memoryview view: The raw data of the whole reply
+        :param int offset: The offset of the player in the data
+        :param decoder: The decoder of the server the data comes from
+        :type decoder: SAMPQuery_Decoder | None
+        :return tuple[SAMPQuery_Player, int]: The parsed player and the offset of the next one
+        :raises ValueError: If the data of the player is incomplete
+        """
+        if offset + 1 + cls.DETAILS.size > len(view):
+            raise ValueError("Insufficient data to unpack detailed player information.")
+        player_id = view[offset]
+        name, offset = SAMPQuery_Utils.unpack_raw_string_from(view, offset + 1, "B")
+        if offset + cls.DETAILS.size > len(view):
+            raise ValueError(f"Incomplete score and ping data for player {player_id}.")
+        score, ping = cls.DETAILS.unpack_from(view, offset)
+        player = cls.with_raw_texts(
+            decoder or SAMPQuery_Decoder(), {"name": name}, player_id=player_id, score=score, ping=ping
+        )
+        return player, offset + cls.DETAILS.size
 
 
 @dataclass
@@ -62,57 +131,314 @@ class SAMPQuery_PlayerList:
     Class to represent a list of players into the server
 
     :param list[SAMPQuery_Player] players: The list of players
+    :param int | None count: The number of players announced by the server, more than ``len(players)`` if it cut the list short
     """
 
     players: list[SAMPQuery_Player]
+    count: int | None = None
+
+    COUNT: tp.ClassVar[struct.Struct] = struct.Struct("<H")
+    """The player count at the start of the ``c`` and ``d`` replies"""
+
+    def __iter__(self) -> Iterator[SAMPQuery_Player]:
+        return iter(self.players)
+
+    def __len__(self) -> int:
+        return len(self.players)
+
+    @property
+    def truncated(self) -> bool:
+        """True if the server announced more players than it sent"""
+        return self.count is not None and self.count > len(self.players)
 
     @classmethod
-    def from_data(cls, data: bytes) -> SAMPQuery_PlayerList:
+    def from_data(
+        cls, data: SAMPQuery_Buffer, decoder: SAMPQuery_Decoder | None = None
+    ) -> SAMPQuery_PlayerList:
         """
         Creates an instance of SAMPQuery_PlayerList from raw data
 
-        :param bytes data: The raw data to parse into player list information
+        :param SAMPQuery_Buffer data: The raw data to parse into player list information
+        :param decoder: The decoder of the server the data comes from
+        :type decoder: SAMPQuery_Decoder | None
         :return SAMPQuery_PlayerList: An instance of SAMPQuery_PlayerList with the parsed data
         """
-        pcount = struct.unpack_from("<H", data)[0]
-        data = data[2:]
-        players = []
-        for _ in range(pcount):
-            player, data = SAMPQuery_Player.from_data(data)
-            players.append(player)
-        assert not data
-        return cls(players=players)
+        view = memoryview(data)
+        return cls.from_entries(_iter_players(view), decoder, _announced(view))
 
     @classmethod
-    def from_detailed_data(cls, data: bytes) -> SAMPQuery_PlayerList:
+    def from_detailed_data(
+        cls, data: SAMPQuery_Buffer, decoder: SAMPQuery_Decoder | None = None
+    ) -> SAMPQuery_PlayerList:
         """
         Parses the raw data into a list of players with detailed information.
 
-        :param bytes data: The raw data to parse.
+        :param SAMPQuery_Buffer data: The raw data to parse.
+        :param decoder: The decoder of the server the data comes from.
+        :type decoder: SAMPQuery_Decoder | None
         :return SAMPQuery_PlayerList: A list of players parsed from the data.
         """
-        if not data:
-            return cls(players=[])
-        clients = struct.unpack_from("<H", data, 0)[0]
-        offset = 2
-        players = []
-        for _ in range(clients):
-            if offset >= len(data):
-                print(f"Warning: Incomplete data for player {_ + 1}/{clients}.")
-                break
-            player_id = struct.unpack_from("<B", data, offset)[0]
-            offset += 1
-            name, offset = SAMPQuery_Utils.unpack_string_with_offset(data, offset, "B")
-            if offset + 4 > len(data):
-                print(f"Warning: Incomplete score data for player {name}.")
-                break
-            score = struct.unpack_from("<i", data, offset)[0]
-            offset += 4
-            if offset + 4 > len(data):
-                print(f"Warning: Incomplete ping data for player {name}.")
-                break
-            ping = struct.unpack_from("<i", data, offset)[0]
-            offset += 4
-            player = SAMPQuery_Player(name=name, player_id=player_id, score=score, ping=ping)
-            players.append(player)
-        return cls(players=players)
\ No newline at end of file
+        view = memoryview(data)
+        return cls.from_entries(_iter_detailed_players(view), decoder, _announced(view))
+
+    @classmethod
+    def from_entries(
+        cls,
+        entries: Iterable[SAMPQuery_RawPlayer],
+        decoder: SAMPQuery_Decoder | None = None,
+        count: int | None = None,
+    ) -> SAMPQuery_PlayerList:
+        """
+        Creates an instance of SAMPQuery_PlayerList from undecoded players.
+
+        :param entries: The ``(player_id, raw name, score, ping)`` of every player
+        :param decoder: The decoder of the server the data comes from
+        :type decoder: SAMPQuery_Decoder | None
+        :param count: The number of players announced by the server
+        :type count: int | None
+        :return SAMPQuery_PlayerList: The list of players
+        """
+        decoder = decoder or SAMPQuery_Decoder()
+        entries = [(player_id, bytes(name), score, ping) for player_id, name, score, ping in entries]
+        decoder.learn(name for _, name, _, _ in entries)
+        return cls(players=[
+            SAMPQuery_Player.with_raw_texts(
+                decoder, {"name": name}, player_id=player_id, score=score, ping=ping
+            )
+            for player_id, name, score, ping in entries
+        ], count=count)
+
+
+class SAMPQuery_PlayerColumns:
+    """
+    A columnar list of players, for keeping many large rosters in memory. The
+    ids, scores and pings are stored in arrays and the undecoded names in a
+    single buffer, so a roster costs little more than its raw data. It iterates
+    like a SAMPQuery_PlayerList, building the SAMPQuery_Player on the fly.
+
+    :param array ids: The ID of every player
+    :param array scores: The score of every player
+    :param array pings: The ping of every player
+    :param bytes names: The raw names of every player, one after the other
+    :param array offsets: Where every name starts in ``names``, plus the end of the last one
+    :param SAMPQuery_Decoder decoder: The decoder of the server the names come from
+    :param int | None count: The number of players announced by the server, more than ``len(columns)`` if it cut the list short
+    """
+
+    __slots__ = ("ids", "scores", "pings", "names", "offsets", "decoder", "count")
+
+    def __init__(
+        self,
+        ids: array[int],
+        scores: array[int],
+        pings: array[int],
+        names: bytes,
+        offsets: array[int],
+        decoder: SAMPQuery_Decoder,
+        count: int | None = None,
+    ) -> None:
+        self.ids = ids
+        self.scores = scores
+        self.pings = pings
+        self.names = names
+        self.offsets = offsets
+        self.decoder = decoder
+        self.count = count
+
+    def __repr__(self) -> str:
+        return f"SAMPQuery_PlayerColumns(<{len(self)} players>)"
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    @property
+    def truncated(self) -> bool:
+        """True if the server announced more players than it sent"""
+        return self.count is not None and self.count > len(self)
+
+    def __iter__(self) -> Iterator[SAMPQuery_Player]:
+        for index in range(len(self)):
+            yield self[index]
+
+    @tp.overload
+    def __getitem__(self, index: int) -> SAMPQuery_Player: ...
+
+    @tp.overload
+    def __getitem__(self, index: slice) -> SAMPQuery_PlayerColumns: ...
+
+    def __getitem__(self, index: int | slice) -> SAMPQuery_Player | SAMPQuery_PlayerColumns:
+        if isinstance(index, slice):
+            return self.take(range(*index.indices(len(self))))
+        index = self.__position(index)
+        return SAMPQuery_Player(
+            name=self.name(index),
+            player_id=self.ids[index],
+            score=self.scores[index],
+            ping=self.pings[index],
+        )
+
+    def __position(self, index: int) -> int:
+        """The position of a player, counted from the end if ``index`` is negative."""
+        position = index + len(self) if index < 0 else index
+        if not 0 <= position < len(self):
+            raise IndexError("player index out of range")
+        return position
+
+    @property
+    def players(self) -> list[SAMPQuery_Player]:
+        """The players as a list, like SAMPQuery_PlayerList.players"""
+        return list(self)
+
+    def name(self, index: int) -> str:
+        """
+        Decode the name of one player.
+
+        :param int index: The index of the player
+        :return str: The name of the player
+        """
+        index = self.__position(index)
+        return self.decoder.decode(self.names[self.offsets[index]:self.offsets[index + 1]])[0]
+
+    @classmethod
+    def from_data(
+        cls, data: SAMPQuery_Buffer, decoder: SAMPQuery_Decoder | None = None
+    ) -> SAMPQuery_PlayerColumns:
+        """
+        Creates the columns from the reply of a ``c`` query
+
+        :param SAMPQuery_Buffer data: The raw data to parse
+        :param decoder: The decoder of the server the data comes from
+        :type decoder: SAMPQuery_Decoder | None
+        :return SAMPQuery_PlayerColumns: The parsed players
+        """
+        view = memoryview(data)
+        return cls.from_entries(_iter_players(view), decoder, _announced(view))
+
+    @classmethod
+    def from_detailed_data(
+        cls, data: SAMPQuery_Buffer, decoder: SAMPQuery_Decoder | None = None
+    ) -> SAMPQuery_PlayerColumns:
+        """
+        Creates the columns from the reply of a ``d`` query
+
+        :param SAMPQuery_Buffer data: The raw data to parse
+        :param decoder: The decoder of the server the data comes from
+        :type decoder: SAMPQuery_Decoder | None
+        :return SAMPQuery_PlayerColumns: The parsed players
+        """
+        view = memoryview(data)
+        return cls.from_entries(_iter_detailed_players(view), decoder, _announced(view))
+
+    @classmethod
+    def from_entries(
+        cls,
+        entries: Iterable[SAMPQuery_RawPlayer],
+        decoder: SAMPQuery_Decoder | None = None,
+        count: int | None = None,
+    ) -> SAMPQuery_PlayerColumns:
+        """
+        Creates the columns from undecoded players.
+
+        :param entries: The ``(player_id, raw name, score, ping)`` of every player
+        :param decoder: The decoder of the server the data comes from
+        :type decoder: SAMPQuery_Decoder | None
+        :param count: The number of players announced by the server
+        :type count: int | None
+        :return SAMPQuery_PlayerColumns: The players
+        """
+        ids, scores, pings = array("H"), array("i"), array("i")
+        buffer, offsets = bytearray(), array("I", [0])
+        for player_id, name, score, ping in entries:
+            ids.append(player_id)
+            scores.append(score)
+            pings.append(ping)
+            buffer += name
+            offsets.append(len(buffer))
+        names = bytes(buffer)
+        decoder = decoder or SAMPQuery_Decoder()
+        decoder.learn([names])
+        return cls(ids, scores, pings, names, offsets, decoder, count)
+
+    def take(self, indices: Iterable[int]) -> SAMPQuery_PlayerColumns:
+        """
+        Select some players.
+
+        :param indices: The indices of the players to keep
+        :return SAMPQuery_PlayerColumns: The selected players
+        """
+        offsets = self.offsets
+        return SAMPQuery_PlayerColumns.from_entries(
+            (
+                (self.ids[i], self.names[offsets[i]:offsets[i + 1]], self.scores[i], self.pings[i])
+                for i in (self.__position(int(i)) for i in indices)
+            ),
+            self.decoder,
+        )
+
+    def with_score(self, min_score: int) -> SAMPQuery_PlayerColumns:
+        """
+        Select the players whose score is greater than or equal to ``min_score``,
+        vectorized with NumPy when it is installed.
+
+        :param int min_score: The minimum score
+        :return SAMPQuery_PlayerColumns: The selected players
+        """
+        if np is not None:
+            return self.take(np.flatnonzero(np.frombuffer(self.scores, dtype=np.intc) >= min_score))
+        return self.take(i for i, score in enumerate(self.scores) if score >= min_score)
+
+    def to_numpy(self) -> dict[str, tp.Any]:
+        """
+        Expose the numeric columns as NumPy arrays, without copying them.
+
+        :return dict[str, numpy.ndarray]: The ``player_id``, ``score`` and ``ping`` columns
+        :raises ImportError: If NumPy is not installed
+        """
+        if np is None:
+            raise ImportError("NumPy is required, install it with: pip install py_sampquery[numpy]")
+        return {
+            "player_id": np.frombuffer(self.ids, dtype=np.uint16),
+            "score": np.frombuffer(self.scores, dtype=np.intc),
+            "ping": np.frombuffer(self.pings, dtype=np.intc),
+        }
+
+
+SAMPQuery_RawPlayer = tuple[int, SAMPQuery_Buffer, int, int]
+"""The ``(player_id, raw name, score, ping)`` of a player, the name possibly a view of the reply"""
+
+
+def _announced(view: memoryview) -> int:
+    """The player count at the start of a ``c`` or ``d`` reply, 0 for an empty one."""
+    if len(view) < SAMPQuery_PlayerList.COUNT.size:
+        return 0
+    return tp.cast(int, SAMPQuery_PlayerList.COUNT.unpack_from(view)[0])
+
+
+def _iter_players(view: memoryview) -> Iterator[SAMPQuery_RawPlayer]:
+    """Walk the players of a ``c`` reply, stopping at the first incomplete one."""
+    if not view:
+        return
+    pcount = _announced(view)
+    offset = SAMPQuery_PlayerList.COUNT.size
+    score = SAMPQuery_Player.SCORE
+    for _ in range(pcount):
+        if offset >= len(view) or offset + 1 + view[offset] + score.size > len(view):
+            return  # the list was cut short, see ``count``
+        name, offset = SAMPQuery_Utils.unpack_raw_string_from(view, offset, "B")
+        yield 0, name, score.unpack_from(view, offset)[0], 0
+        offset += score.size
+    assert offset == len(view)
+
+
+def _iter_detailed_players(view: memoryview) -> Iterator[SAMPQuery_RawPlayer]:
+    """Walk the players of a ``d`` reply, stopping at the first incomplete one."""
+    clients = _announced(view)
+    offset = SAMPQuery_PlayerList.COUNT.size
+    details = SAMPQuery_Player.DETAILS
+    for _ in range(clients):
+        if offset + 2 + details.size > len(view) or offset + 2 + view[offset + 1] + details.size > len(view):
+            return  # the list was cut short, see ``count``
+        player_id = view[offset]
+        name, offset = SAMPQuery_Utils.unpack_raw_string_from(view, offset + 1, "B")
+        yield (player_id, name, *details.unpack_from(view, offset))
+        offset += details.size
@@ -0,0 +1,274 @@
+"""
+This module is used to measure the latency and the loss of many servers with concurrent pings
+"""
+
+from __future__ import annotations
+
+import math
+import random
+import typing as tp
+
+from array import array
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+import trio
+
+from .buffers import udp_socket
+from .dispatcher import SAMPQuery_Dispatcher
+from .ratelimit import SAMPQuery_RateLimiter
+from .resolver import SAMPQuery_Resolver
+from .scanner import SAMPQuery_Target
+from .utils import SAMPQuery_Utils
+
+PENDING = -1.0
+"""A probe still waiting for its reply (or a slot not used yet)"""
+
+LOST = math.nan
+"""A probe left without reply"""
+
+
+@dataclass
+class SAMPQuery_PingStats:
+    """
+    The latency of a server over the last probes
+
+    :param int sent: The number of probes answered or lost
+    :param int received: The number of probes answered
+    :param float loss: The ratio of probes lost (0.05 is 5%)
+    :param float | None min: The shortest round trip, in seconds
+    :param float | None avg: The average round trip, in seconds
+    :param float | None p50: The median round trip, in seconds
+    :param float | None p95: The round trip 95% of the probes were faster than, in seconds
+    :param float | None max: The longest round trip, in seconds
+    :param float | None jitter: The average difference between two consecutive round trips, in seconds
+    """
+
+    sent: int
+    received: int
+    loss: float
+    min: float | None = None
+    avg: float | None = None
+    p50: float | None = None
+    p95: float | None = None
+    max: float | None = None
+    jitter: float | None = None
+
+
+class SAMPQuery_PingWindow:
+    """
+    The round trips of the last ``size`` probes of a server, in a ring of
+    fixed size: probing forever takes constant memory.
+
+    :param int size: The number of probes kept
+    """
+
+    __slots__ = ("size", "sent", "received", "__samples")
+
+    def __init__(self, size: int = 1024) -> None:
+        if size < 1:
+            raise ValueError("A window holds at least one probe")
+        self.size = size
+        self.sent = 0
+        """Probes sent since the start"""
+        self.received = 0
+        """Probes answered since the start"""
+        self.__samples = array("d", [PENDING]) * size
+
+    def start(self) -> int:
+        """
+        Account a new probe.
+
+        :return int: Its sequence number, to report its outcome with
+        """
+        sequence = self.sent
+        self.__samples[sequence % self.size] = PENDING
+        self.sent += 1
+        return sequence
+
+    def finish(self, sequence: int, rtt: float | None) -> None:
+        """
+        Report the outcome of a probe.
+
+        :param int sequence: The sequence number given by ``start``
+        :param rtt: Its round trip in seconds, None if it was lost
+        :type rtt: float | None
+        """
+        if self.sent - sequence > self.size:
+            return  # already out of the window
+        if rtt is None:
+            self.__samples[sequence % self.size] = LOST
+        else:
+            self.__samples[sequence % self.size] = rtt
+            self.received += 1
+
+    def stats(self) -> SAMPQuery_PingStats:
+        """
+        Summarize the probes of the window whose outcome is known.
+
+        :return SAMPQuery_PingStats: Their loss, percentiles and jitter
+        """
+        first = max(0, self.sent - self.size)
+        ordered = [self.__samples[sequence % self.size] for sequence in range(first, self.sent)]
+        done = [sample for sample in ordered if sample != PENDING]
+        rtts = [sample for sample in done if not math.isnan(sample)]
+        if not done:
+            return SAMPQuery_PingStats(sent=0, received=0, loss=0.0)
+        stats = SAMPQuery_PingStats(sent=len(done), received=len(rtts), loss=1 - len(rtts) / len(done))
+        if not rtts:
+            return stats
+        # in the order the probes were sent, whatever the order of their replies
+        differences = [abs(current - previous) for previous, current in zip(rtts, rtts[1:])]
+        stats.jitter = sum(differences) / len(differences) if differences else 0.0
+        stats.avg = sum(rtts) / len(rtts)
+        rtts.sort()
+        stats.min, stats.max = rtts[0], rtts[-1]
+        stats.p50 = rtts[min(len(rtts) - 1, int(0.5 * len(rtts)))]
+        stats.p95 = rtts[min(len(rtts) - 1, int(0.95 * len(rtts)))]
+        return stats
+
+
+@dataclass
+class SAMPQuery_Prober:
+    """
+    Pings many servers over one socket, one ``p`` packet every ``interval``
+    seconds per server without waiting for the previous reply: every probe
+    has its own nonce, so several are in flight at once, and a probe left
+    without reply after ``timeout`` seconds counts as lost instead of
+    raising. The outcome of the last ``window`` probes of each server is kept.
+
+    Example::
+
+        prober = SAMPQuery_Prober(interval=0.05)
+        stats = await prober.measure([("127.0.0.1", 7777)], count=100)  # about 5 seconds
+        print(stats["127.0.0.1", 7777].p95)
+
+    Or, as a monitor::
+
+        prober = SAMPQuery_Prober(interval=1.0, window=300)
+        await nursery.start(prober.run, targets)
+        ...
+        print(prober.stats("127.0.0.1", 7777))
+
+    :param float interval: Seconds between two probes of a server
+    :param float timeout: Seconds after which a probe is lost
+    :param int window: The number of probes kept per server
+    :param SAMPQuery_RateLimiter | None limiter: Paces the probes, e.g across a big fleet
+    :param SAMPQuery_Resolver resolver: Resolves the hostnames among the targets, the resolver of the process by default
+    :param dict[SAMPQuery_Target, SAMPQuery_PingWindow] windows: The probes of every server, by target as given
+    """
+
+    interval: float = 1.0
+    timeout: float = 2.0
+    window: int = 1024
+    limiter: SAMPQuery_RateLimiter | None = field(default=None, repr=False)
+    resolver: SAMPQuery_Resolver = field(default_factory=lambda: SAMPQuery_Resolver.default, repr=False)
+    windows: dict[SAMPQuery_Target, SAMPQuery_PingWindow] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.interval <= 0 or self.timeout <= 0:
+            raise ValueError("The interval and the timeout must be positive")
+
+    def stats(self, ip: str, port: int) -> SAMPQuery_PingStats:
+        """
+        Summarize the last probes of a server.
+
+        :param str ip: The IP (or hostname) of the server, as given in the targets
+        :param int port: The port of the server
+        :return SAMPQuery_PingStats: Its latency, jitter and loss
+        :raises KeyError: If the server is not probed
+        """
+        return self.windows[ip, port].stats()
+
+    async def measure(
+        self, targets: Iterable[SAMPQuery_Target], count: int = 10
+    ) -> dict[SAMPQuery_Target, SAMPQuery_PingStats]:
+        """
+        Probe servers ``count`` times each and wait for the last replies.
+
+        :param targets: The ``(ip, port)`` of the servers
+        :param int count: The number of probes per server
+        :return dict[SAMPQuery_Target, SAMPQuery_PingStats]: The statistics of every server
+        """
+        targets = list(targets)
+        await self.run(targets, count)
+        return {target: self.windows[target].stats() for target in targets}
+
+    async def run(
+        self,
+        targets: Iterable[SAMPQuery_Target],
+        count: int | None = None,
+        *,
+        task_status: tp.Any = trio.TASK_STATUS_IGNORED,
+    ) -> None:
+        """
+        Probe servers until cancelled, or ``count`` times each.
+
+        :param targets: The ``(ip, port)`` of the servers
+        :param count: The number of probes per server, None to probe forever
+        :type count: int | None
+        :param task_status: Given by ``nursery.start``, which returns once every server is being probed
+        """
+        _socket, raw = udp_socket()
+        with _socket:
+            await _socket.bind(("0.0.0.0", 0))
+            dispatcher = SAMPQuery_Dispatcher(_socket, raw=raw)
+            async with trio.open_nursery() as nursery:
+                await nursery.start(dispatcher.run)
+                async with trio.open_nursery() as probes:
+                    for target in targets:
+                        window = self.windows.get(target)
+                        if window is None:
+                            window = self.windows[target] = SAMPQuery_PingWindow(self.window)
+                        probes.start_soon(self.__probe_target, dispatcher, target, window, count)
+                    task_status.started()
+                nursery.cancel_scope.cancel()
+
+    async def __probe_target(
+        self,
+        dispatcher: SAMPQuery_Dispatcher,
+        target: SAMPQuery_Target,
+        window: SAMPQuery_PingWindow,
+        count: int | None,
+    ) -> None:
+        """Send the probes of one server, every ``interval`` seconds."""
+        ip, port = target
+        try:
+            address = await self.resolver.resolve(ip)
+        except OSError:
+            return
+        prefix = SAMPQuery_Utils.build_prefix(address, port) + b"p"
+        nonce = random.getrandbits(32)
+        # spread the servers over the interval, so their probes do not leave in bursts
+        await trio.sleep(random.uniform(0, self.interval))
+        async with trio.open_nursery() as nursery:
+            deadline = trio.current_time()
+            sent = 0
+            while count is None or sent < count:
+                nonce = (nonce + 1) & 0xFFFFFFFF
+                packet = prefix + nonce.to_bytes(4, "little")
+                if self.limiter is not None:
+                    await self.limiter.acquire(address)
+                nursery.start_soon(self.__probe, dispatcher, packet, (address, port), window, window.start())
+                sent += 1
+                if sent == count:
+                    break
+                deadline += self.interval
+                await trio.sleep_until(deadline)
+
+    async def __probe(
+        self,
+        dispatcher: SAMPQuery_Dispatcher,
+        packet: bytes,
+        address: tuple[str, int],
+        window: SAMPQuery_PingWindow,
+        sequence: int,
+    ) -> None:
+        """Send one probe and report its round trip, or its loss."""
+        start = trio.current_time()
+        try:
+            await dispatcher.query(packet, packet, self.timeout, address)
+        except TimeoutError:
+            window.finish(sequence, None)
+        else:
+            window.finish(sequence, trio.current_time() - start)
@@ -0,0 +1,176 @@
+"""
+This module is used to pace the packets sent to the servers, globally and per IP
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+import trio
+
+
+@dataclass
+class SAMPQuery_TokenBucket:
+    """
+    A token bucket: ``rate`` tokens are added per second, up to ``burst``, and
+    every packet takes one. A packet finding the bucket empty reserves the
+    next token anyway, and is told how long to wait for it, so the packets
+    waiting on a bucket leave in order and at its rate.
+
+    :param float rate: Tokens added per second
+    :param float burst: The maximum number of tokens, the packets that can leave at once
+    """
+
+    rate: float
+    burst: float = 1.0
+    __tokens: float = field(default=-1.0, init=False, repr=False)
+    __stamp: float = field(default=0.0, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.rate <= 0 or self.burst < 1:
+            raise ValueError("The rate must be positive and the burst at least 1")
+        self.__tokens = self.burst
+
+    def reserve(self, now: float) -> float:
+        """
+        Take a token.
+
+        :param float now: The current time, in seconds
+        :return float: The seconds to wait before sending, 0 if a token was available
+        """
+        if now > self.__stamp:
+            self.__tokens = min(self.burst, self.__tokens + (now - self.__stamp) * self.rate)
+            self.__stamp = now
+        self.__tokens -= 1
+        return 0.0 if self.__tokens >= 0 else -self.__tokens / self.rate
+
+
+@dataclass
+class SAMPQuery_RateLimitStats:
+    """
+    The waits imposed by a rate limiter, to tune it.
+
+    :param int packets: The number of packets paced
+    :param int delayed: The number of packets that had to wait for a token
+    :param float waited: The total time spent waiting for tokens, in seconds
+    :param float max_wait: The longest wait for a token, in seconds
+    :param int queued: The number of queries that had to wait for an in-flight slot
+    :param float queued_time: The total time spent waiting for in-flight slots, in seconds
+    """
+
+    packets: int = 0
+    delayed: int = 0
+    waited: float = 0.0
+    max_wait: float = 0.0
+    queued: int = 0
+    queued_time: float = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        """The average wait of a packet for a token, in seconds"""
+        return self.waited / self.packets if self.packets else 0.0
+
+
+@dataclass
+class SAMPQuery_RateLimiter:
+    """
+    Paces the packets sent by the clients and scanners sharing it, so a burst
+    of queries does not overflow the network queues or trip the query flood
+    protection of the servers (whose dropped replies would look like
+    timeouts). Every limit is optional.
+
+    Example::
+
+        limiter = SAMPQuery_RateLimiter(pps=2000, per_ip=50, inflight=512)
+        clients = [SAMPQuery_Client(ip, port, limiter=limiter) for ip, port in servers]
+
+    :param float | None pps: The packets per second sent overall
+    :param float burst: The packets sent at once overall before the ``pps`` pace applies
+    :param float | None per_ip: The packets per second sent to one IP (the servers on its ports share it)
+    :param float per_ip_burst: The packets sent at once to one IP before the ``per_ip`` pace applies
+    :param int | None inflight: The maximum number of queries waiting for their reply
+    :param int maxips: The maximum number of IPs tracked, the least recently used are forgotten (with a full bucket, which they would have by then)
+    :param SAMPQuery_RateLimitStats stats: The waits imposed so far
+    """
+
+    pps: float | None = None
+    burst: float = 32.0
+    per_ip: float | None = None
+    per_ip_burst: float = 4.0
+    inflight: int | None = None
+    maxips: int = 65536
+    stats: SAMPQuery_RateLimitStats = field(default_factory=SAMPQuery_RateLimitStats)
+    __global: SAMPQuery_TokenBucket | None = field(default=None, init=False, repr=False)
+    __buckets: OrderedDict[str, SAMPQuery_TokenBucket] = field(
+        default_factory=OrderedDict, init=False, repr=False
+    )
+    __slots: trio.Semaphore | None = field(default=None, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.pps is not None:
+            self.__global = SAMPQuery_TokenBucket(self.pps, self.burst)
+        if self.per_ip is not None:
+            SAMPQuery_TokenBucket(self.per_ip, self.per_ip_burst)  # validate now, not on first packet
+        if self.inflight is not None:
+            if self.inflight < 1:
+                raise ValueError("inflight must be at least 1")
+            self.__slots = trio.Semaphore(self.inflight)
+
+    def reserve(self, ip: str, now: float) -> float:
+        """
+        Take the tokens of a packet to ``ip``.
+
+        :param str ip: The IP of the server
+        :param float now: The current time, in seconds
+        :return float: The seconds to wait before sending
+        """
+        delay = 0.0
+        if self.__global is not None:
+            delay = self.__global.reserve(now)
+        if self.per_ip is not None:
+            bucket = self.__buckets.get(ip)
+            if bucket is None:
+                bucket = self.__buckets[ip] = SAMPQuery_TokenBucket(self.per_ip, self.per_ip_burst)
+                if len(self.__buckets) > self.maxips:
+                    self.__buckets.popitem(last=False)
+            else:
+                self.__buckets.move_to_end(ip)
+            delay = max(delay, bucket.reserve(now))
+        stats = self.stats
+        stats.packets += 1
+        if delay:
+            stats.delayed += 1
+            stats.waited += delay
+            stats.max_wait = max(stats.max_wait, delay)
+        return delay
+
+    async def acquire(self, ip: str) -> None:
+        """
+        Wait until a packet can be sent to ``ip``.
+
+        :param str ip: The IP of the server
+        """
+        delay = self.reserve(ip, trio.current_time())
+        if delay:
+            await trio.sleep(delay)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one of the ``inflight`` slots while the context is open (a no-op without the limit)."""
+        if self.__slots is None:
+            yield
+            return
+        if self.__slots.value:
+            self.__slots.acquire_nowait()
+        else:
+            start = trio.current_time()
+            await self.__slots.acquire()
+            self.stats.queued += 1
+            self.stats.queued_time += trio.current_time() - start
+        try:
+            yield
+        finally:
+            self.__slots.release()
@@ -0,0 +1,218 @@
+"""
+This module is used to run many RCON commands on a server over one session
+"""
+
+from __future__ import annotations
+
+import struct
+import typing as tp
+
+from collections.abc import Awaitable, Callable, Iterable
+from random import getrandbits
+
+import trio
+
+from .dispatcher import SAMPQuery_Dispatcher
+from .decoder import SAMPQuery_Decoder
+from .exceptions import SAMPQuery_DisabledRCON, SAMPQuery_InvalidRCON, SAMPQuery_InvalidReply
+from .utils import SAMPQuery_Buffer, SAMPQuery_Utils
+
+if tp.TYPE_CHECKING:
+    from .client import SAMPQuery_Client
+    from .rtt import SAMPQuery_RTTEstimator
+
+IDLE = 0.1
+"""The longest pause between two lines of a RCON response, in seconds"""
+
+IDLE_FLOOR = 0.01
+"""The shortest pause between two lines of a RCON response, in seconds"""
+
+
+def idle_gap(rtt: SAMPQuery_RTTEstimator) -> float:
+    """
+    The pause after which a RCON response is complete. Its lines leave the
+    server together, so they only drift apart as much as the round trip
+    varies: twice its variation, between IDLE_FLOOR and IDLE.
+
+    :param SAMPQuery_RTTEstimator rtt: The round trip time of the server
+    :return float: The pause, in seconds
+    """
+    if rtt.rttvar is None:
+        return IDLE
+    return min(max(2 * rtt.rttvar, IDLE_FLOOR), IDLE)
+
+
+def parse_line(data: SAMPQuery_Buffer, decoder: SAMPQuery_Decoder) -> str:
+    """
+    Decode the line a RCON reply carries after its header.
+
+    :param SAMPQuery_Buffer data: The reply, without its header
+    :param SAMPQuery_Decoder decoder: The decoder of the server
+    :return str: The line
+    :raises SAMPQuery_InvalidReply: If the reply holds anything but one line
+    """
+    try:
+        line, end, _ = SAMPQuery_Utils.unpack_string_from(memoryview(data), 0, "H", decoder)
+    except (ValueError, struct.error) as e:
+        raise SAMPQuery_InvalidReply(f"Malformed RCON reply: {e}") from e
+    if end != len(data):
+        raise SAMPQuery_InvalidReply(f"Malformed RCON reply: {len(data) - end} bytes after the line")
+    return line
+
+
+class SAMPQuery_RconSession:
+    """
+    Runs RCON commands on a server through the dispatcher of its client. The
+    session keeps the round trip time estimate of the client (no ping before
+    the commands), gives every command its own nonce so many can be in
+    flight at once, and considers a response complete after a short pause
+    without a new line (see ``idle_gap``) instead of waiting for the whole
+    timeout.
+
+    Open it with ``SAMPQuery_Client.rcon_session()``.
+
+    Example::
+
+        async with client.rcon_session() as session:
+            print(await session.command("players"))
+            for output in await session.pipeline(["kick 3", "kick 7", "say bye"]):
+                print(output)
+
+    :param SAMPQuery_Client client: The client of the server, with its RCON password
+    :param SAMPQuery_Dispatcher dispatcher: The dispatcher reading the socket of the client
+    :param float | None idle: Seconds without a new line after which a response is complete, adapted to the round trip variation by default
+    """
+
+    def __init__(
+        self, client: SAMPQuery_Client, dispatcher: SAMPQuery_Dispatcher, idle: float | None = None
+    ) -> None:
+        if not client.rcon_password:
+            raise SAMPQuery_DisabledRCON(
+                "RCON password is missing. Please provide a valid RCON password."
+            )
+        self.client = client
+        self.dispatcher = dispatcher
+        self.idle = idle
+        self.answered = False
+        """True once the server answered a command, so a command without output is told apart from RCON being disabled"""
+        self.__nonce = getrandbits(32)
+
+    def __next_nonce(self) -> bytes:
+        """A nonce no other command of the session is waiting with."""
+        self.__nonce = (self.__nonce + 1) & 0xFFFFFFFF
+        return self.__nonce.to_bytes(4, "little")
+
+    async def command(self, command: str) -> str:
+        """
+        Run a command.
+
+        :param str command: The command to execute
+        :return str: Its output, empty if it printed nothing
+        :raises SAMPQuery_InvalidRCON: If the RCON password is invalid
+        :raises SAMPQuery_DisabledRCON: If the server never answered a command of the session
+        """
+        client = self.client
+        assert client.prefix and client.rcon_password
+        payload = self.__next_nonce() + client.rcon_password.encode() + command.encode()
+        header = client.prefix + b"x" + payload
+        limiter = client.limiter
+        with self.dispatcher.subscribe(SAMPQuery_Utils.reply_key(header)) as channel:
+
+            async def receive() -> SAMPQuery_Buffer:
+                while True:
+                    data = await channel.receive()
+                    if data[:len(header)] == header:
+                        return data[len(header):]
+
+            if limiter is not None:
+                async with limiter.slot():
+                    await limiter.acquire(client.address or client.ip)
+                    lines = await self.__exchange(header, receive)
+            else:
+                lines = await self.__exchange(header, receive)
+        if not lines:
+            if not self.answered:
+                raise SAMPQuery_DisabledRCON(
+                    "RCON password is missing. Please provide a valid RCON password."
+                )
+            return ""
+        self.answered = True
+        if lines[0].startswith("Invalid RCON password"):
+            raise SAMPQuery_InvalidRCON("Invalid RCON password. Please check your RCON password.")
+        return "\n".join(lines)
+
+    async def pipeline(self, commands: Iterable[str], window: int = 16) -> list[str]:
+        """
+        Run many commands, up to ``window`` of them in flight at once. The server
+        runs them in the order they arrive, which UDP does not guarantee: use
+        ``command()`` for the commands depending on each other.
+
+        :param commands: The commands to execute
+        :param int window: The maximum number of commands waiting for their output
+        :return list[str]: The output of every command, in the order of the commands
+        """
+        commands = list(commands)
+        outputs = [""] * len(commands)
+        limiter = trio.CapacityLimiter(window)
+
+        async def run(index: int, command: str) -> None:
+            async with limiter:
+                outputs[index] = await self.command(command)
+
+        async with trio.open_nursery() as nursery:
+            for index, command in enumerate(commands):
+                nursery.start_soon(run, index, command)
+        return outputs
+
+    async def __exchange(
+        self, header: bytes, receive: Callable[[], Awaitable[SAMPQuery_Buffer]]
+    ) -> list[str]:
+        """Send a command and gather the lines of its response."""
+        client = self.client
+        sent = trio.current_time()
+        await self.dispatcher.socket.send(header)
+        if client.instrumentation is not None:
+            client.instrumentation.sent(f"{client.ip}:{client.port}", "x", len(header))
+        idle = idle_gap(client.rtt) if self.idle is None else self.idle
+        lines, first, size = await read_response(receive, client.rtt.timeout, idle, client, len(header))
+        if first is not None:
+            client.rtt.update(first - sent)
+            if client.instrumentation is not None:
+                client.instrumentation.received(f"{client.ip}:{client.port}", "x", size, first - sent)
+        return lines
+
+
+async def read_response(
+    receive: Callable[[], Awaitable[SAMPQuery_Buffer]],
+    timeout: float,
+    idle: float,
+    client: SAMPQuery_Client,
+    header_size: int = 0,
+) -> tuple[list[str], float | None, int]:
+    """
+    Gather the lines of a RCON response: wait ``timeout`` seconds for the
+    first one, then ``idle`` seconds for each next one.
+
+    :param receive: An async function returning the next reply, without its header
+    :param float timeout: Seconds to wait for the first line
+    :param float idle: Seconds without a new line after which the response is complete
+    :param SAMPQuery_Client client: The client, whose decoder decodes the lines
+    :param int header_size: The size of the header ``receive`` strips from every reply
+    :return: The lines, when the first one arrived (None if none did), and the size of the replies in bytes
+    :raises SAMPQuery_InvalidReply: If a reply is not a RCON line
+    """
+    lines: list[str] = []
+    first = None
+    size = 0
+    wait = timeout
+    while True:
+        data = None
+        with trio.move_on_after(wait):
+            data = await receive()
+        if data is None:
+            return lines, first, size
+        if first is None:
+            first = trio.current_time()
+        size += header_size + len(data)
+        lines.append(parse_line(data, client.decoder))
+        wait = idle
@@ -0,0 +1,155 @@
+"""
+This module is used to share the clients of a process, with a cap on their open sockets
+"""
+
+from __future__ import annotations
+
+import typing as tp
+
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from itertools import islice
+
+import trio
+
+from .client import SAMPQuery_Client
+
+SAMPQuery_Key = tuple[str, int]
+"""A ``(host, port)`` pair, the host as given"""
+
+RELEASE_POLL = 0.05
+"""Seconds between the checks of ``lease`` for a client no longer dispatching, its owner does not tell"""
+
+
+@dataclass
+class SAMPQuery_Registry:
+    """
+    Keeps one client per server, so a process creating a client per request
+    (e.g an HTTP API) reuses their sockets, RTT estimates and decoders. At
+    most ``maxsockets`` clients are kept, each holding one socket once
+    connected; the least recently used one is closed and dropped to make
+    room, unless it is leased or dispatching, in which case ``lease`` waits
+    for a client to be returned or released by its owner.
+
+    Use ``SAMPQuery_Registry.default`` to share one registry in the process,
+    from the trio loop of one thread.
+
+    Example::
+
+        async with SAMPQuery_Registry.default.lease("127.0.0.1", 7777) as client:
+            info = await client.info()
+
+    :param int maxsockets: The maximum number of clients, and so of open sockets
+    :param dict options: The other fields of the new clients (limiter, cache, retry, instrumentation...)
+    """
+
+    maxsockets: int = 1024
+    options: dict[str, tp.Any] = field(default_factory=dict)
+    created: int = field(default=0, init=False)
+    evicted: int = field(default=0, init=False)
+    __clients: OrderedDict[SAMPQuery_Key, SAMPQuery_Client] = field(
+        default_factory=OrderedDict, init=False, repr=False
+    )
+    __leases: dict[SAMPQuery_Key, int] = field(default_factory=dict, init=False, repr=False)
+    __returned: trio.Event | None = field(default=None, init=False, repr=False)
+
+    default: tp.ClassVar[SAMPQuery_Registry]
+    """The registry of the process"""
+
+    def __post_init__(self) -> None:
+        if self.maxsockets < 1:
+            raise ValueError("maxsockets must be at least 1")
+
+    def __len__(self) -> int:
+        return len(self.__clients)
+
+    def __contains__(self, key: SAMPQuery_Key) -> bool:
+        return key in self.__clients
+
+    def client(self, host: str, port: int) -> SAMPQuery_Client:
+        """
+        Return the client of a server, creating it if needed. It is not leased:
+        it can be closed by an eviction after this call (its next query then
+        opens a new socket, but a query in flight would fail), and when every
+        client is leased the cap is exceeded until one is returned.
+
+        :param str host: The IP or hostname of the server
+        :param int port: The port of the server
+        :return SAMPQuery_Client: The client
+        """
+        key = (host, port)
+        client = self.__clients.get(key)
+        if client is not None:
+            self.__clients.move_to_end(key)
+            return client
+        self.__evict(len(self.__clients) + 1 - self.maxsockets)
+        client = self.__clients[key] = SAMPQuery_Client(host, port, **self.options)
+        self.created += 1
+        return client
+
+    @asynccontextmanager
+    async def lease(self, host: str, port: int) -> AsyncIterator[SAMPQuery_Client]:
+        """
+        Borrow the client of a server for the duration of the context, during
+        which it is never evicted.
+
+        :param str host: The IP or hostname of the server
+        :param int port: The port of the server
+        :return SAMPQuery_Client: The client
+        """
+        key = (host, port)
+        while key not in self.__clients and len(self.__clients) >= self.maxsockets:
+            if self.__evict(len(self.__clients) + 1 - self.maxsockets):
+                break
+            # every client is leased or dispatching, wait for one to be returned or released
+            if self.__returned is None:
+                self.__returned = trio.Event()
+            with trio.move_on_after(RELEASE_POLL):
+                await self.__returned.wait()
+        client = self.client(host, port)
+        self.__leases[key] = self.__leases.get(key, 0) + 1
+        try:
+            yield client
+        finally:
+            count = self.__leases.pop(key) - 1
+            if count:
+                self.__leases[key] = count
+            if self.__returned is not None:
+                self.__returned.set()
+                self.__returned = None
+
+    def close(self) -> None:
+        """Close every client that is neither leased nor dispatching, and forget them."""
+        self.__evict(len(self.__clients))
+
+    async def aclose(self) -> None:
+        """Close every client that is neither leased nor dispatching, and forget them."""
+        self.close()
+        await trio.lowlevel.checkpoint()
+
+    def __evict(self, count: int) -> bool:
+        """
+        Close and drop up to ``count`` of the least recently used clients that
+        are neither leased nor dispatching: a dispatching client keeps its
+        socket, and so its place, until its owner releases it.
+
+        :return bool: True if ``count`` clients were evicted
+        """
+        if count <= 0:
+            return True
+        victims = list(islice(
+            (
+                key for key, client in self.__clients.items()
+                if key not in self.__leases and not client._dispatching
+            ),
+            count,
+        ))
+        for key in victims:
+            self.__clients.pop(key).close()
+            self.evicted += 1
+        return len(victims) == count
+
+
+SAMPQuery_Registry.default = SAMPQuery_Registry()
@@ -0,0 +1,168 @@
+"""
+This module is used to resolve the hostnames of the servers, caching the addresses
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+import typing as tp
+
+from collections import OrderedDict
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+import trio
+
+from .cache import SAMPQuery_Flight
+from .utils import SAMPQuery_Utils
+
+
+@dataclass
+class SAMPQuery_Resolver:
+    """
+    A cache of the IPv4 addresses of the hostnames, shared by every client and
+    scanner of the process (see ``SAMPQuery_Resolver.default``).
+
+    The system resolver does not tell the TTL of its records, so an address is
+    kept ``ttl`` seconds. A failed resolution is kept ``negative_ttl`` seconds
+    and raised again meanwhile. Concurrent resolutions of the same hostname
+    share a single lookup within a trio run; the addresses are shared by every
+    run, so the resolver can be used from the trio loops of several threads
+    (e.g the one of ``SAMPQuery_LoopThread``).
+
+    :param float ttl: Seconds an address is kept
+    :param float negative_ttl: Seconds a failed resolution is kept
+    :param int maxsize: The maximum number of hostnames, the least recently used are evicted first
+    """
+
+    ttl: float = 300.0
+    negative_ttl: float = 30.0
+    maxsize: int = 65536
+    hits: int = field(default=0, init=False)
+    misses: int = field(default=0, init=False)
+    __entries: OrderedDict[str, tuple[float, str | OSError]] = field(
+        default_factory=OrderedDict, init=False, repr=False
+    )
+    __flights: trio.lowlevel.RunVar[dict[str, SAMPQuery_Flight[str]]] = field(
+        default_factory=lambda: trio.lowlevel.RunVar("flights"), init=False, repr=False
+    )
+    __lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    default: tp.ClassVar[SAMPQuery_Resolver]
+    """The resolver of the process"""
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    async def resolve(self, host: str) -> str:
+        """
+        Return the IPv4 address of a hostname.
+
+        :param str host: The hostname (an IPv4 address is returned as is)
+        :return str: The address
+        :raises OSError: If the hostname can not be resolved
+        """
+        if SAMPQuery_Utils.is_ipv4(host):
+            return host
+        with self.__lock:
+            entry = self.__entries.get(host)
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                self.__entries.move_to_end(host)
+            else:
+                entry = None
+                self.misses += 1
+        if entry is not None:
+            address = entry[1]
+            if isinstance(address, OSError):
+                raise type(address)(*address.args)
+            return address
+        flights = self.__run_flights()
+        while True:
+            flight = flights.get(host)
+            if flight is None:
+                flight = SAMPQuery_Flight(host)
+                flights[host] = flight
+                await self.__fly(flight)
+            else:
+                await flight.done.wait()
+            if flight.error is not None:
+                raise type(flight.error)(*flight.error.args)
+            if flight.landed:
+                return tp.cast(str, flight.value)
+            # the task resolving it was cancelled, so someone else has to
+
+    async def resolve_many(
+        self, hosts: Iterable[str], concurrency: int = 32
+    ) -> dict[str, str | OSError]:
+        """
+        Resolve many hostnames at once, e.g before scanning them.
+
+        :param hosts: The hostnames
+        :param int concurrency: The maximum number of lookups at the same time
+        :return dict[str, str | OSError]: The address, or the error, of every hostname
+        """
+        limiter = trio.CapacityLimiter(concurrency)
+        results: dict[str, str | OSError] = {}
+
+        async def resolve(host: str) -> None:
+            async with limiter:
+                try:
+                    results[host] = await self.resolve(host)
+                except OSError as e:
+                    results[host] = e
+
+        async with trio.open_nursery() as nursery:
+            for host in dict.fromkeys(hosts):
+                nursery.start_soon(resolve, host)
+        return results
+
+    def invalidate(self, host: str | None = None) -> None:
+        """
+        Forget the address of a hostname, or every address.
+
+        :param host: The hostname, None to forget everything
+        :type host: str | None
+        """
+        with self.__lock:
+            if host is None:
+                self.__entries.clear()
+            else:
+                self.__entries.pop(host, None)
+
+    def __run_flights(self) -> dict[str, SAMPQuery_Flight[str]]:
+        """Return the lookups in progress in the current trio run (their events belong to it)."""
+        try:
+            return self.__flights.get()
+        except LookupError:
+            flights: dict[str, SAMPQuery_Flight[str]] = {}
+            self.__flights.set(flights)
+            return flights
+
+    async def __fly(self, flight: SAMPQuery_Flight[str]) -> None:
+        """Run the lookup of a flight and publish its outcome to its waiters."""
+        host = flight.key
+        try:
+            flight.value = (await trio.socket.getaddrinfo(
+                host, None, family=trio.socket.AF_INET, proto=trio.socket.IPPROTO_UDP
+            ))[0][4][0]
+            flight.landed = True
+            self.__store(host, time.monotonic() + self.ttl, flight.value)
+        except OSError as e:
+            flight.error = e
+            flight.landed = True
+            self.__store(host, time.monotonic() + self.negative_ttl, e)
+        finally:
+            del self.__run_flights()[host]
+            flight.done.set()
+
+    def __store(self, host: str, expiry: float, address: str | OSError) -> None:
+        with self.__lock:
+            self.__entries[host] = (expiry, address)
+            self.__entries.move_to_end(host)
+            while len(self.__entries) > self.maxsize:
+                self.__entries.popitem(last=False)
+
+
+SAMPQuery_Resolver.default = SAMPQuery_Resolver()
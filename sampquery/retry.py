@@ -0,0 +1,78 @@
+"""
+This module is used to retransmit the queries whose packets got lost
+"""
+
+from __future__ import annotations
+
+import random
+
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+
+@dataclass
+class SAMPQuery_RetryPolicy:
+    """
+    How a query is sent again when no reply arrives. Every attempt waits for
+    the timeout of the round trip time estimator, multiplied by ``backoff``
+    for every previous attempt and by a random factor within ``jitter`` (so
+    many clients do not retransmit in lockstep), and the query gives up once
+    ``attempts`` packets are sent or ``deadline`` seconds are over.
+
+    :param int attempts: The maximum number of packets sent for a query (1 disables the retransmission)
+    :param float backoff: The factor applied to the timeout of each new attempt
+    :param float jitter: The maximum relative deviation of each timeout (0.1 is ±10%)
+    :param float deadline: The total time a query can take, in seconds
+    """
+
+    attempts: int = 3
+    backoff: float = 2.0
+    jitter: float = 0.1
+    deadline: float = 20.0
+
+    def __post_init__(self) -> None:
+        if self.attempts < 1:
+            raise ValueError("A query needs at least one attempt")
+        if self.backoff < 1 or not 0 <= self.jitter < 1 or self.deadline <= 0:
+            raise ValueError("Invalid backoff, jitter or deadline")
+
+    def timeouts(self, timeout: float) -> Iterator[float]:
+        """
+        The time to wait for the reply of every attempt.
+
+        :param float timeout: The timeout of the first attempt, before the jitter
+        :return: One timeout per attempt
+        """
+        for attempt in range(self.attempts):
+            yield timeout * self.backoff**attempt * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+@dataclass
+class SAMPQuery_RetryStats:
+    """
+    The attempts made for one kind of query of a server.
+
+    :param int queries: The number of queries made
+    :param int packets: The number of packets sent for them
+    :param int retried: The number of queries answered after a retransmission
+    :param int failed: The number of queries left without a reply
+    :param int last: The retransmissions of the last query
+    """
+
+    queries: int = 0
+    packets: int = 0
+    retried: int = 0
+    failed: int = 0
+    last: int = 0
+
+    @property
+    def retransmissions(self) -> int:
+        """The number of packets sent again"""
+        return self.packets - self.queries
+
+    @property
+    def loss(self) -> float:
+        """The ratio of packets left without a reply (query or reply lost)"""
+        if not self.packets:
+            return 0.0
+        return 1 - (self.queries - self.failed) / self.packets
@@ -0,0 +1,66 @@
+"""
+This module is used to estimate the round trip time of a server and the timeouts derived from it
+"""
+
+from __future__ import annotations
+
+import typing as tp
+
+from dataclasses import dataclass
+
+
+@dataclass
+class SAMPQuery_RTTEstimator:
+    """
+    Keeps a smoothed round trip time of a server and its variation, and derives
+    the time to wait for a reply from them, the same way TCP computes its
+    retransmission timeout (RFC 6298).
+
+    :param float floor: The minimum timeout, in seconds
+    :param float ceiling: The maximum timeout, in seconds
+    :param float initial: The timeout used until the first round trip is measured
+    :param float | None srtt: The smoothed round trip time, in seconds
+    :param float | None rttvar: The smoothed variation of the round trip time, in seconds
+    :param int samples: The number of round trips measured
+    """
+
+    floor: float = 0.5
+    ceiling: float = 20.0
+    initial: float = 1.0
+    srtt: float | None = None
+    rttvar: float | None = None
+    samples: int = 0
+
+    ALPHA: tp.ClassVar[float] = 1 / 8
+    """The weight of a new sample in the smoothed round trip time"""
+
+    BETA: tp.ClassVar[float] = 1 / 4
+    """The weight of a new sample in the variation"""
+
+    K: tp.ClassVar[int] = 4
+    """How many variations the timeout allows above the smoothed round trip time"""
+
+    def __post_init__(self) -> None:
+        if not 0 < self.floor <= self.ceiling:
+            raise ValueError("The timeout floor must be positive and lower than the ceiling")
+
+    def update(self, rtt: float) -> None:
+        """
+        Account a measured round trip.
+
+        :param float rtt: The time between a query and its reply, in seconds
+        """
+        if self.srtt is None or self.rttvar is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+        self.samples += 1
+
+    @property
+    def timeout(self) -> float:
+        """The time to wait for a reply, in seconds"""
+        if self.srtt is None or self.rttvar is None:
+            return min(max(self.initial, self.floor), self.ceiling)
+        return min(max(self.srtt + self.K * self.rttvar, self.floor), self.ceiling)
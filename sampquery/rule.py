@@ -5,14 +5,19 @@ In this module we storage the rules of the server
 from __future__ import annotations
 
 import struct
-from dataclasses import dataclass
-from .utils import SAMPQuery_Utils
+import typing as tp
+
+from dataclasses import dataclass, field
+
+from .decoder import SAMPQuery_Decoder
+from .utils import SAMPQuery_Buffer, SAMPQuery_LazyText, SAMPQuery_Utils
 
 
 @dataclass
-class SAMPQuery_Rule:
+class SAMPQuery_Rule(SAMPQuery_LazyText):
     """
-    Class Rule represents the server rule
+    Class Rule represents the server rule. When parsed from a reply, the name
+    and the value are decoded on first access.
 
     :param str name: The name of the rule
     :param str value: The value of the rule
@@ -24,16 +29,42 @@ class SAMPQuery_Rule:
     encoding: str
 
     @classmethod
-    def from_data(cls, data: bytes) -> tuple[SAMPQuery_Rule, bytes]:
+    def from_data(
+        cls, data: bytes, decoder: SAMPQuery_Decoder | None = None
+    ) -> tuple[SAMPQuery_Rule, bytes]:
         """
         Creates a rule from raw data
 
         :param bytes data: The raw data to parse into rule information
+        :param decoder: The decoder of the server the data comes from
+        :type decoder: SAMPQuery_Decoder | None
         :return tuple[SAMPQuery_Rule, bytes]: An instance of rule with the parsed data and the remaining data
         """
-        name, data, _ = SAMPQuery_Utils.unpack_string(data, "B")
-        value, data, encoding = SAMPQuery_Utils.unpack_string(data, "B")
-        return cls(name=name, value=value, encoding=encoding), data
+        rule, offset = cls.from_buffer(memoryview(data), 0, decoder)
+        return rule, data[offset:]
+
+    @classmethod
+    def from_buffer(
+        cls, view: memoryview, offset: int, decoder: SAMPQuery_Decoder | None = None
+    ) -> tuple[SAMPQuery_Rule, int]:
+        """
+        Creates a rule from the one found at ``offset`` of a ``r`` reply
+
+        :param memoryview view: The raw data of the whole reply
+        :param int offset: The offset of the rule in the data
+        :param decoder: The decoder of the server the data comes from
+        :type decoder: SAMPQuery_Decoder | None
+        :return tuple[SAMPQuery_Rule, int]: The parsed rule and the offset of the next one
+        """
+        name, offset = SAMPQuery_Utils.unpack_raw_string_from(view, offset, "B")
+        value, offset = SAMPQuery_Utils.unpack_raw_string_from(view, offset, "B")
+        rule = cls.with_raw_texts(decoder or SAMPQuery_Decoder(), {"name": name, "value": value})
+        return rule, offset
+
+    def _derive(self, name: str) -> tp.Any:
+        if name == "encoding":
+            return self._encoding_of("value")
+        return super()._derive(name)
 
 
 @dataclass
@@ -45,32 +76,52 @@ class SAMPQuery_RuleList:
     """
 
     rules: list[SAMPQuery_Rule]
+    __index: dict[str, SAMPQuery_Rule] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    __indexed: int = field(default=-1, init=False, repr=False, compare=False)
+
+    COUNT: tp.ClassVar[struct.Struct] = struct.Struct("<H")
+    """The rule count at the start of the ``r`` reply"""
 
     @classmethod
-    def from_data(cls, data: bytes) -> SAMPQuery_RuleList:
+    def from_data(
+        cls, data: SAMPQuery_Buffer, decoder: SAMPQuery_Decoder | None = None
+    ) -> SAMPQuery_RuleList:
         """
-        Creates an instance of SAMPQuery_RuleList from raw data
+        Creates an instance of SAMPQuery_RuleList from raw data. The names and
+        values are decoded on first access (the names by the first ``get``), if
+        their charset must be detected it is on all the rule values at once.
 
-        :param bytes data: The raw data to parse into rule list information
+        :param SAMPQuery_Buffer data: The raw data to parse into rule list information
+        :param decoder: The decoder of the server the data comes from
+        :type decoder: SAMPQuery_Decoder | None
         :return SAMPQuery_RuleList: An instance of SAMPQuery_RuleList with the parsed data
         """
-        rcount = struct.unpack_from("<H", data)[0]
-        data = data[2:]
-        rules = []
+        decoder = decoder or SAMPQuery_Decoder()
+        view = memoryview(data)
+        rcount = cls.COUNT.unpack_from(view)[0]
+        offset = cls.COUNT.size
+        rules, values = [], []
         for _ in range(rcount):
-            rule, data = SAMPQuery_Rule.from_data(data)
-            rules.append(rule)
-        assert not data
+            name, offset = SAMPQuery_Utils.unpack_raw_string_from(view, offset, "B")
+            value, offset = SAMPQuery_Utils.unpack_raw_string_from(view, offset, "B")
+            rules.append(SAMPQuery_Rule.with_raw_texts(decoder, {"name": name, "value": value}))
+            values.append(value)
+        assert offset == len(view)
+        decoder.learn(values)
         return cls(rules=rules)
 
     def get(self, name: str) -> SAMPQuery_Rule | None:
         """
-        Returns the rule with the given name
+        Returns the rule with the given name, without decoding the other rules
 
         :param str name: The name of the rule to get
         :return SAMPQuery_Rule | None: The rule with the given name or None if not found
         """
-        for rule in self.rules:
-            if rule.name == name:
-                return rule
-        return None
+        if self.__indexed != len(self.rules):
+            self.__index = {}
+            for rule in self.rules:
+                self.__index.setdefault(rule.name, rule)
+            self.__indexed = len(self.rules)
+        return self.__index.get(name)
@@ -0,0 +1,307 @@
+"""
+This module is used to query a whole fleet of servers over a few shared sockets
+"""
+
+from __future__ import annotations
+
+import struct
+import typing as tp
+
+from collections.abc import AsyncIterable, AsyncIterator, Callable, Iterable, Sequence
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+import trio
+
+from .decoder import SAMPQuery_Decoder
+from .buffers import udp_socket
+from .dispatcher import SAMPQuery_Dispatcher
+from .ratelimit import SAMPQuery_RateLimiter
+from .resolver import SAMPQuery_Resolver
+from .utils import SAMPQuery_Utils
+from .server import SAMPQuery_Server
+from .player import PLAYER_LIST_LIMIT, SAMPQuery_PlayerList
+from .rule import SAMPQuery_RuleList
+
+
+SAMPQuery_Target = tuple[str, int]
+"""An ``(ip or hostname, port)`` pair"""
+
+DEFAULT_PORT = 7777
+
+
+def parse_target(line: str) -> SAMPQuery_Target | None:
+    """
+    Parse a line of the target list.
+
+    :param str line: An ``ip:port`` (or ``hostname:port``, or just ``ip`` for port 7777)
+    :return SAMPQuery_Target | None: The target, None for a blank line or a ``#`` comment
+    :raises ValueError: If the port is not a number between 1 and 65535
+    """
+    line = line.split("#", 1)[0].strip()
+    if not line:
+        return None
+    host, _, port = line.rpartition(":")
+    if not host:
+        return line, DEFAULT_PORT
+    number = int(port) if port.isdigit() else 0
+    if not 0 < number < 65536:
+        raise ValueError(f"invalid port {port!r}")
+    return host.strip("[]"), number
+
+
+@dataclass
+class SAMPQuery_ScanResult:
+    """
+    The answers of one server to the queries of a scan
+
+    :param str ip: The IP (or hostname) of the server, as given in the targets
+    :param int port: The port of the server
+    :param SAMPQuery_Server | None info: The answer to the ``i`` query
+    :param SAMPQuery_RuleList | None rules: The answer to the ``r`` query
+    :param SAMPQuery_PlayerList | None players: The answer to the ``c`` query
+    :param SAMPQuery_PlayerList | None detailed_players: The answer to the ``d`` query
+    :param dict[str, str] errors: The reason of every failed query, by opcode
+    """
+
+    ip: str
+    port: int
+    info: SAMPQuery_Server | None = None
+    rules: SAMPQuery_RuleList | None = None
+    players: SAMPQuery_PlayerList | None = None
+    detailed_players: SAMPQuery_PlayerList | None = None
+    errors: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        """True if every query of the scan got an answer"""
+        return not self.errors
+
+    def to_dict(self) -> dict[str, tp.Any]:
+        """
+        Turn the result into plain JSON types.
+
+        :return dict: ``ip``, ``port``, ``ok``, the answered queries and ``errors``
+        """
+        line: dict[str, tp.Any] = {"ip": self.ip, "port": self.port, "ok": self.ok}
+        if self.info is not None:
+            info = self.info
+            line["info"] = {
+                "name": info.name,
+                "gamemode": info.gamemode,
+                "language": info.language,
+                "password": info.password,
+                "players": info.players,
+                "max_players": info.max_players,
+            }
+        if self.rules is not None:
+            line["rules"] = {rule.name: rule.value for rule in self.rules.rules}
+        if self.players is not None:
+            line["players"] = [{"name": p.name, "score": p.score} for p in self.players]
+        if self.detailed_players is not None:
+            line["detailed_players"] = [
+                {"id": p.player_id, "name": p.name, "score": p.score, "ping": p.ping}
+                for p in self.detailed_players
+            ]
+        if self.errors:
+            line["errors"] = self.errors
+        return line
+
+
+@dataclass
+class SAMPQuery_Scanner:
+    """
+    Query many servers at once over a few shared UDP sockets. Every reply is
+    routed back to its server by the ``SAMP`` + ip + port prefix it echoes.
+
+    :param bytes opcodes: The queries to send to every server, among ``i``, ``r``, ``c`` and ``d``
+    :param int concurrency: The maximum number of servers being queried at the same time
+    :param float timeout: Seconds to wait for each reply
+    :param int sockets: The number of sockets to spread the servers over
+    :param str | None codepage: A fixed codepage for the non UTF-8 texts, instead of detecting it per server
+    :param SAMPQuery_Resolver resolver: Resolves the hostnames among the targets, the resolver of the process by default
+    :param SAMPQuery_RateLimiter | None limiter: Paces the packets (globally and per IP) and caps the queries in flight
+    """
+
+    opcodes: bytes = b"i"
+    concurrency: int = 256
+    timeout: float = 5.0
+    sockets: int = 1
+    codepage: str | None = None
+    resolver: SAMPQuery_Resolver = field(default_factory=lambda: SAMPQuery_Resolver.default, repr=False)
+    limiter: SAMPQuery_RateLimiter | None = field(default=None, repr=False)
+
+    PARSERS: tp.ClassVar[
+        dict[bytes, tuple[str, Callable[[bytes, SAMPQuery_Decoder], tp.Any]]]
+    ] = {
+        b"i": ("info", SAMPQuery_Server.from_data),
+        b"r": ("rules", SAMPQuery_RuleList.from_data),
+        b"c": ("players", SAMPQuery_PlayerList.from_data),
+        b"d": ("detailed_players", SAMPQuery_PlayerList.from_detailed_data),
+    }
+
+    def __post_init__(self) -> None:
+        unknown = set(self.opcodes) - set(b"ircd")
+        if unknown:
+            raise ValueError(f"Unsupported opcodes for a scan: {bytes(sorted(unknown))!r}")
+        if self.concurrency < 1 or self.sockets < 1:
+            raise ValueError("concurrency and sockets must be at least 1")
+
+    @asynccontextmanager
+    async def scan(
+        self,
+        targets: Iterable[SAMPQuery_Target] | AsyncIterable[SAMPQuery_Target],
+        dispatchers: Sequence[SAMPQuery_Dispatcher] | None = None,
+    ) -> AsyncIterator[trio.MemoryReceiveChannel[SAMPQuery_ScanResult]]:
+        """
+        Scan the given servers. The targets are consumed lazily, and the results
+        are yielded in completion order.
+
+        The scan opens ``sockets`` sockets of its own, unless it is given the
+        running dispatchers of long-lived ones (e.g shared by the scans of a
+        server), which it leaves open.
+
+        Example::
+
+            async with scanner.scan(targets) as results:
+                async for result in results:
+                    print(result.ip, result.port, result.info)
+
+        :param targets: The ``(ip, port)`` pairs to query
+        :param dispatchers: Running dispatchers to query through, instead of new sockets
+        :return: A channel to iterate the results on
+        """
+        send_channel, receive_channel = trio.open_memory_channel[SAMPQuery_ScanResult](
+            self.concurrency
+        )
+        owned: list[SAMPQuery_Dispatcher] = []
+        try:
+            async with trio.open_nursery() as nursery:
+                for _ in range(0 if dispatchers else self.sockets):
+                    owned.append(await _open_dispatcher(nursery))
+                nursery.start_soon(self.__feed, targets, list(dispatchers or owned), send_channel)
+                try:
+                    yield receive_channel
+                finally:
+                    nursery.cancel_scope.cancel()
+        finally:
+            for dispatcher in owned:
+                dispatcher.socket.close()
+
+    async def __feed(
+        self,
+        targets: Iterable[SAMPQuery_Target] | AsyncIterable[SAMPQuery_Target],
+        dispatchers: list[SAMPQuery_Dispatcher],
+        send_channel: trio.MemorySendChannel[SAMPQuery_ScanResult],
+    ) -> None:
+        """Start one query task per target, never more than ``concurrency`` at once."""
+        limiter = trio.CapacityLimiter(self.concurrency)
+        async with send_channel, trio.open_nursery() as nursery:
+            index = 0
+            async for ip, port in _aiter(targets):
+                await limiter.acquire_on_behalf_of(index)
+                nursery.start_soon(
+                    self.__query_target,
+                    ip,
+                    port,
+                    dispatchers[index % len(dispatchers)],
+                    send_channel.clone(),
+                    limiter,
+                    index,
+                )
+                index += 1
+
+    async def __query_target(
+        self,
+        ip: str,
+        port: int,
+        dispatcher: SAMPQuery_Dispatcher,
+        send_channel: trio.MemorySendChannel[SAMPQuery_ScanResult],
+        limiter: trio.CapacityLimiter,
+        token: int,
+    ) -> None:
+        """Send every opcode of the scan to one server and report its result."""
+        result = SAMPQuery_ScanResult(ip=ip, port=port)
+        try:
+            async with send_channel:
+                try:
+                    address = await self.resolver.resolve(ip)
+                    prefix = SAMPQuery_Utils.build_prefix(address, port)
+                except OSError as e:
+                    for opcode in self.opcodes:
+                        result.errors[chr(opcode)] = f"resolution failed: {e}"
+                else:
+                    decoder = SAMPQuery_Decoder(codepage=self.codepage)
+                    async with trio.open_nursery() as nursery:
+                        for opcode in self.opcodes:
+                            nursery.start_soon(
+                                self.__query_opcode,
+                                result,
+                                dispatcher,
+                                decoder,
+                                (address, port),
+                                prefix + bytes([opcode]),
+                            )
+                    if result.info is not None and result.info.players > PLAYER_LIST_LIMIT:
+                        # a SA:MP server leaves the lists unanswered above 100 players
+                        for key in "cd":
+                            if result.errors.get(key) == "timeout":
+                                result.errors[key] = f"refused: {result.info.players} players"
+                await send_channel.send(result)
+        finally:
+            limiter.release_on_behalf_of(token)
+
+    async def __query_opcode(
+        self,
+        result: SAMPQuery_ScanResult,
+        dispatcher: SAMPQuery_Dispatcher,
+        decoder: SAMPQuery_Decoder,
+        address: tuple[str, int],
+        header: bytes,
+    ) -> None:
+        """Send one query to one server and store its parsed answer into the result."""
+        opcode = header[-1:]
+        name, parser = self.PARSERS[opcode]
+        try:
+            if self.limiter is None:
+                data = await dispatcher.query(header, header, self.timeout, address)
+            else:
+                async with self.limiter.slot():
+                    await self.limiter.acquire(address[0])
+                    data = await dispatcher.query(header, header, self.timeout, address)
+            # a copy, as the result outlives the receive: its texts would pin the slab
+            parsed = parser(bytes(data[len(header):]), decoder)
+            setattr(result, name, parsed)
+            if opcode in b"cd" and parsed.truncated:
+                result.errors[opcode.decode()] = f"truncated: {len(parsed)} of {parsed.count} players"
+        except TimeoutError:
+            result.errors[opcode.decode()] = "timeout"
+        except OSError as e:  # e.g no route to the server
+            result.errors[opcode.decode()] = f"send failed: {e}"
+        except (ValueError, IndexError, struct.error) as e:  # a malformed reply must not abort the whole scan
+            result.errors[opcode.decode()] = f"invalid reply: {e!r}"
+
+
+async def _aiter(
+    iterable: Iterable[SAMPQuery_Target] | AsyncIterable[SAMPQuery_Target],
+) -> AsyncIterator[SAMPQuery_Target]:
+    """Iterate a sync or async iterable of targets asynchronously."""
+    if isinstance(iterable, AsyncIterable):
+        async for item in iterable:
+            yield item
+    else:
+        for item in iterable:
+            yield item
+
+
+async def _open_dispatcher(nursery: trio.Nursery) -> SAMPQuery_Dispatcher:
+    """Bind a new socket and run its dispatcher in ``nursery``, the caller closes the socket."""
+    _socket, raw = udp_socket()
+    try:
+        await _socket.bind(("0.0.0.0", 0))
+        dispatcher = SAMPQuery_Dispatcher(_socket, raw=raw)
+        await nursery.start(dispatcher.run)
+    except BaseException:
+        _socket.close()
+        raise
+    return dispatcher
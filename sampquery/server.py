@@ -5,14 +5,19 @@ In this module we handle the server information
 from __future__ import annotations
 
 import struct
+import typing as tp
+
 from dataclasses import dataclass
-from .utils import SAMPQuery_Encodings, SAMPQuery_Utils
+
+from .decoder import SAMPQuery_Decoder
+from .utils import SAMPQuery_Buffer, SAMPQuery_Encodings, SAMPQuery_LazyText, SAMPQuery_Utils
 
 
 @dataclass
-class SAMPQuery_Server:
+class SAMPQuery_Server(SAMPQuery_LazyText):
     """
-    This class represents the server information
+    This class represents the server information. When parsed from a reply, the
+    texts are decoded on first access.
 
     :param str name: The name of the server
     :param bool password: If the server has a password
@@ -30,30 +35,43 @@ class SAMPQuery_Server:
     language: str
     encodings: SAMPQuery_Encodings
 
+    HEADER: tp.ClassVar[struct.Struct] = struct.Struct("<?HH")
+    """password, players and max_players"""
+
     @classmethod
-    def from_data(cls, data: bytes) -> SAMPQuery_Server:
+    def from_data(
+        cls, data: SAMPQuery_Buffer, decoder: SAMPQuery_Decoder | None = None
+    ) -> SAMPQuery_Server:
         """
         Create an instance of server from raw byte data.
 
-        :param bytes data: The raw data to parse into server information.
+        :param SAMPQuery_Buffer data: The raw data to parse into server information.
+        :param decoder: The decoder of the server the data comes from.
+        :type decoder: SAMPQuery_Decoder | None
         :return SAMPQuery_Server: An instance of SAMPQuery_Server with the parsed data.
         """
-        password, players, max_players = struct.unpack_from("<?HH", data)
-        data = data[5:]
-        name, data, name_encoding = SAMPQuery_Utils.unpack_string(data, "I")
-        gamemode, data, gamemode_encoding = SAMPQuery_Utils.unpack_string(data, "I")
-        language, data, language_encoding = SAMPQuery_Utils.unpack_string(data, "I")
-        assert not data
-        return cls(
-            name=name,
+        view = memoryview(data)
+        password, players, max_players = cls.HEADER.unpack_from(view)
+        offset = cls.HEADER.size
+        name, offset = SAMPQuery_Utils.unpack_raw_string_from(view, offset, "I")
+        gamemode, offset = SAMPQuery_Utils.unpack_raw_string_from(view, offset, "I")
+        language, offset = SAMPQuery_Utils.unpack_raw_string_from(view, offset, "I")
+        assert offset == len(view)
+        decoder = decoder or SAMPQuery_Decoder()
+        decoder.learn([name, gamemode, language])
+        return cls.with_raw_texts(
+            decoder,
+            {"name": name, "gamemode": gamemode, "language": language},
             password=password,
             players=players,
             max_players=max_players,
-            gamemode=gamemode,
-            language=language,
-            encodings=dict(
-                name=name_encoding,
-                gamemode=gamemode_encoding,
-                language=language_encoding,
-            ),
         )
+
+    def _derive(self, name: str) -> tp.Any:
+        if name == "encodings":
+            return SAMPQuery_Encodings(
+                name=self._encoding_of("name"),
+                gamemode=self._encoding_of("gamemode"),
+                language=self._encoding_of("language"),
+            )
+        return super()._derive(name)
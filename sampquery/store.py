@@ -0,0 +1,481 @@
+"""
+This module is used to keep the history of the servers on disk, in a compact
+append-only format, and to read it back through memory maps.
+
+A store is a directory of append-only files:
+
+- ``records.bin``: one fixed-width record per snapshot (``RECORD``), in time order
+- ``rosters.bin``: the players of the snapshots (``ROSTER_ENTRY``), each roster one after the other
+- ``strings.bin`` and ``strings.idx``: the string table (server addresses, hostnames and
+  player names, UTF-8) and the end offset of every string in it
+- ``heads.bin``: the last record of every server, to walk the history of one
+  server backward through the ``prev`` field of its records
+
+The records are kept in memory until ``flush``, which makes the strings and the
+rosters durable before writing the records after them: a snapshot only exists
+once its record is on disk, and everything it points to is already there. A
+partial record left by a crash, or records pointing past the string table or
+the rosters (a store torn by an older version), are ignored by the readers and
+dropped by the next writer.
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+import mmap
+import os
+import struct
+import time as _time
+import typing as tp
+
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+
+from .server import SAMPQuery_Server
+
+RECORD = struct.Struct("<dIIHHfIQq")
+"""time, server, hostname, players, max players, ping (ms, NaN if unknown), roster length, roster offset, previous record of the server (-1 if none)"""
+
+ROSTER_ENTRY = struct.Struct("<IiH")
+"""name, score, ping"""
+
+STRING_END = struct.Struct("<Q")
+HEAD = struct.Struct("<IQ")
+"""server, last record"""
+
+NO_STRING = 0xFFFFFFFF
+
+
+class SAMPQuery_RosterEntry(tp.NamedTuple):
+    """A player of a stored roster"""
+
+    name: str
+    score: int
+    ping: int
+
+
+@dataclass
+class SAMPQuery_Snapshot:
+    """
+    The state of a server at some time, as stored
+
+    :param int index: The index of the record in the store
+    :param float time: When the snapshot was taken (seconds since the epoch)
+    :param str server: The ``ip:port`` of the server
+    :param str | None hostname: The hostname of the server, if its info was stored
+    :param int players: The number of players
+    :param int max_players: The maximum number of players
+    :param float | None ping: The ping of the server, in milliseconds
+    :param int roster_length: The number of players in the stored roster (0 if none was stored)
+    """
+
+    index: int
+    time: float
+    server: str
+    hostname: str | None
+    players: int
+    max_players: int
+    ping: float | None
+    roster_length: int
+    _reader: SAMPQuery_StoreReader = field(repr=False, compare=False)
+    _roster_offset: int = field(repr=False, compare=False)
+
+    @property
+    def roster(self) -> list[SAMPQuery_RosterEntry]:
+        """The stored players, read from disk on access"""
+        return self._reader.roster(self._roster_offset, self.roster_length)
+
+
+class _Files:
+    """The paths of the files of a store"""
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        self.path = os.fspath(path)
+        self.records = os.path.join(self.path, "records.bin")
+        self.rosters = os.path.join(self.path, "rosters.bin")
+        self.strings = os.path.join(self.path, "strings.bin")
+        self.string_ends = os.path.join(self.path, "strings.idx")
+        self.heads = os.path.join(self.path, "heads.bin")
+
+
+def _map(path: str) -> mmap.mmap | bytes:
+    """Map a file read-only (an empty or missing file can not be mapped)."""
+    try:
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except FileNotFoundError:
+        return b""
+
+
+def _append(path: str, size: int) -> tp.BinaryIO:
+    """Open a file to append to, cut at ``size`` bytes (dropping what a crash left after it)."""
+    file = open(path, "ab")  # pylint: disable=consider-using-with  # closed by SAMPQuery_StoreWriter.close
+    file.truncate(size)
+    file.seek(0, os.SEEK_END)
+    return file
+
+
+def _string_count(ends: tp.Any, table: tp.Any) -> int:
+    """The number of strings whose end and bytes are both on disk."""
+    count = len(ends) // STRING_END.size
+    while count and STRING_END.unpack_from(ends, (count - 1) * STRING_END.size)[0] > len(table):
+        count -= 1
+    return count
+
+
+def _recover(
+    files: _Files, records: tp.Any, count: int, strings: int, rosters: tp.Any
+) -> tuple[int, dict[int, int]]:
+    """
+    Load the last record of every server, scanning the records appended after
+    the heads file was saved (e.g after a crash). The records a flush made
+    durable are trusted, the ones after them are checked: the scan stops at
+    the first one pointing past the string table or the rosters.
+
+    :return: The number of valid records, and the last record of every server
+    """
+    heads: dict[int, int] = {}
+    saved = 0
+    try:
+        with open(files.heads, "rb") as file:
+            data = file.read()
+        (saved,) = STRING_END.unpack_from(data)
+        heads = dict(HEAD.iter_unpack(data[STRING_END.size:]))
+    except (FileNotFoundError, struct.error):
+        saved = 0
+    if saved > count or (saved and not _is_valid(records, saved - 1, strings, rosters)):
+        # the records were truncated, or the files flushed out of order: check everything
+        heads, saved = {}, 0
+    for index in range(saved, count):
+        if not _is_valid(records, index, strings, rosters):
+            return index, heads
+        heads[RECORD.unpack_from(records, index * RECORD.size)[1]] = index
+    return count, heads
+
+
+def _is_valid(records: tp.Any, index: int, strings: int, rosters: tp.Any) -> bool:
+    """True if the strings and the roster a record points to are on disk."""
+    _, server, hostname, _, _, _, length, offset, _ = RECORD.unpack_from(records, index * RECORD.size)
+    end = offset + length * ROSTER_ENTRY.size
+    return (
+        server < strings
+        and (hostname == NO_STRING or hostname < strings)
+        and end <= len(rosters)
+        and all(name < strings for name, _, _ in ROSTER_ENTRY.iter_unpack(rosters[offset:end]))
+    )
+
+
+class SAMPQuery_StoreWriter:
+    """
+    Appends snapshots to a store, creating it if needed. Only one writer may
+    use a store at a time. Call ``flush`` (or ``close``) to make the
+    snapshots durable and visible to the readers; the records appended since
+    the last flush are kept in memory, and flushed once they reach
+    ``buffer_size`` bytes.
+
+    Example::
+
+        with SAMPQuery_StoreWriter("history") as store:
+            store.append("127.0.0.1", 7777, info=await client.info(), players=await client.detailed_players())
+
+    :param str path: The directory of the store
+    :param int buffer_size: The size of the pending records that triggers a flush, in bytes
+    """
+
+    def __init__(self, path: str | os.PathLike[str], buffer_size: int = 1 << 20) -> None:
+        self.buffer_size = buffer_size
+        self.__pending = bytearray()
+        self.__files = files = _Files(path)
+        os.makedirs(files.path, exist_ok=True)
+        self.__strings: dict[str, int] = {}
+        ends = _map(files.string_ends)
+        table = _map(files.strings)
+        start = 0
+        try:
+            for index, (end,) in enumerate(STRING_END.iter_unpack(ends[:len(ends) - len(ends) % STRING_END.size])):
+                if end > len(table):  # the end of the table was lost
+                    break
+                self.__strings[bytes(table[start:end]).decode()] = index
+                start = end
+        finally:
+            for mapped in (ends, table):
+                if isinstance(mapped, mmap.mmap):
+                    mapped.close()
+        self.__strings_file = _append(files.strings, start)
+        self.__string_ends_file = _append(files.string_ends, len(self.__strings) * STRING_END.size)
+
+        self.__last_time = -math.inf
+        records, rosters = _map(files.records), _map(files.rosters)
+        try:
+            # a partial record, or records whose strings or roster were lost, left by a crash
+            self.__count, self.__heads = _recover(
+                files, records, len(records) // RECORD.size, len(self.__strings), rosters
+            )
+            roster_end = 0
+            if self.__count:
+                last = RECORD.unpack_from(records, (self.__count - 1) * RECORD.size)
+                self.__last_time = last[0]
+                roster_end = last[7] + last[6] * ROSTER_ENTRY.size
+        finally:
+            for mapped in (records, rosters):
+                if isinstance(mapped, mmap.mmap):
+                    mapped.close()
+        self.__rosters_file = _append(files.rosters, roster_end)
+        self.__records_file = _append(files.records, self.__count * RECORD.size)
+
+    def __enter__(self) -> SAMPQuery_StoreWriter:
+        return self
+
+    def __exit__(self, *exc_info: tp.Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def append(
+        self,
+        ip: str,
+        port: int,
+        info: SAMPQuery_Server | None = None,
+        players: Iterable[tp.Any] | None = None,
+        ping: float | None = None,
+        time: float | None = None,
+    ) -> int:
+        """
+        Append a snapshot of a server.
+
+        :param str ip: The IP of the server
+        :param int port: The port of the server
+        :param info: The info of the server, for its hostname and player counts
+        :type info: SAMPQuery_Server | None
+        :param players: The players (anything with ``name``, ``score`` and ``ping``, e.g a SAMPQuery_PlayerList), None to store no roster
+        :param ping: The ping of the server, in seconds
+        :type ping: float | None
+        :param time: When the snapshot was taken, now by default
+        :type time: float | None
+        :return int: The index of the record
+        :raises ValueError: If the snapshot is older than the last one
+        """
+        time = _time.time() if time is None else time
+        if time < self.__last_time:
+            raise ValueError("The snapshots must be appended in time order")
+        server = self.__string(f"{ip}:{port}")
+        roster_offset = self.__rosters_file.tell()
+        roster_length = 0
+        if players is not None:
+            entries = bytearray()
+            for player in players:
+                entries += ROSTER_ENTRY.pack(
+                    self.__string(player.name), player.score, min(max(getattr(player, "ping", 0), 0), 0xFFFF)
+                )
+                roster_length += 1
+            self.__rosters_file.write(entries)
+        self.__pending += RECORD.pack(
+            time,
+            server,
+            NO_STRING if info is None else self.__string(info.name),
+            0 if info is None else info.players,
+            0 if info is None else info.max_players,
+            math.nan if ping is None else ping * 1000,
+            roster_length,
+            roster_offset,
+            self.__heads.get(server, -1),
+        )
+        index = self.__count
+        self.__heads[server] = index
+        self.__count += 1
+        self.__last_time = time
+        if len(self.__pending) >= self.buffer_size:
+            self.flush()
+        return index
+
+    def flush(self) -> None:
+        """Make the strings and the rosters durable, then write the pending records after them, and save the heads."""
+        for file in (self.__strings_file, self.__string_ends_file, self.__rosters_file):
+            file.flush()
+            os.fsync(file.fileno())
+        self.__records_file.write(self.__pending)
+        self.__records_file.flush()
+        os.fsync(self.__records_file.fileno())
+        self.__pending.clear()
+        tmp = self.__files.heads + ".tmp"
+        with open(tmp, "wb") as file:
+            file.write(STRING_END.pack(self.__count))
+            file.write(b"".join(HEAD.pack(server, index) for server, index in self.__heads.items()))
+        os.replace(tmp, self.__files.heads)
+
+    def close(self) -> None:
+        """Flush and close the files."""
+        self.flush()
+        for file in (self.__strings_file, self.__string_ends_file, self.__rosters_file, self.__records_file):
+            file.close()
+
+    def __string(self, text: str) -> int:
+        """Return the ID of a string, adding it to the table if needed."""
+        index = self.__strings.get(text)
+        if index is None:
+            index = self.__strings[text] = len(self.__strings)
+            self.__strings_file.write(text.encode())
+            self.__string_ends_file.write(STRING_END.pack(self.__strings_file.tell()))
+        return index
+
+
+class SAMPQuery_StoreReader:
+    """
+    Reads a store through memory maps, so only the pages of the records and
+    rosters being read are loaded. It sees the snapshots flushed before it was
+    opened, or before the last ``refresh``.
+
+    Example::
+
+        with SAMPQuery_StoreReader("history") as store:
+            for snapshot in store.history("127.0.0.1", 7777, start=time.time() - 86400):
+                print(snapshot.time, snapshot.players)
+
+    :param str path: The directory of the store
+    """
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        self.__files = _Files(path)
+        if not os.path.isdir(self.__files.path):
+            raise FileNotFoundError(f"No store at {self.__files.path}")
+        self.__maps: list[tp.Any] = []
+        self.refresh()
+
+    def __enter__(self) -> SAMPQuery_StoreReader:
+        return self
+
+    def __exit__(self, *exc_info: tp.Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def refresh(self) -> None:
+        """Map the files again, to see the snapshots flushed since."""
+        self.close()
+        files = self.__files
+        self.__records = _map(files.records)
+        self.__rosters = _map(files.rosters)
+        self.__strings = _map(files.strings)
+        self.__string_ends = _map(files.string_ends)
+        self.__maps = [self.__records, self.__rosters, self.__strings, self.__string_ends]
+        self.__count, self.__heads = _recover(
+            files,
+            self.__records,
+            len(self.__records) // RECORD.size,
+            _string_count(self.__string_ends, self.__strings),
+            self.__rosters,
+        )
+        self.__servers = {self.string(server): server for server in self.__heads}
+
+    def close(self) -> None:
+        """Unmap the files."""
+        for mapped in self.__maps:
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+        self.__maps = []
+
+    def string(self, index: int) -> str:
+        """
+        Read a string of the table.
+
+        :param int index: The ID of the string
+        :return str: The string
+        """
+        start = STRING_END.unpack_from(self.__string_ends, (index - 1) * STRING_END.size)[0] if index else 0
+        end = STRING_END.unpack_from(self.__string_ends, index * STRING_END.size)[0]
+        return self.__strings[start:end].decode()
+
+    def servers(self) -> list[str]:
+        """The ``ip:port`` of every stored server"""
+        return list(self.__servers)
+
+    def snapshot(self, index: int) -> SAMPQuery_Snapshot:
+        """
+        Read a snapshot.
+
+        :param int index: The index of its record
+        :return SAMPQuery_Snapshot: The snapshot
+        """
+        time, server, hostname, players, max_players, ping, roster_length, roster_offset, _ = (
+            RECORD.unpack_from(self.__records, index * RECORD.size)
+        )
+        return SAMPQuery_Snapshot(
+            index=index,
+            time=time,
+            server=self.string(server),
+            hostname=None if hostname == NO_STRING else self.string(hostname),
+            players=players,
+            max_players=max_players,
+            ping=None if math.isnan(ping) else ping,
+            roster_length=roster_length,
+            _reader=self,
+            _roster_offset=roster_offset,
+        )
+
+    def roster(self, offset: int, length: int) -> list[SAMPQuery_RosterEntry]:
+        """
+        Read a stored roster.
+
+        :param int offset: Where the roster starts in the rosters file
+        :param int length: The number of players
+        :return list[SAMPQuery_RosterEntry]: The players
+        """
+        return [
+            SAMPQuery_RosterEntry(self.string(name), score, ping)
+            for name, score, ping in ROSTER_ENTRY.iter_unpack(
+                self.__rosters[offset:offset + length * ROSTER_ENTRY.size]
+            )
+        ]
+
+    def between(self, start: float = -math.inf, end: float = math.inf) -> Iterator[SAMPQuery_Snapshot]:
+        """
+        Iterate over the snapshots of every server taken between two times,
+        found by bisection.
+
+        :param float start: The earliest time, included
+        :param float end: The latest time, excluded
+        :return: The snapshots, in time order
+        """
+        for index in range(self.__bisect(start), self.__bisect(end)):
+            yield self.snapshot(index)
+
+    def history(
+        self, ip: str, port: int, start: float = -math.inf, end: float = math.inf
+    ) -> Iterator[SAMPQuery_Snapshot]:
+        """
+        Iterate over the snapshots of one server taken between two times,
+        following the links between its records from the last one.
+
+        :param str ip: The IP of the server
+        :param int port: The port of the server
+        :param float start: The earliest time, included
+        :param float end: The latest time, excluded
+        :return: The snapshots, in time order
+        """
+        server = self.__servers.get(f"{ip}:{port}")
+        if server is None:
+            return
+        indexes = []
+        index = self.__heads[server]
+        while index >= 0:
+            time, *_, prev = RECORD.unpack_from(self.__records, index * RECORD.size)
+            if time < start:
+                break
+            if time < end:
+                indexes.append(index)
+            index = prev
+        for index in reversed(indexes):
+            yield self.snapshot(index)
+
+    def __bisect(self, time: float) -> int:
+        """Return the index of the first record taken at ``time`` or later."""
+        return bisect.bisect_left(
+            range(self.__count),
+            time,
+            key=lambda index: RECORD.unpack_from(self.__records, index * RECORD.size)[0],
+        )
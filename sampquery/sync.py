@@ -0,0 +1,232 @@
+"""
+This module is used to query the servers from blocking code (Flask views, Celery
+tasks...) through a trio loop running in a background thread
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import typing as tp
+
+from collections.abc import Awaitable, Callable, Iterable
+
+import trio
+
+from .client import SAMPQuery_Client
+from .registry import SAMPQuery_Registry
+from .player import SAMPQuery_PlayerColumns, SAMPQuery_PlayerList
+from .rule import SAMPQuery_RuleList
+from .server import SAMPQuery_Server
+
+T = tp.TypeVar("T")
+
+
+class SAMPQuery_LoopThread:
+    """
+    A trio loop running forever in a daemon thread, which blocking code submits
+    its queries to. The clients, and so their sockets, live in this loop
+    between the calls. The loop is started on first use, and again in a child
+    process after a fork (e.g Celery workers).
+
+    Use ``SAMPQuery_LoopThread.default()`` to share one loop in the process.
+
+    :param int maxclients: The maximum number of clients kept for ``batch``, the least recently used are closed
+    """
+
+    __default: SAMPQuery_LoopThread | None = None
+    __default_lock = threading.Lock()
+
+    def __init__(self, maxclients: int = 4096) -> None:
+        self.maxclients = maxclients
+        self.__lock = threading.Lock()
+        self.__token: trio.lowlevel.TrioToken | None = None
+        self.__stop: trio.CancelScope | None = None
+        self.__pid: int | None = None
+        self.__registry = SAMPQuery_Registry(maxclients)
+
+    @classmethod
+    def default(cls) -> SAMPQuery_LoopThread:
+        """Return the loop thread of the process."""
+        with cls.__default_lock:
+            if cls.__default is None:
+                cls.__default = cls()
+            return cls.__default
+
+    def run(self, function: Callable[..., Awaitable[T]], *args: tp.Any) -> T:
+        """
+        Run an async function in the loop and wait for its result.
+
+        :param function: The async function
+        :param args: Its arguments
+        :return: What it returned (what it raised is raised)
+        """
+        return trio.from_thread.run(function, *args, trio_token=self.__start())
+
+    def stop(self) -> None:
+        """Stop the loop and drop the clients kept for ``batch``. It is started again on next use."""
+        with self.__lock:
+            if self.__token is None or self.__pid != os.getpid():
+                return
+            stop = self.__stop
+            assert stop is not None
+            trio.from_thread.run_sync(self.__registry.close, trio_token=self.__token)
+            trio.from_thread.run_sync(stop.cancel, trio_token=self.__token)
+            self.__token = self.__stop = None
+            self.__registry = SAMPQuery_Registry(self.maxclients)
+
+    def client(self, ip: str, port: int) -> SAMPQuery_Client:
+        """
+        Return the client of a server kept by the loop, creating it if needed.
+
+        :param str ip: The IP (or hostname) of the server
+        :param int port: The port of the server
+        :return SAMPQuery_Client: The client, to use from the loop only
+        """
+        token = self.__start()
+        try:
+            inside = trio.lowlevel.current_trio_token() is token
+        except RuntimeError:
+            inside = False
+        if inside:
+            return self.__registry.client(ip, port)
+        # the registry evicts and closes clients, which only the loop may do
+        return trio.from_thread.run_sync(self.__registry.client, ip, port, trio_token=token)
+
+    def batch(
+        self,
+        targets: Iterable[tuple[str, int]],
+        query: str = "info",
+        concurrency: int = 64,
+    ) -> list[tp.Any]:
+        """
+        Query many servers concurrently and wait for every answer.
+
+        :param targets: The ``(ip, port)`` of the servers
+        :param str query: The method of SAMPQuery_Client to call (``info``, ``rules``, ``players``...)
+        :param int concurrency: The maximum number of servers queried at the same time
+        :return list: The result of every server, in the order of the targets, or the exception it raised
+        """
+        targets = list(targets)
+
+        async def run() -> list[tp.Any]:
+            results: list[tp.Any] = [None] * len(targets)
+            limiter = trio.CapacityLimiter(concurrency)
+
+            async def one(index: int, ip: str, port: int) -> None:
+                async with limiter, self.__registry.lease(ip, port) as client:
+                    try:
+                        results[index] = await getattr(client, query)()
+                    except Exception as e:  # pylint: disable=broad-exception-caught
+                        results[index] = e  # returned in place of the result, as documented
+
+            async with trio.open_nursery() as nursery:
+                for index, (ip, port) in enumerate(targets):
+                    nursery.start_soon(one, index, ip, port)
+            return results
+
+        return self.run(run)
+
+    def __start(self) -> trio.lowlevel.TrioToken:
+        """Start the loop thread if needed, and return the token to submit work to it."""
+        with self.__lock:
+            if self.__token is not None and self.__pid == os.getpid():
+                return self.__token
+            # a thread does not survive a fork, nor do the sockets of the parent's clients
+            self.__registry = SAMPQuery_Registry(self.maxclients)
+            started = threading.Event()
+
+            async def main() -> None:
+                with trio.CancelScope() as self.__stop:
+                    self.__token = trio.lowlevel.current_trio_token()
+                    started.set()
+                    await trio.sleep_forever()
+
+            threading.Thread(target=trio.run, args=(main,), name="sampquery", daemon=True).start()
+            started.wait()
+            self.__pid = os.getpid()
+            assert self.__token is not None
+            return self.__token
+
+
+class SAMPQuery_SyncClient:
+    """
+    A blocking SAMPQuery_Client. Its queries run in the loop thread, where the
+    client and its socket are kept between calls.
+
+    Example::
+
+        client = SAMPQuery_SyncClient("127.0.0.1", 7777)
+        print(client.info().name)
+
+    :param str ip: The IP of the server
+    :param int port: The port of the server
+    :param SAMPQuery_LoopThread | None loop: The loop running the queries, the loop of the process by default
+    :param options: The other fields of the SAMPQuery_Client (rcon_password, cache, columnar...)
+    """
+
+    def __init__(
+        self, ip: str, port: int, loop: SAMPQuery_LoopThread | None = None, **options: tp.Any
+    ) -> None:
+        self.loop = loop or SAMPQuery_LoopThread.default()
+        self.__options = {"ip": ip, "port": port, **options}
+        self.__client = SAMPQuery_Client(**self.__options)
+        self.__pid = os.getpid()
+
+    def __repr__(self) -> str:
+        return f"SAMPQuery_SyncClient(ip={self.client.ip!r}, port={self.client.port!r})"
+
+    @property
+    def client(self) -> SAMPQuery_Client:
+        """The async client, a new one in a child process after a fork (the socket is the parent's)"""
+        if self.__pid != os.getpid():
+            self.__client = SAMPQuery_Client(**self.__options)
+            self.__pid = os.getpid()
+        return self.__client
+
+    def info(self) -> SAMPQuery_Server:
+        """Blocking ``SAMPQuery_Client.info``"""
+        return self.loop.run(self.client.info)
+
+    def rules(self) -> SAMPQuery_RuleList:
+        """Blocking ``SAMPQuery_Client.rules``"""
+        return self.loop.run(self.client.rules)
+
+    def players(self) -> SAMPQuery_PlayerList | SAMPQuery_PlayerColumns:
+        """Blocking ``SAMPQuery_Client.players``"""
+        return self.loop.run(self.client.players)
+
+    def detailed_players(self) -> SAMPQuery_PlayerList | SAMPQuery_PlayerColumns:
+        """Blocking ``SAMPQuery_Client.detailed_players``"""
+        return self.loop.run(self.client.detailed_players)
+
+    def rcon(self, command: str) -> str:
+        """Blocking ``SAMPQuery_Client.rcon``"""
+        return self.loop.run(self.client.rcon, command)
+
+    def lagcomp(self) -> str:
+        """Blocking ``SAMPQuery_Client.lagcomp``"""
+        return self.loop.run(self.client.lagcomp)
+
+    def free_slots(self) -> int:
+        """Blocking ``SAMPQuery_Client.free_slots``"""
+        return self.loop.run(self.client.free_slots)
+
+    def ping_history(self, samples: int = 5, interval: float = 1.0) -> list[float]:
+        """Blocking ``SAMPQuery_Client.ping_history``"""
+        return self.loop.run(self.client.ping_history, samples, interval)
+
+
+def batch(
+    targets: Iterable[tuple[str, int]], query: str = "info", concurrency: int = 64
+) -> list[tp.Any]:
+    """
+    Query many servers concurrently from blocking code, in the loop of the
+    process (see ``SAMPQuery_LoopThread.batch``).
+
+    :param targets: The ``(ip, port)`` of the servers
+    :param str query: The method of SAMPQuery_Client to call (``info``, ``rules``, ``players``...)
+    :param int concurrency: The maximum number of servers queried at the same time
+    :return list: The result of every server, in the order of the targets, or the exception it raised
+    """
+    return SAMPQuery_LoopThread.default().batch(targets, query, concurrency)
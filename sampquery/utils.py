@@ -4,10 +4,16 @@ This module is used for utility functions used by the library in another modules
 
 from __future__ import annotations
 
+import socket
 import struct
-import cchardet as chdet
 import typing as tp
 
+from .decoder import SAMPQuery_Decoder
+
+
+SAMPQuery_Buffer = bytes | bytearray | memoryview
+"""Any object exposing the raw data of a packet"""
+
 
 class SAMPQuery_Utils:
     """
@@ -18,6 +24,51 @@ class SAMPQuery_Utils:
         5  # the ratio between the latency in max/min can't be higher than this
     )
 
+    PREFIX_LENGTH = 10
+    """The length of the ``SAMP`` + ip + port prefix of every packet (the opcode follows it)"""
+
+    NONCE_OPCODES = b"pox"
+    """Opcodes whose replies echo a 4 bytes nonce right after the opcode"""
+
+    @staticmethod
+    def build_prefix(ip: str, port: int) -> bytes:
+        """
+        Build the header that prefixes every query sent to (and answered by) a server
+
+        :param str ip: The IPv4 address of the server
+        :param int port: The port of the server
+        :return bytes: The 10 bytes prefix
+        """
+        return b"SAMP" + socket.inet_aton(ip) + port.to_bytes(2, "little")
+
+    @staticmethod
+    def reply_key(data: SAMPQuery_Buffer) -> bytes:
+        """
+        Return the part of a reply used to match it with its query: the prefix, the
+        opcode and, for the opcodes that carry one, the nonce.
+
+        :param SAMPQuery_Buffer data: The received datagram
+        :return bytes: The routing key of the datagram
+        """
+        size = SAMPQuery_Utils.PREFIX_LENGTH + 1
+        if data[size - 1:size] and data[size - 1] in SAMPQuery_Utils.NONCE_OPCODES:
+            size += 4
+        return bytes(data[:size])
+
+    @staticmethod
+    def is_ipv4(host: str) -> bool:
+        """
+        Check if the given host is already a dotted IPv4 address
+
+        :param str host: The host to check
+        :return bool: True if no resolution is needed
+        """
+        try:
+            socket.inet_pton(socket.AF_INET, host)
+        except OSError:
+            return False
+        return True
+
     @staticmethod
     def encode_codepage(string: str) -> bytes:
         """
@@ -53,26 +104,74 @@ class SAMPQuery_Utils:
         fmt = f"<{len_type}"
         return struct.pack(fmt, len(string)) + SAMPQuery_Utils.encode_codepage(string)
 
+    LENGTH_STRUCTS = {
+        "B": struct.Struct("<B"),
+        "H": struct.Struct("<H"),
+        "I": struct.Struct("<I"),
+    }
+    """Precompiled structs of the length prefixes of the strings"""
+
     @staticmethod
-    def unpack_string(data: bytes, len_type: str) -> tuple[str, bytes, str]:
+    def unpack_string(
+        data: bytes, len_type: str, decoder: SAMPQuery_Decoder | None = None
+    ) -> tuple[str, bytes, str]:
         """
         Unpack a string from bytes with a length prefix.
 
+        NOTE: the remaining data is a copy, prefer ``unpack_string_from`` to parse a whole packet
+
         :param bytes data: The data to unpack.
         :param str len_type: The format specifier for the length prefix.
+        :param decoder: The decoder of the server the data comes from.
+        :type decoder: SAMPQuery_Decoder | None
         :return: The unpacked string, the remaining data, and the detected
                 encoding.
         :rtype: tuple[str, bytes]
         """
-        format = f"<{len_type}"
-        size = struct.calcsize(format)
-        str_len, data = (
-            *struct.unpack_from(format, data),
-            data[size:],
-        )  # we get the length and the rest of the data as a tuple :)
-        string, data = data[:str_len], data[str_len:]
-        encoding = chdet.detect(string)["encoding"] or "ascii"
-        return string.decode(encoding), data, encoding
+        string, offset, encoding = SAMPQuery_Utils.unpack_string_from(data, 0, len_type, decoder)
+        return string, data[offset:], encoding
+
+    @staticmethod
+    def unpack_raw_string_from(
+        data: SAMPQuery_Buffer, offset: int, len_type: str
+    ) -> tuple[SAMPQuery_Buffer, int]:
+        """
+        Unpack a length-prefixed string found at ``offset`` without decoding it.
+
+        :param SAMPQuery_Buffer data: The data to unpack, preferably a memoryview
+        :param int offset: The offset of the length prefix
+        :param str len_type: The format specifier for the length prefix
+        :return tuple[SAMPQuery_Buffer, int]: The raw string (a view if ``data`` is a memoryview) and the offset right after it
+        :raises ValueError: If the string exceeds the data
+        """
+        length = SAMPQuery_Utils.LENGTH_STRUCTS[len_type]
+        start = offset + length.size
+        end = start + length.unpack_from(data, offset)[0]
+        if end > len(data):
+            raise ValueError("String data exceeds buffer length.")
+        return data[start:end], end
+
+    @staticmethod
+    def unpack_string_from(
+        data: SAMPQuery_Buffer,
+        offset: int,
+        len_type: str,
+        decoder: SAMPQuery_Decoder | None = None,
+    ) -> tuple[str, int, str]:
+        """
+        Unpack a length-prefixed string found at ``offset``, without copying the rest of the data.
+
+        :param SAMPQuery_Buffer data: The data to unpack, preferably a memoryview
+        :param int offset: The offset of the length prefix
+        :param str len_type: The format specifier for the length prefix
+        :param decoder: The decoder of the server the data comes from
+        :type decoder: SAMPQuery_Decoder | None
+        :return tuple[str, int, str]: The unpacked string, the offset right after it and the encoding used
+        :raises ValueError: If the string exceeds the data
+        """
+        string, end = SAMPQuery_Utils.unpack_raw_string_from(data, offset, len_type)
+        text, encoding = (decoder or SAMPQuery_Decoder()).decode(string)
+        return text, end, encoding
 
     @staticmethod
     def unpack_string_with_offset(data: bytes, offset: int, length_format: str) -> tuple[str, int]:
@@ -94,6 +193,84 @@ class SAMPQuery_Utils:
         offset += length
         return string, offset
 
+class SAMPQuery_LazyText:
+    """
+    Mixin of the result dataclasses whose text fields can be decoded on first
+    access. Instances built by ``with_raw_texts`` keep the raw texts; each one
+    is decoded the first time it is read, then stored as a regular attribute.
+    Subclasses compute their other derived fields in ``_derive``.
+    """
+
+    _raw_texts: tuple[SAMPQuery_Decoder, dict[str, SAMPQuery_Buffer]]
+    """The decoder and the texts not decoded yet, only on the instances built by ``with_raw_texts``"""
+
+    @classmethod
+    def with_raw_texts(
+        cls: type[L],
+        decoder: SAMPQuery_Decoder,
+        texts: dict[str, SAMPQuery_Buffer],
+        **fields: tp.Any,
+    ) -> L:
+        """
+        Create an instance whose ``texts`` fields are decoded on first access.
+
+        :param SAMPQuery_Decoder decoder: The decoder of the server the texts come from
+        :param texts: The raw value of the text fields
+        :type texts: dict[str, SAMPQuery_Buffer]
+        :param fields: The value of the other fields
+        :return: The instance
+        """
+        instance = cls.__new__(cls)
+        for name, value in fields.items():  # one by one, so the instances share their dict keys
+            setattr(instance, name, value)
+        instance._raw_texts = (decoder, texts)
+        return instance
+
+    def _encoding_of(self, name: str) -> str:
+        """
+        Return the encoding used to decode a text field.
+
+        :param str name: The name of the field
+        :return str: The encoding, decoding the field if needed
+        """
+        getattr(self, name)
+        return tp.cast(str, self.__dict__.get("_encodings", {}).get(name, "ascii"))
+
+    def _derive(self, name: str) -> tp.Any:
+        """
+        Compute a field that depends on the raw texts (e.g an encoding).
+
+        :param str name: The name of the field
+        :raises AttributeError: If there is no such field
+        """
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    def __getstate__(self) -> dict[str, tp.Any]:
+        # the raw texts may be views of the packet, which can't be pickled nor copied
+        raw_texts = self.__dict__.get("_raw_texts")
+        if raw_texts is not None:
+            for name in list(raw_texts[1]):
+                getattr(self, name)
+        return self.__dict__
+
+    def __getattr__(self, name: str) -> tp.Any:
+        # only called for the attributes not set yet
+        raw_texts = self.__dict__.get("_raw_texts")
+        if raw_texts is None or name not in raw_texts[1]:
+            if raw_texts is None or name.startswith("__"):
+                raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+            value = self._derive(name)
+        else:
+            decoder, texts = raw_texts
+            value, encoding = decoder.decode(texts.pop(name))
+            self.__dict__.setdefault("_encodings", {})[name] = encoding
+        self.__dict__[name] = value
+        return value
+
+
+L = tp.TypeVar("L", bound=SAMPQuery_LazyText)
+
+
 class SAMPQuery_Constants:
     """
     This class is used for constants used by the library in another modules
@@ -0,0 +1,131 @@
+"""
+This module is used to turn the successive replies of a server into change events
+"""
+
+from __future__ import annotations
+
+import typing as tp
+
+from dataclasses import dataclass, field
+
+from .decoder import SAMPQuery_Decoder
+from .player import SAMPQuery_PlayerColumns
+from .rule import SAMPQuery_RuleList
+from .server import SAMPQuery_Server
+from .utils import SAMPQuery_Buffer
+
+SAMPQuery_EventKind = tp.Literal["join", "leave", "score", "ping", "info", "rule"]
+"""What changed: a player joined or left, its score or ping, a field of the info, a rule"""
+
+
+@dataclass
+class SAMPQuery_Event:
+    """
+    A change on a server
+
+    :param SAMPQuery_EventKind kind: What changed
+    :param key: The ``(player_id, name)`` of the player, the info field (``name``, ``gamemode``...) or the rule name
+    :param old: The previous value (None for a join or a new rule)
+    :param new: The current value (None for a leave or a removed rule)
+    """
+
+    kind: SAMPQuery_EventKind
+    key: tp.Any
+    old: tp.Any = None
+    new: tp.Any = None
+
+
+PlayerKey = tuple[int, bytes]
+"""A player, by ID and raw name"""
+
+INFO_FIELDS = ("name", "gamemode", "language", "password", "players", "max_players")
+
+
+@dataclass
+class SAMPQuery_Watcher:
+    """
+    Keeps the last snapshot of each reply of a server and diffs the next ones
+    against it. A reply identical to the previous one is not even parsed, and
+    only the names of the players that changed are decoded.
+
+    :param SAMPQuery_Decoder decoder: The decoder of the server
+    :param bool initial: Report the first snapshot as changes (every player joins, every field and rule is set)
+    """
+
+    decoder: SAMPQuery_Decoder = field(default_factory=SAMPQuery_Decoder)
+    initial: bool = False
+    __raw: dict[bytes, bytes] = field(default_factory=dict, repr=False)
+    __players: dict[PlayerKey, tuple[int, int]] | None = field(default=None, repr=False)
+    __info: dict[str, tp.Any] | None = field(default=None, repr=False)
+    __rules: dict[str, str] | None = field(default=None, repr=False)
+
+    def update(self, opcode: bytes, data: SAMPQuery_Buffer) -> list[SAMPQuery_Event]:
+        """
+        Account a new reply of the server.
+
+        :param bytes opcode: The query answered, ``i``, ``r`` or ``d``
+        :param SAMPQuery_Buffer data: The reply, without its header
+        :return list[SAMPQuery_Event]: What changed since the previous reply to the same query
+        """
+        if self.__raw.get(opcode) == data:
+            return []
+        data = self.__raw[opcode] = bytes(data)  # not a view, which would pin the receive buffer
+        if opcode == b"d":
+            return self.__update_players(SAMPQuery_PlayerColumns.from_detailed_data(data, self.decoder))
+        if opcode == b"i":
+            server = SAMPQuery_Server.from_data(data, self.decoder)
+            info = {name: getattr(server, name) for name in INFO_FIELDS}
+            old, self.__info = self.__info, info
+            return self.__diff("info", old, info)
+        if opcode == b"r":
+            rules = {rule.name: rule.value for rule in SAMPQuery_RuleList.from_data(data, self.decoder).rules}
+            old, self.__rules = self.__rules, rules
+            return self.__diff("rule", old, rules)
+        raise ValueError(f"Can not watch the {opcode!r} query")
+
+    def __update_players(self, columns: SAMPQuery_PlayerColumns) -> list[SAMPQuery_Event]:
+        players: dict[PlayerKey, tuple[int, int]] = {}
+        indexes: dict[PlayerKey, int] = {}
+        names, offsets = columns.names, columns.offsets
+        for index in range(len(columns)):
+            key = (columns.ids[index], names[offsets[index]:offsets[index + 1]])
+            players[key] = (columns.scores[index], columns.pings[index])
+            indexes[key] = index
+        old, self.__players = self.__players, players
+        if old is None:
+            if not self.initial:
+                return []
+            old = {}
+        events = []
+        for key, (score, ping) in players.items():
+            before = old.get(key)
+            if before == (score, ping):
+                continue
+            player = (key[0], columns.name(indexes[key]))
+            if before is None:
+                events.append(SAMPQuery_Event("join", player, None, (score, ping)))
+                continue
+            if before[0] != score:
+                events.append(SAMPQuery_Event("score", player, before[0], score))
+            if before[1] != ping:
+                events.append(SAMPQuery_Event("ping", player, before[1], ping))
+        for key, before in old.items():
+            if key not in players:
+                player = (key[0], self.decoder.decode(key[1])[0])
+                events.append(SAMPQuery_Event("leave", player, before, None))
+        return events
+
+    def __diff(
+        self, kind: SAMPQuery_EventKind, old: dict[str, tp.Any] | None, new: dict[str, tp.Any]
+    ) -> list[SAMPQuery_Event]:
+        if old is None:
+            if not self.initial:
+                return []
+            old = {}
+        events = [
+            SAMPQuery_Event(kind, key, old.get(key), value)
+            for key, value in new.items()
+            if old.get(key) != value
+        ]
+        events.extend(SAMPQuery_Event(kind, key, value, None) for key, value in old.items() if key not in new)
+        return events
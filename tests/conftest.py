@@ -0,0 +1,24 @@
+import socket
+
+import pytest
+
+
+def _free_ports(count):
+    sockets = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for _ in range(count)]
+    try:
+        for sock in sockets:
+            sock.bind(("127.0.0.1", 0))
+        return [sock.getsockname()[1] for sock in sockets]
+    finally:
+        for sock in sockets:
+            sock.close()
+
+
+@pytest.fixture
+def free_port():
+    return _free_ports(1)[0]
+
+
+@pytest.fixture
+def free_ports():
+    return _free_ports
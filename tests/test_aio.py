@@ -0,0 +1,110 @@
+import asyncio
+import threading
+
+import pytest
+import trio
+
+from sampquery.aio import SAMPQuery_AsyncioClient
+from sampquery.emulator import SAMPQuery_Emulator, SAMPQuery_VirtualServer
+from sampquery.exceptions import SAMPQuery_InvalidRCON, SAMPQuery_TooManyPlayers
+from sampquery.retry import SAMPQuery_RetryPolicy
+
+
+@pytest.fixture
+def serve(free_port):
+    """Run the emulator of one server in a trio loop of its own, the tests run asyncio."""
+    stops = []
+
+    def start(server):
+        emulator = SAMPQuery_Emulator({free_port: server})
+        started = threading.Event()
+
+        async def main():
+            async with trio.open_nursery() as nursery:
+                await nursery.start(emulator.run)
+                stops.append((trio.lowlevel.current_trio_token(), nursery.cancel_scope.cancel))
+                started.set()
+
+        thread = threading.Thread(target=trio.run, args=(main,))
+        thread.start()
+        started.wait()
+        stops[-1] += (thread,)
+        return free_port
+
+    yield start
+    for token, cancel, thread in stops:
+        trio.from_thread.run_sync(cancel, trio_token=token)
+        thread.join()
+
+
+def test_queries_share_the_endpoint(serve):
+    server = SAMPQuery_VirtualServer(name="Asyncio", players=[("Alice", 5, 20)], rules={"mapname": "LS"})
+    port = serve(server)
+
+    async def main():
+        async with SAMPQuery_AsyncioClient("127.0.0.1", port) as client:
+            info, rules, players = await asyncio.gather(
+                client.info(), client.rules(), client.detailed_players()
+            )
+            ping = await client.ping()
+        return info, rules, players, ping
+
+    info, rules, players, ping = asyncio.run(main())
+    assert info.name == "Asyncio" and info.players == 1
+    assert rules.get("mapname").value == "LS"
+    assert [(p.name, p.score, p.ping) for p in players] == [("Alice", 5, 20)]
+    assert ping > 0
+
+
+def test_hostname_is_kept(serve):
+    port = serve(SAMPQuery_VirtualServer())
+
+    async def main():
+        client = SAMPQuery_AsyncioClient("localhost", port)
+        await client.info()
+        client.close()
+        await client.info()
+        client.close()
+        return client
+
+    client = asyncio.run(main())
+    assert client.ip == "localhost" and client.address == "127.0.0.1"
+
+
+def test_rcon_ends_after_an_idle_gap(serve):
+    port = serve(SAMPQuery_VirtualServer(rcon_password="secret"))
+
+    async def main():
+        async with SAMPQuery_AsyncioClient("127.0.0.1", port, rcon_password="secret") as client:
+            await client.ping()
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            output = await client.rcon("echo hello")
+            elapsed = loop.time() - start
+            client.rcon_password = "wrong"
+            with pytest.raises(SAMPQuery_InvalidRCON):
+                await client.rcon("echo hello")
+        return output, elapsed, client.rtt.timeout
+
+    output, elapsed, timeout = asyncio.run(main())
+    assert output == "hello"
+    assert elapsed < 0.15 < timeout
+
+
+def test_player_list_errors(serve, free_ports):
+    server = SAMPQuery_VirtualServer(players=[(f"p{i}", 0, 0) for i in range(150)], list_limit=100)
+    port = serve(server)
+    silent = free_ports(1)[0]
+    retry = SAMPQuery_RetryPolicy(attempts=1, deadline=0.2)
+
+    async def main():
+        async with SAMPQuery_AsyncioClient("127.0.0.1", port, retry=retry) as client:
+            with pytest.raises(SAMPQuery_TooManyPlayers):
+                await client.players()
+            with pytest.raises(SAMPQuery_TooManyPlayers):
+                await client.detailed_players()
+        async with SAMPQuery_AsyncioClient("127.0.0.1", silent, retry=retry) as client:
+            with pytest.raises(TimeoutError, match="player list"):
+                await client.players()
+
+    asyncio.run(main())
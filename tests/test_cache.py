@@ -0,0 +1,51 @@
+import trio
+
+from sampquery.cache import SAMPQuery_Cache
+
+
+def test_error_is_copied_for_every_waiter():
+    cache = SAMPQuery_Cache()
+    errors = []
+
+    async def fetch():
+        await trio.sleep(0.01)
+        raise TimeoutError("no reply")
+
+    async def caller():
+        try:
+            await cache.get(("127.0.0.1", 7777, b"i"), fetch)
+        except TimeoutError as e:
+            errors.append(e)
+
+    async def main():
+        async with trio.open_nursery() as nursery:
+            for _ in range(3):
+                nursery.start_soon(caller)
+
+    trio.run(main)
+    assert len(errors) == 3
+    assert len({id(e) for e in errors}) == 3
+    assert all(str(e) == "no reply" for e in errors)
+    # the copies do not chain into each other
+    assert all(e.__context__ is None or e.__context__ not in errors for e in errors)
+
+
+def test_stale_entry_of_a_dead_client_is_dropped():
+    cache = SAMPQuery_Cache(ttls={b"i": 0.0}, stale_while_revalidate=60.0)
+    key = ("127.0.0.1", 7777, b"i")
+    fetches = []
+
+    async def fetch():
+        fetches.append(1)
+        return "info"
+
+    async def main():
+        assert await cache.get(key, fetch, lambda: True) == "info"
+        await trio.sleep(0.01)
+        # stale, served while the refresh is skipped
+        assert await cache.get(key, fetch, lambda: False) == "info"
+        await trio.sleep(0.01)
+
+    trio.run(main)
+    assert fetches == [1]
+    assert len(cache) == 0
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+import trio
+
+from sampquery import cli
+from sampquery.emulator import SAMPQuery_Emulator, SAMPQuery_VirtualServer
+
+
+def test_parser_defaults():
+    args = cli.build_parser().parse_args(["scan", "servers.txt", "-o", "ir", "--pps", "100"])
+    assert (args.command, args.input, args.opcodes, args.pps) == ("scan", "servers.txt", "ir", 100.0)
+    assert (args.concurrency, args.timeout, args.only_ok) == (256, 5.0, False)
+    args = cli.build_parser().parse_args(["serve", "-p", "0"])
+    assert (args.port, args.deadline, args.max_targets) == (0, 5.0, 1000)
+
+
+@pytest.mark.parametrize("argv", [
+    ["scan", "-o", "ix"],
+    ["scan", "-o", ""],
+    ["scan", "--concurrency", "0"],
+    ["serve", "--deadline", "0"],
+])
+def test_invalid_arguments(argv):
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main(argv)
+    assert exit_info.value.code == 2
+
+
+def test_read_targets_skips_invalid_lines(tmp_path, capsys):
+    path = tmp_path / "servers.txt"
+    path.write_text("# fleet\n127.0.0.1:7777\n\nexample.com\n127.0.0.1:99999\n")
+    summary = cli.ScanSummary()
+
+    async def main():
+        return [target async for target in cli.read_targets(str(path), summary)]
+
+    assert trio.run(main) == [("127.0.0.1", 7777), ("example.com", 7777)]
+    assert summary.skipped == 1
+    assert "99999" in capsys.readouterr().err
+
+
+def test_scan_writes_one_line_per_server(free_ports, tmp_path, capsys):
+    alive, dead = free_ports(2)
+    emulator = SAMPQuery_Emulator({alive: SAMPQuery_VirtualServer(name="Alive")})
+    path = tmp_path / "servers.txt"
+    path.write_text(f"127.0.0.1:{alive}\n127.0.0.1:{dead}\n")
+    args = cli.build_parser().parse_args(["scan", str(path), "-o", "i", "-t", "0.2"])
+
+    async def main():
+        async with trio.open_nursery() as nursery:
+            await nursery.start(emulator.run)
+            code = await cli.scan(args)
+            nursery.cancel_scope.cancel()
+        return code
+
+    assert trio.run(main) == 0
+    out, err = capsys.readouterr()
+    lines = {line["port"]: line for line in map(json.loads, out.splitlines())}
+    assert lines[alive]["ok"] and lines[alive]["info"]["name"] == "Alive"
+    assert lines[dead]["errors"] == {"i": "timeout"}
+    assert "i: 1 timeout" in err
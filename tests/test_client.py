@@ -0,0 +1,109 @@
+import pytest
+import trio
+
+from sampquery.buffers import MAX_DATAGRAM, SAMPQuery_BufferPool
+from sampquery.cache import SAMPQuery_Cache
+from sampquery.client import SAMPQuery_Client
+from sampquery.emulator import SAMPQuery_Emulator, SAMPQuery_VirtualServer
+from sampquery.exceptions import SAMPQuery_TooManyPlayers
+from sampquery.retry import SAMPQuery_RetryPolicy
+
+
+class CountingResolver:
+    def __init__(self):
+        self.lookups = []
+
+    async def resolve(self, host):
+        self.lookups.append(host)
+        return "127.0.0.1"
+
+
+def test_hostname_is_resolved_on_every_connect(free_port):
+    emulator = SAMPQuery_Emulator({free_port: SAMPQuery_VirtualServer()})
+    resolver = CountingResolver()
+    cache = SAMPQuery_Cache()
+    client = SAMPQuery_Client("game.example", free_port, resolver=resolver, cache=cache)
+
+    async def main():
+        async with trio.open_nursery() as nursery:
+            await nursery.start(emulator.run)
+            await client.info()
+            client.close()
+            cache.invalidate()
+            await client.rules()
+            nursery.cancel_scope.cancel()
+
+    trio.run(main)
+    assert resolver.lookups == ["game.example", "game.example"]
+    assert client.ip == "game.example" and client.address == "127.0.0.1"
+    # keyed by the configured host
+    assert len(cache) == 1
+    cache.invalidate("game.example")
+    assert len(cache) == 0
+
+
+def test_dispatching_receives_on_the_client_socket(free_port):
+    emulator = SAMPQuery_Emulator({free_port: SAMPQuery_VirtualServer()})
+    client = SAMPQuery_Client("127.0.0.1", free_port)
+    results = []
+
+    async def query():
+        results.append(await client.info())
+
+    async def main():
+        async with trio.open_nursery() as nursery:
+            await nursery.start(emulator.run)
+            async with client.dispatching(), trio.open_nursery() as queries:
+                for _ in range(4):
+                    queries.start_soon(query)
+            nursery.cancel_scope.cancel()
+
+    trio.run(main)
+    assert len(results) == 4
+
+
+def test_kept_results_do_not_pin_the_receive_slabs(free_port, monkeypatch):
+    emulator = SAMPQuery_Emulator({free_port: SAMPQuery_VirtualServer()})
+    client = SAMPQuery_Client("127.0.0.1", free_port)
+    # a slab per datagram: a result holding a view of its reply would keep one each
+    pool = SAMPQuery_BufferPool(MAX_DATAGRAM, maxfree=2)
+    monkeypatch.setattr(SAMPQuery_BufferPool, "current", lambda: pool)
+    results = []
+
+    async def main():
+        async with trio.open_nursery() as nursery:
+            await nursery.start(emulator.run)
+            for _ in range(50):
+                results.append(await client.info())
+            nursery.cancel_scope.cancel()
+
+    trio.run(main)
+    assert len(results) == 50
+    assert pool.allocated <= 3
+
+
+def test_player_list_refusal_is_remembered(free_port):
+    server = SAMPQuery_VirtualServer(players=[(f"p{i}", 0, 0) for i in range(150)], list_limit=100)
+    emulator = SAMPQuery_Emulator({free_port: server})
+    retry = SAMPQuery_RetryPolicy(attempts=1, deadline=0.2)
+    client = SAMPQuery_Client("127.0.0.1", free_port, retry=retry)
+    asked = []
+
+    async def main():
+        async with trio.open_nursery() as nursery:
+            await nursery.start(emulator.run)
+            with pytest.raises(SAMPQuery_TooManyPlayers):
+                await client.players()
+            start = trio.current_time()
+            with pytest.raises(SAMPQuery_TooManyPlayers):
+                await client.detailed_players()
+            asked.append(trio.current_time() - start)
+            # asked again once the count allows it
+            del server.players[100:]
+            server.invalidate()
+            asked.append(len(await client.players()))
+            nursery.cancel_scope.cancel()
+
+    trio.run(main)
+    assert asked[0] < 0.1
+    assert asked[1] == 100
@@ -0,0 +1,47 @@
+from sampquery.decoder import SAMPQuery_Decoder
+
+CYRILLIC = "Русский ролевой сервер, добро пожаловать"
+
+
+def test_ascii_and_utf8():
+    decoder = SAMPQuery_Decoder()
+    assert decoder.decode(memoryview(b"Hello")) == ("Hello", "ascii")
+    assert decoder.decode("Café".encode()) == ("Café", "utf-8")
+    # neither is a reason to run the detection
+    assert decoder.encoding is None
+
+
+def test_fallback_on_short_texts():
+    decoder = SAMPQuery_Decoder()
+    assert decoder.decode("Привет".encode("cp1251")) == ("Привет".encode("cp1251").decode("cp1252"), "cp1252")
+    # the fallback is not remembered, a longer text may still be detected
+    assert decoder.encoding is None
+    assert decoder.decode(CYRILLIC.encode("cp1251")) == (CYRILLIC, "cp1251")
+    assert decoder.encoding == "cp1251"
+    assert decoder.decode("Привет".encode("cp1251")) == ("Привет", "cp1251")
+
+
+def test_detection_on_learned_samples():
+    decoder = SAMPQuery_Decoder()
+    decoder.learn([b"lagcomp", bytearray(CYRILLIC.encode("cp1251")), memoryview(b"0.3.7")])
+    # a short text is decoded with the charset detected on the rules
+    assert decoder.decode("Привет".encode("cp1251")) == ("Привет", "cp1251")
+    assert decoder.encoding == "cp1251"
+
+
+def test_fixed_codepage():
+    decoder = SAMPQuery_Decoder(codepage="cp1251")
+    decoder.learn([CYRILLIC.encode("cp1251")])
+    assert decoder.decode("Привет".encode("cp1251")) == ("Привет", "cp1251")
+    assert decoder.decode(b"Hi") == ("Hi", "ascii")
+    assert decoder.encoding is None
+
+
+def test_unknown_charset_falls_back(monkeypatch):
+    import sampquery.decoder
+
+    monkeypatch.setattr(sampquery.decoder.chdet, "detect", lambda sample: {"encoding": "x-unknown"})
+    decoder = SAMPQuery_Decoder(fallback="latin-1")
+    raw = CYRILLIC.encode("cp1251")
+    assert decoder.decode(raw) == (raw.decode("latin-1"), "latin-1")
+    assert decoder.encoding == "latin-1"
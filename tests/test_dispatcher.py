@@ -0,0 +1,66 @@
+import pytest
+import trio
+
+from sampquery.buffers import udp_socket
+from sampquery.dispatcher import SAMPQuery_Dispatcher
+from sampquery.utils import SAMPQuery_Utils
+
+PREFIX = SAMPQuery_Utils.build_prefix("127.0.0.1", 7777)
+
+
+@pytest.fixture
+def dispatching():
+    _socket, raw = udp_socket()
+    with raw:
+        yield SAMPQuery_Dispatcher(_socket, raw=raw)
+
+
+def test_replies_are_routed_by_key(dispatching):
+    info = dispatching.expect(PREFIX + b"i")
+    other = dispatching.expect(PREFIX + b"i")
+    ping = dispatching.expect(PREFIX + b"p" + b"\x01\x02\x03\x04")
+    # the nonce is part of the key of a ping
+    assert not dispatching.deliver(PREFIX + b"p" + b"\x09\x09\x09\x09")
+    assert dispatching.deliver(PREFIX + b"i" + b"reply")
+    # concurrent identical queries share the answer
+    assert info.data == other.data == PREFIX + b"i" + b"reply"
+    assert info.event.is_set() and not ping.event.is_set()
+    assert dispatching.deliver(PREFIX + b"p" + b"\x01\x02\x03\x04")
+    assert ping.data == PREFIX + b"p" + b"\x01\x02\x03\x04"
+    assert dispatching.discarded == 1
+
+
+def test_late_replies_are_discarded(dispatching):
+    pending = dispatching.expect(PREFIX + b"r")
+    dispatching.forget(pending)
+    assert not dispatching.deliver(PREFIX + b"r" + b"late")
+    assert pending.data is None and dispatching.discarded == 1
+
+
+def test_subscribers_get_every_datagram(dispatching):
+    key = PREFIX + b"x" + b"\x00\x00\x00\x00"
+
+    async def main():
+        with dispatching.subscribe(key, capacity=2) as channel:
+            with pytest.raises(RuntimeError):
+                with dispatching.subscribe(key):
+                    pass
+            for line in (b"one", b"two", b"dropped"):
+                dispatching.deliver(key + line)
+            assert [await channel.receive(), await channel.receive()] == [key + b"one", key + b"two"]
+        assert not dispatching.deliver(key + b"after")
+
+    trio.run(main)
+    assert dispatching.discarded == 2
+
+
+def test_query_times_out(dispatching, free_port):
+    async def main():
+        await dispatching.socket.bind(("127.0.0.1", 0))
+        async with trio.open_nursery() as nursery:
+            await nursery.start(dispatching.run)
+            with pytest.raises(TimeoutError):
+                await dispatching.query(PREFIX + b"i", PREFIX + b"i", 0.05, ("127.0.0.1", free_port))
+            nursery.cancel_scope.cancel()
+
+    trio.run(main)
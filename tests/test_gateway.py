@@ -0,0 +1,121 @@
+import json
+
+import trio
+
+from sampquery.emulator import SAMPQuery_Emulator, SAMPQuery_VirtualServer
+from sampquery.gateway import SAMPQuery_Gateway
+from sampquery.scanner import SAMPQuery_ScanResult
+
+
+async def request(port, method, path, body=b""):
+    """Send one HTTP request and return its status, headers and (de-chunked) body."""
+    stream = await trio.open_tcp_stream("127.0.0.1", port)
+    async with stream:
+        head = f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n\r\n"
+        await stream.send_all(head.encode() + body)
+        data = bytearray()
+        while chunk := await stream.receive_some(65536):
+            data += chunk
+    head, _, payload = bytes(data).partition(b"\r\n\r\n")
+    lines = head.decode().split("\r\n")
+    headers = dict(line.split(": ", 1) for line in lines[1:])
+    if headers.get("Transfer-Encoding") == "chunked":
+        body, payload = b"", payload
+        while True:
+            size, _, payload = payload.partition(b"\r\n")
+            if not int(size, 16):
+                break
+            body += payload[:int(size, 16)]
+            payload = payload[int(size, 16) + 2:]
+        payload = body
+    return int(lines[0].split()[1]), headers, payload
+
+
+def run(emulator, gateway, scenario):
+    async def main():
+        async with trio.open_nursery() as nursery:
+            await nursery.start(emulator.run)
+            listeners = await nursery.start(gateway.serve, 0)
+            await scenario(listeners[0].socket.getsockname()[1])
+            nursery.cancel_scope.cancel()
+
+    trio.run(main)
+
+
+def test_server_and_health(free_port):
+    emulator = SAMPQuery_Emulator({free_port: SAMPQuery_VirtualServer(name="Gateway")})
+    gateway = SAMPQuery_Gateway(opcodes=b"ir")
+
+    async def scenario(port):
+        status, headers, body = await request(port, "GET", "/health")
+        assert (status, json.loads(body)) == (200, {"ok": True})
+        status, headers, body = await request(port, "GET", f"/server/127.0.0.1:{free_port}?opcodes=i")
+        line = json.loads(body)
+        assert status == 200 and headers["Content-Type"] == "application/json"
+        assert line["ok"] and line["info"]["name"] == "Gateway" and "rules" not in line
+        status, _, body = await request(port, "GET", "/server/127.0.0.1:99999")
+        assert status == 400 and "port" in json.loads(body)["error"]
+        status, _, _ = await request(port, "POST", "/health")
+        assert status == 405
+
+    run(emulator, gateway, scenario)
+
+
+def test_batch_streams_ndjson(free_ports):
+    alive, other, silent = free_ports(3)
+    emulator = SAMPQuery_Emulator({
+        alive: SAMPQuery_VirtualServer(name="Alive"),
+        other: SAMPQuery_VirtualServer(name="Other"),
+    })
+    gateway = SAMPQuery_Gateway(timeout=0.2)
+    targets = [f"127.0.0.1:{port}" for port in (alive, other, silent)]
+
+    async def scenario(port):
+        status, headers, body = await request(port, "POST", "/batch", json.dumps(targets).encode())
+        assert status == 200
+        assert headers["Content-Type"] == "application/x-ndjson"
+        assert headers["Transfer-Encoding"] == "chunked"
+        lines = {line["port"]: line for line in map(json.loads, body.decode().splitlines())}
+        assert lines[alive]["info"]["name"] == "Alive" and lines[other]["info"]["name"] == "Other"
+        assert lines[silent]["errors"] == {"i": "timeout"}
+        status, _, _ = await request(port, "POST", "/batch", b"[1, 2]")
+        assert status == 400
+
+    run(emulator, gateway, scenario)
+
+
+def test_deadline(free_ports):
+    alive, silent = free_ports(2)
+    emulator = SAMPQuery_Emulator({alive: SAMPQuery_VirtualServer(latency=1.0)})
+    gateway = SAMPQuery_Gateway(timeout=2.0, deadline=5.0)
+
+    async def scenario(port):
+        start = trio.current_time()
+        status, _, body = await request(port, "GET", f"/server/127.0.0.1:{silent}?deadline=0.2")
+        assert status == 504
+        assert json.loads(body)["errors"]["i"] in ("deadline", "timeout")
+        body = json.dumps([f"127.0.0.1:{alive}"]).encode()
+        status, _, body = await request(port, "POST", "/batch?deadline=0.2", body)
+        # the slow server is reported as unanswered when the deadline expires
+        assert status == 200
+        assert json.loads(body)["errors"] == {"i": "deadline"}
+        assert trio.current_time() - start < 1.0
+
+    run(emulator, gateway, scenario)
+
+
+def test_unexpected_errors_are_answered(free_port, monkeypatch):
+    emulator = SAMPQuery_Emulator({free_port: SAMPQuery_VirtualServer()})
+    gateway = SAMPQuery_Gateway()
+
+    def broken(self):
+        raise RuntimeError("broken")
+
+    monkeypatch.setattr(SAMPQuery_ScanResult, "to_dict", broken)
+
+    async def scenario(port):
+        status, _, body = await request(port, "GET", f"/server/127.0.0.1:{free_port}")
+        assert (status, json.loads(body)) == (500, {"error": "internal error"})
+
+    run(emulator, gateway, scenario)
+    assert gateway.errors == 1
@@ -0,0 +1,84 @@
+import pytest
+
+from sampquery.metrics import SAMPQuery_Histogram, SAMPQuery_Metrics
+from sampquery.ratelimit import SAMPQuery_RateLimiter
+
+
+def test_histogram_buckets():
+    histogram = SAMPQuery_Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+    # the bounds are inclusive (le), and the buckets cumulative
+    assert list(histogram.cumulative()) == [("0.1", 2), ("1.0", 3), ("+Inf", 4)]
+    assert (histogram.sum, histogram.count) == (pytest.approx(3.65), 4)
+
+
+def test_render():
+    metrics = SAMPQuery_Metrics(latency_buckets=(0.1, 1.0), parse_buckets=(0.001,))
+    metrics.sent("127.0.0.1:7777", "i", 11)
+    metrics.sent("127.0.0.1:7777", "i", 11)
+    metrics.received("127.0.0.1:7777", "i", 40, 0.05)
+    metrics.parsed("127.0.0.1:7777", "i", 0.0005)
+    metrics.discarded("127.0.0.1:7777", 3)
+    metrics.timed_out("127.0.0.1:7777", "i", 0)
+    metrics.retried("127.0.0.1:7777", "i", 1)
+    assert metrics.render() == "\n".join([
+        "# HELP sampquery_reply_seconds Time from sending a packet to its reply",
+        "# TYPE sampquery_reply_seconds histogram",
+        'sampquery_reply_seconds_bucket{server="127.0.0.1:7777",opcode="i",le="0.1"} 1',
+        'sampquery_reply_seconds_bucket{server="127.0.0.1:7777",opcode="i",le="1.0"} 1',
+        'sampquery_reply_seconds_bucket{server="127.0.0.1:7777",opcode="i",le="+Inf"} 1',
+        'sampquery_reply_seconds_sum{server="127.0.0.1:7777",opcode="i"} 0.05',
+        'sampquery_reply_seconds_count{server="127.0.0.1:7777",opcode="i"} 1',
+        "# HELP sampquery_parse_seconds Time to parse a reply",
+        "# TYPE sampquery_parse_seconds histogram",
+        'sampquery_parse_seconds_bucket{server="127.0.0.1:7777",opcode="i",le="0.001"} 1',
+        'sampquery_parse_seconds_bucket{server="127.0.0.1:7777",opcode="i",le="+Inf"} 1',
+        'sampquery_parse_seconds_sum{server="127.0.0.1:7777",opcode="i"} 0.0005',
+        'sampquery_parse_seconds_count{server="127.0.0.1:7777",opcode="i"} 1',
+        "# HELP sampquery_sent_packets_total Packets sent, retransmissions included",
+        "# TYPE sampquery_sent_packets_total counter",
+        'sampquery_sent_packets_total{server="127.0.0.1:7777",opcode="i"} 2',
+        "# HELP sampquery_sent_bytes_total Bytes sent",
+        "# TYPE sampquery_sent_bytes_total counter",
+        'sampquery_sent_bytes_total{server="127.0.0.1:7777",opcode="i"} 22',
+        "# HELP sampquery_received_bytes_total Bytes of the replies received",
+        "# TYPE sampquery_received_bytes_total counter",
+        'sampquery_received_bytes_total{server="127.0.0.1:7777",opcode="i"} 40',
+        "# HELP sampquery_discarded_packets_total Late or mismatched packets dropped",
+        "# TYPE sampquery_discarded_packets_total counter",
+        'sampquery_discarded_packets_total{server="127.0.0.1:7777"} 3',
+        "# HELP sampquery_timeouts_total Packets left without reply in time",
+        "# TYPE sampquery_timeouts_total counter",
+        'sampquery_timeouts_total{server="127.0.0.1:7777",opcode="i"} 1',
+        "# HELP sampquery_retries_total Packets sent again",
+        "# TYPE sampquery_retries_total counter",
+        'sampquery_retries_total{server="127.0.0.1:7777",opcode="i"} 1',
+    ]) + "\n"
+
+
+def test_render_without_servers():
+    metrics = SAMPQuery_Metrics(servers=False)
+    metrics.sent("127.0.0.1:7777", "i", 11)
+    metrics.sent("127.0.0.1:7778", "i", 11)
+    metrics.discarded("127.0.0.1:7777", 1)
+    lines = metrics.render().splitlines()
+    # the servers share their series
+    assert 'sampquery_sent_packets_total{opcode="i"} 2' in lines
+    assert "sampquery_discarded_packets_total 1" in lines
+    assert not any("server=" in line for line in lines)
+
+
+def test_escaping_and_limiter():
+    limiter = SAMPQuery_RateLimiter(pps=1, burst=1)
+    limiter.reserve("10.0.0.1", 0.0)
+    limiter.reserve("10.0.0.1", 0.0)
+    metrics = SAMPQuery_Metrics(limiter=limiter)
+    metrics.discarded('we"ird\\host\n', 1)
+    lines = metrics.render().splitlines()
+    assert 'sampquery_discarded_packets_total{server="we\\"ird\\\\host\\n"} 1' in lines
+    assert "sampquery_ratelimit_packets_total 2" in lines
+    assert "sampquery_ratelimit_delayed_total 1" in lines
+    assert "sampquery_ratelimit_wait_seconds_total 1" in lines
+    assert "# TYPE sampquery_ratelimit_queued_seconds_total counter" in lines
+    assert SAMPQuery_Metrics().render() == "\n"
@@ -0,0 +1,47 @@
+import struct
+
+import pytest
+
+from sampquery.player import SAMPQuery_PlayerColumns, SAMPQuery_PlayerList
+
+
+def detailed_reply(names):
+    return struct.pack("<H", len(names)) + b"".join(
+        struct.pack("<BB", index, len(name)) + name.encode() + struct.pack("<ii", index * 10, index)
+        for index, name in enumerate(names)
+    )
+
+
+NAMES = ["Alice", "Bob", "Carol", "Dave"]
+
+
+def test_columns_negative_index_matches_list():
+    data = detailed_reply(NAMES)
+    columns = SAMPQuery_PlayerColumns.from_detailed_data(data)
+    players = SAMPQuery_PlayerList.from_detailed_data(data)
+    assert columns[-1] == players.players[-1]
+    assert columns[-1].name == "Dave"
+    assert columns[-4].name == "Alice"
+    assert columns.name(-2) == "Carol"
+
+
+def test_columns_index_out_of_range():
+    columns = SAMPQuery_PlayerColumns.from_detailed_data(detailed_reply(NAMES))
+    with pytest.raises(IndexError):
+        columns[4]
+    with pytest.raises(IndexError):
+        columns[-5]
+
+
+def test_columns_slice():
+    columns = SAMPQuery_PlayerColumns.from_detailed_data(detailed_reply(NAMES))
+    assert [player.name for player in columns[1:3]] == ["Bob", "Carol"]
+    assert [player.name for player in columns[::-2]] == ["Dave", "Bob"]
+    assert [player.score for player in columns[-2:]] == [20, 30]
+    assert len(columns[5:]) == 0
+
+
+def test_truncated_list():
+    data = detailed_reply(NAMES)
+    players = SAMPQuery_PlayerList.from_detailed_data(data[:-1])
+    assert len(players) == 3 and players.count == 4 and players.truncated
@@ -0,0 +1,68 @@
+import math
+
+import pytest
+import trio
+
+from sampquery.emulator import SAMPQuery_Emulator, SAMPQuery_VirtualServer
+from sampquery.probe import SAMPQuery_PingWindow, SAMPQuery_Prober
+
+
+def test_window_stats():
+    window = SAMPQuery_PingWindow(8)
+    sequences = [window.start() for _ in range(5)]
+    for sequence, rtt in zip(sequences, (0.03, 0.01, None, 0.02)):
+        window.finish(sequence, rtt)
+    # the last probe is still pending, and not accounted
+    stats = window.stats()
+    assert (stats.sent, stats.received, stats.loss) == (4, 3, 0.25)
+    assert (stats.min, stats.p50, stats.max) == (0.01, 0.02, 0.03)
+    assert stats.avg == pytest.approx(0.02)
+    # in the order the probes were sent: |0.01 - 0.03| and |0.02 - 0.01|
+    assert stats.jitter == pytest.approx(0.015)
+    assert SAMPQuery_PingWindow().stats().sent == 0
+    with pytest.raises(ValueError):
+        SAMPQuery_PingWindow(0)
+
+
+def test_window_ring():
+    window = SAMPQuery_PingWindow(4)
+    late = window.start()
+    for rtt in range(1, 7):
+        window.finish(window.start(), rtt / 100)
+    # the first probe left the window, its reply must not overwrite a newer one
+    window.finish(late, 1.0)
+    stats = window.stats()
+    assert (window.sent, window.received) == (7, 6)
+    assert (stats.sent, stats.min, stats.max) == (4, 0.03, 0.06)
+    window.finish(window.start(), None)
+    assert window.stats().loss == 0.25
+
+
+def test_all_lost():
+    window = SAMPQuery_PingWindow(4)
+    window.finish(window.start(), None)
+    stats = window.stats()
+    assert (stats.sent, stats.received, stats.loss, stats.avg) == (1, 0, 1.0, None)
+
+
+def test_measure(free_ports):
+    alive, silent = free_ports(2)
+    emulator = SAMPQuery_Emulator({alive: SAMPQuery_VirtualServer(latency=0.01)})
+    prober = SAMPQuery_Prober(interval=0.02, timeout=0.2, window=4)
+
+    async def main():
+        async with trio.open_nursery() as nursery:
+            await nursery.start(emulator.run)
+            results = await prober.measure([("127.0.0.1", alive), ("127.0.0.1", silent)], count=6)
+            nursery.cancel_scope.cancel()
+        return results
+
+    results = trio.run(main)
+    answered, lost = results["127.0.0.1", alive], results["127.0.0.1", silent]
+    assert (answered.sent, answered.received, answered.loss) == (4, 4, 0.0)
+    assert 0.01 <= answered.min <= answered.p95 < 0.2
+    assert (lost.sent, lost.received, lost.loss) == (4, 0, 1.0)
+    assert prober.windows["127.0.0.1", alive].sent == 6
+    assert math.isclose(prober.stats("127.0.0.1", alive).loss, 0.0)
+    with pytest.raises(KeyError):
+        prober.stats("127.0.0.1", 1)
@@ -0,0 +1,76 @@
+import pytest
+import trio
+import trio.testing
+
+from sampquery.ratelimit import SAMPQuery_RateLimiter, SAMPQuery_TokenBucket
+
+
+def test_bucket_burst_then_rate():
+    bucket = SAMPQuery_TokenBucket(rate=10, burst=3)
+    assert [bucket.reserve(100.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    # the next packets reserve the coming tokens, in order
+    assert [bucket.reserve(100.0) for _ in range(3)] == pytest.approx([0.1, 0.2, 0.3])
+    # 0.3s later the reserved tokens are paid back, and the bucket is empty
+    assert bucket.reserve(100.3) == pytest.approx(0.1)
+    # refills up to the burst only
+    assert [bucket.reserve(200.0) for _ in range(4)] == pytest.approx([0.0, 0.0, 0.0, 0.1])
+
+
+def test_bucket_validation():
+    with pytest.raises(ValueError):
+        SAMPQuery_TokenBucket(rate=0)
+    with pytest.raises(ValueError):
+        SAMPQuery_TokenBucket(rate=1, burst=0.5)
+    with pytest.raises(ValueError):
+        SAMPQuery_RateLimiter(per_ip=-1)
+    with pytest.raises(ValueError):
+        SAMPQuery_RateLimiter(inflight=0)
+
+
+def test_limiter_global_and_per_ip():
+    limiter = SAMPQuery_RateLimiter(pps=100, burst=10, per_ip=10, per_ip_burst=2)
+    assert [limiter.reserve("10.0.0.1", 50.0) for _ in range(3)] == pytest.approx([0.0, 0.0, 0.1])
+    # another IP has its own bucket, the global one still has tokens
+    assert [limiter.reserve("10.0.0.2", 50.0) for _ in range(2)] == [0.0, 0.0]
+    for index in range(5):
+        limiter.reserve(f"10.0.1.{index}", 50.0)
+    # the global bucket is now empty
+    assert limiter.reserve("10.0.0.3", 50.0) == pytest.approx(0.01)
+    stats = limiter.stats
+    assert (stats.packets, stats.delayed) == (11, 2)
+    assert stats.max_wait == pytest.approx(0.1)
+    assert stats.mean_wait == pytest.approx(0.11 / 11)
+
+
+def test_least_recent_ips_are_forgotten():
+    limiter = SAMPQuery_RateLimiter(per_ip=1, per_ip_burst=1, maxips=2)
+    limiter.reserve("a", 0.0)
+    limiter.reserve("b", 0.0)
+    assert limiter.reserve("a", 0.0) == 1.0
+    limiter.reserve("c", 0.0)
+    # "b" was evicted, and starts over with a full bucket
+    assert limiter.reserve("b", 0.0) == 0.0
+    assert limiter.reserve("a", 0.0) == 0.0
+
+
+def test_acquire_and_slots():
+    limiter = SAMPQuery_RateLimiter(per_ip=10, per_ip_burst=1, inflight=2)
+    sent = []
+
+    async def query(index):
+        async with limiter.slot():
+            await limiter.acquire("10.0.0.1")
+            sent.append((index, trio.current_time()))
+            await trio.sleep(1)
+
+    async def main():
+        async with trio.open_nursery() as nursery:
+            for index in range(4):
+                nursery.start_soon(query, index)
+
+    trio.run(main, clock=trio.testing.MockClock(autojump_threshold=0))
+    times = sorted(time for _, time in sent)
+    # two queries in flight, the second packet paced by the per IP bucket
+    assert times == pytest.approx([0.0, 0.1, 1.0, 1.1])
+    assert limiter.stats.queued == 2
+    assert limiter.stats.queued_time == pytest.approx(1.0 + 1.1)
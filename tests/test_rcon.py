@@ -0,0 +1,50 @@
+import pytest
+import trio
+
+from sampquery.client import SAMPQuery_Client
+from sampquery.decoder import SAMPQuery_Decoder
+from sampquery.emulator import SAMPQuery_Emulator, SAMPQuery_VirtualServer
+from sampquery.exceptions import SAMPQuery_InvalidReply
+from sampquery.metrics import SAMPQuery_Instrumentation
+from sampquery.rcon import parse_line
+
+
+class Recorder(SAMPQuery_Instrumentation):
+    def __init__(self):
+        self.sent_sizes = []
+        self.received_sizes = []
+
+    def sent(self, server, opcode, size):
+        if opcode == "x":
+            self.sent_sizes.append(size)
+
+    def received(self, server, opcode, size, latency):
+        if opcode == "x":
+            self.received_sizes.append(size)
+
+
+def test_rcon_counts_the_bytes_of_the_reply(free_port):
+    emulator = SAMPQuery_Emulator({free_port: SAMPQuery_VirtualServer(rcon_password="secret")})
+    recorder = Recorder()
+    client = SAMPQuery_Client("127.0.0.1", free_port, rcon_password="secret", instrumentation=recorder)
+    output = "a much longer line than the command"
+
+    async def main():
+        async with trio.open_nursery() as nursery:
+            await nursery.start(emulator.run)
+            assert await client.rcon(f"echo {output}") == output
+            async with client.rcon_session() as session:
+                assert await session.command(f"echo {output}") == output
+            nursery.cancel_scope.cancel()
+
+    trio.run(main)
+    # every reply echoes the request, then the line and its 16-bit length
+    assert recorder.received_sizes == [size + 2 + len(output) for size in recorder.sent_sizes]
+
+
+def test_parse_line_rejects_malformed_replies():
+    decoder = SAMPQuery_Decoder()
+    assert parse_line(memoryview(b"\x05\x00hello"), decoder) == "hello"
+    for data in (b"\x05\x00hello!", b"\x09\x00hello", b"\x05"):
+        with pytest.raises(SAMPQuery_InvalidReply):
+            parse_line(data, decoder)
@@ -0,0 +1,46 @@
+import trio
+
+from sampquery.emulator import SAMPQuery_Emulator, SAMPQuery_VirtualServer
+from sampquery.registry import SAMPQuery_Registry
+
+
+def test_close_outside_trio(free_port):
+    emulator = SAMPQuery_Emulator({free_port: SAMPQuery_VirtualServer()})
+    registry = SAMPQuery_Registry()
+    client = registry.client("127.0.0.1", free_port)
+
+    async def main():
+        async with trio.open_nursery() as nursery:
+            await nursery.start(emulator.run)
+            await client.info()
+            nursery.cancel_scope.cancel()
+
+    trio.run(main)
+    assert client.connected
+    registry.close()
+    assert not client.connected and len(registry) == 0
+
+
+def test_dispatching_client_is_kept_until_released(free_port):
+    emulator = SAMPQuery_Emulator({free_port: SAMPQuery_VirtualServer()})
+    registry = SAMPQuery_Registry(maxsockets=1)
+    client = registry.client("127.0.0.1", free_port)
+
+    async def main():
+        async with trio.open_nursery() as nursery:
+            await nursery.start(emulator.run)
+            async with client.dispatching():
+                registry.close()
+                assert client.connected and len(registry) == 1
+                with trio.move_on_after(0.2) as scope:
+                    async with registry.lease("127.0.0.1", free_port + 1):
+                        pass
+                # the cap still counts it
+                assert scope.cancelled_caught
+                await client.info()
+            async with registry.lease("127.0.0.1", free_port + 1):
+                assert ("127.0.0.1", free_port) not in registry
+            assert not client.connected
+            nursery.cancel_scope.cancel()
+
+    trio.run(main)
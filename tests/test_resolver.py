@@ -0,0 +1,64 @@
+import threading
+
+import pytest
+import trio
+
+from sampquery.resolver import SAMPQuery_Resolver
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    """Replace the system resolver with a slow one, counting its lookups."""
+    hosts = []
+
+    async def getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+        hosts.append(host)
+        await trio.sleep(0.1)
+        if host.endswith(".invalid"):
+            raise trio.socket.gaierror(-2, "Name or service not known")
+        return [(family, type, proto, "", ("10.0.0.1", 0))]
+
+    monkeypatch.setattr(trio.socket, "getaddrinfo", getaddrinfo)
+    return hosts
+
+
+def test_coalesced_and_cached(lookups):
+    resolver = SAMPQuery_Resolver()
+
+    async def main():
+        results = await resolver.resolve_many(["a.test", "a.test", "b.invalid", "127.0.0.1"])
+        async with trio.open_nursery() as nursery:
+            for _ in range(5):
+                nursery.start_soon(resolver.resolve, "c.test")
+        with pytest.raises(OSError):
+            await resolver.resolve("b.invalid")
+        return results
+
+    results = trio.run(main)
+    assert results["a.test"] == "10.0.0.1" and results["127.0.0.1"] == "127.0.0.1"
+    assert isinstance(results["b.invalid"], OSError)
+    assert sorted(lookups) == ["a.test", "b.invalid", "c.test"]
+    assert len(resolver) == 3
+    resolver.invalidate("a.test")
+    assert trio.run(resolver.resolve, "a.test") == "10.0.0.1"
+    assert lookups.count("a.test") == 2
+
+
+def test_shared_by_several_runs(lookups):
+    resolver = SAMPQuery_Resolver()
+    results = []
+    barrier = threading.Barrier(4)
+
+    def run():
+        barrier.wait()
+        results.append(trio.run(resolver.resolve, "shared.test"))
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # each run looks the hostname up on its own, then the address is shared
+    assert results == ["10.0.0.1"] * 4
+    assert trio.run(resolver.resolve, "shared.test") == "10.0.0.1"
+    assert 1 <= len(lookups) <= 4 and resolver.hits >= 1
@@ -0,0 +1,58 @@
+import random
+
+import pytest
+import trio
+
+from sampquery.client import SAMPQuery_Client
+from sampquery.emulator import SAMPQuery_Emulator, SAMPQuery_VirtualServer
+from sampquery.retry import SAMPQuery_RetryPolicy, SAMPQuery_RetryStats
+from sampquery.rtt import SAMPQuery_RTTEstimator
+
+
+def test_backoff_and_jitter():
+    assert list(SAMPQuery_RetryPolicy(attempts=4, jitter=0.0).timeouts(0.5)) == [0.5, 1.0, 2.0, 4.0]
+    random.seed(7)
+    timeouts = list(SAMPQuery_RetryPolicy(attempts=200, backoff=1.0, jitter=0.1).timeouts(1.0))
+    assert all(0.9 <= timeout <= 1.1 for timeout in timeouts)
+    # the attempts of many clients must not line up
+    assert len(set(timeouts)) == len(timeouts)
+    assert list(SAMPQuery_RetryPolicy(attempts=1).timeouts(1.0)) == [pytest.approx(1.0, rel=0.1)]
+
+
+@pytest.mark.parametrize("options", [
+    {"attempts": 0}, {"backoff": 0.5}, {"jitter": 1.0}, {"jitter": -0.1}, {"deadline": 0},
+])
+def test_invalid_policy(options):
+    with pytest.raises(ValueError):
+        SAMPQuery_RetryPolicy(**options)
+
+
+def test_stats():
+    stats = SAMPQuery_RetryStats(queries=10, packets=14, retried=2, failed=1)
+    assert stats.retransmissions == 4
+    assert stats.loss == pytest.approx(1 - 9 / 14)
+    assert SAMPQuery_RetryStats().loss == 0.0
+
+
+def test_retransmissions_within_deadline(free_port):
+    emulator = SAMPQuery_Emulator({free_port: SAMPQuery_VirtualServer(loss=1.0)})
+    retry = SAMPQuery_RetryPolicy(attempts=5, backoff=2.0, jitter=0.0, deadline=0.5)
+    client = SAMPQuery_Client(
+        "127.0.0.1", free_port, rtt=SAMPQuery_RTTEstimator(floor=0.1, initial=0.1), retry=retry
+    )
+
+    async def main():
+        async with trio.open_nursery() as nursery:
+            await nursery.start(emulator.run)
+            start = trio.current_time()
+            with pytest.raises(TimeoutError, match="3 attempts"):
+                await client.info()
+            # 0.1 + 0.2, then the third attempt is cut short by the deadline
+            assert 0.45 <= trio.current_time() - start < 0.7
+            client.close()
+            nursery.cancel_scope.cancel()
+
+    trio.run(main)
+    stats = client.retries[b"i"]
+    assert (stats.queries, stats.packets, stats.failed, stats.retransmissions) == (1, 3, 1, 2)
+    assert stats.loss == 1.0
@@ -0,0 +1,58 @@
+import pytest
+import trio
+
+from sampquery.client import SAMPQuery_Client
+from sampquery.emulator import SAMPQuery_Emulator, SAMPQuery_VirtualServer
+from sampquery.retry import SAMPQuery_RetryPolicy
+from sampquery.rtt import SAMPQuery_RTTEstimator
+
+
+def test_first_sample_and_smoothing():
+    rtt = SAMPQuery_RTTEstimator()
+    assert rtt.timeout == 1.0
+    rtt.update(0.2)
+    # RFC 6298 (2.2): SRTT <- R, RTTVAR <- R/2
+    assert (rtt.srtt, rtt.rttvar, rtt.samples) == (0.2, 0.1, 1)
+    assert rtt.timeout == pytest.approx(0.6)
+    rtt.update(0.4)
+    # RFC 6298 (2.3): RTTVAR is updated with the previous SRTT, then SRTT
+    assert rtt.rttvar == pytest.approx(3 / 4 * 0.1 + 1 / 4 * 0.2)
+    assert rtt.srtt == pytest.approx(7 / 8 * 0.2 + 1 / 8 * 0.4)
+    assert rtt.timeout == pytest.approx(rtt.srtt + 4 * rtt.rttvar)
+
+
+def test_timeout_bounds():
+    rtt = SAMPQuery_RTTEstimator(floor=0.5, ceiling=2.0, initial=0.1)
+    assert rtt.timeout == 0.5
+    for _ in range(20):
+        rtt.update(0.001)
+    assert rtt.timeout == 0.5
+    rtt.update(30.0)
+    assert rtt.timeout == 2.0
+    with pytest.raises(ValueError):
+        SAMPQuery_RTTEstimator(floor=0)
+    with pytest.raises(ValueError):
+        SAMPQuery_RTTEstimator(floor=3.0, ceiling=2.0)
+
+
+def test_karn_rule(free_port):
+    # the reply to the first packet arrives while the retransmission waits
+    emulator = SAMPQuery_Emulator({free_port: SAMPQuery_VirtualServer(latency=0.25)})
+    rtt = SAMPQuery_RTTEstimator(floor=0.1, initial=0.1)
+    retry = SAMPQuery_RetryPolicy(attempts=3, jitter=0.0)
+    client = SAMPQuery_Client("127.0.0.1", free_port, rtt=rtt, retry=retry)
+
+    async def main():
+        async with trio.open_nursery() as nursery:
+            await nursery.start(emulator.run)
+            await client.info()
+            # the round trip is ambiguous, so it is not measured
+            assert rtt.samples == 0 and client.retries[b"i"].retried == 1
+            rtt.initial = 1.0
+            await client.rules()
+            assert rtt.samples == 1 and rtt.srtt == pytest.approx(0.25, abs=0.1)
+            assert client.retries[b"r"].retried == 0
+            client.close()
+            nursery.cancel_scope.cancel()
+
+    trio.run(main)
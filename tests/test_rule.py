@@ -0,0 +1,27 @@
+import struct
+
+from sampquery.rule import SAMPQuery_Rule, SAMPQuery_RuleList
+
+
+def reply(rules):
+    data = struct.pack("<H", len(rules))
+    for name, value in rules:
+        data += bytes([len(name)]) + name + bytes([len(value)]) + value
+    return data
+
+
+def test_texts_are_decoded_on_first_access():
+    rules = SAMPQuery_RuleList.from_data(reply([(b"version", b"0.3.7"), (b"weburl", b"caf\xe9.com")]))
+    assert not any({"name", "value"} & vars(rule).keys() for rule in rules.rules)
+    weburl = rules.get("weburl")
+    # building the index decodes the names only
+    assert all("name" in vars(rule) and "value" not in vars(rule) for rule in rules.rules)
+    assert weburl.value == "café.com"
+    assert "value" not in vars(rules.rules[0])
+    assert rules.get("missing") is None
+
+
+def test_rule_from_data():
+    rule, rest = SAMPQuery_Rule.from_data(reply([(b"mapname", b"San Andreas")])[2:] + b"tail")
+    assert (rule.name, rule.value, rule.encoding) == ("mapname", "San Andreas", "ascii")
+    assert rest == b"tail"
@@ -0,0 +1,67 @@
+import pytest
+import trio
+
+from sampquery.emulator import SAMPQuery_Emulator, SAMPQuery_VirtualServer
+from sampquery.scanner import SAMPQuery_Scanner, parse_target
+
+
+def scan(emulator, scanner, targets):
+    results = []
+
+    async def main():
+        async with trio.open_nursery() as nursery:
+            await nursery.start(emulator.run)
+            async with scanner.scan(targets) as channel:
+                async for result in channel:
+                    results.append(result)
+            nursery.cancel_scope.cancel()
+
+    trio.run(main)
+    return {(result.ip, result.port): result for result in results}
+
+
+def test_parse_target():
+    assert parse_target("127.0.0.1:7778") == ("127.0.0.1", 7778)
+    assert parse_target("  example.com  # a comment") == ("example.com", 7777)
+    assert parse_target("[::1]:7777") == ("::1", 7777)
+    assert parse_target("# only a comment") is None
+    with pytest.raises(ValueError):
+        parse_target("127.0.0.1:70000")
+
+
+def test_fan_out_over_shared_sockets(free_ports):
+    ports = free_ports(20)
+    emulator = SAMPQuery_Emulator({
+        port: SAMPQuery_VirtualServer(name=f"Server {port}", players=[("Alice", 1, 10)])
+        for port in ports
+    })
+    scanner = SAMPQuery_Scanner(opcodes=b"ird", concurrency=8, timeout=1.0, sockets=2)
+    results = scan(emulator, scanner, [("127.0.0.1", port) for port in ports])
+    assert sorted(results) == [("127.0.0.1", port) for port in sorted(ports)]
+    for (_, port), result in results.items():
+        assert result.ok, result.errors
+        # every reply was routed back to the server it came from
+        assert result.info.name == f"Server {port}"
+        assert [player.name for player in result.detailed_players] == ["Alice"]
+        assert result.rules is not None
+    assert emulator.received == 3 * len(ports)
+
+
+def test_errors_are_reported_per_target(free_ports):
+    alive, dead = free_ports(2)
+    emulator = SAMPQuery_Emulator({alive: SAMPQuery_VirtualServer()})
+    scanner = SAMPQuery_Scanner(opcodes=b"ir", timeout=0.2)
+    results = scan(emulator, scanner, [("127.0.0.1", alive), ("127.0.0.1", dead)])
+    assert results[("127.0.0.1", alive)].ok
+    assert results[("127.0.0.1", dead)].errors == {"i": "timeout", "r": "timeout"}
+    assert results[("127.0.0.1", dead)].to_dict()["ok"] is False
+
+
+def test_refused_player_lists(free_port):
+    server = SAMPQuery_VirtualServer(players=[(f"p{i}", 0, 0) for i in range(150)], list_limit=100)
+    emulator = SAMPQuery_Emulator({free_port: server})
+    scanner = SAMPQuery_Scanner(opcodes=b"icd", timeout=0.2)
+    result = scan(emulator, scanner, [("127.0.0.1", free_port)])[("127.0.0.1", free_port)]
+    assert result.info.players == 150
+    assert result.players is None and result.detailed_players is None
+    assert result.errors == {"c": "refused: 150 players", "d": "refused: 150 players"}
@@ -0,0 +1,71 @@
+import os
+
+from sampquery.store import RECORD, SAMPQuery_StoreReader, SAMPQuery_StoreWriter
+
+
+class Info:
+    def __init__(self, name, players=1, max_players=100):
+        self.name, self.players, self.max_players = name, players, max_players
+
+
+class Player:
+    def __init__(self, name, score=0, ping=0):
+        self.name, self.score, self.ping = name, score, ping
+
+
+def fill(path, count, start=0):
+    with SAMPQuery_StoreWriter(path) as store:
+        for index in range(start, start + count):
+            store.append("127.0.0.1", 7777 + index, info=Info(f"host {index}"),
+                         players=[Player(f"player {index}")], time=index)
+
+
+def test_pending_records_are_invisible_until_flush(tmp_path):
+    fill(tmp_path, 2)
+    store = SAMPQuery_StoreWriter(tmp_path)
+    store.append("127.0.0.1", 9999, info=Info("pending"), time=10)
+    with SAMPQuery_StoreReader(tmp_path) as reader:
+        assert len(reader) == 2
+    store.flush()
+    with SAMPQuery_StoreReader(tmp_path) as reader:
+        assert len(reader) == 3
+        assert reader.snapshot(2).hostname == "pending"
+    store.close()
+
+
+def test_torn_write_is_recovered(tmp_path):
+    fill(tmp_path, 3)
+    # a crash of an older writer: records on disk, the end of the string table lost
+    size = os.path.getsize(tmp_path / "strings.idx")
+    with open(tmp_path / "strings.idx", "r+b") as file:
+        file.truncate(size - 8 * 3)  # the strings of the last snapshot
+    with open(tmp_path / "records.bin", "ab") as file:
+        file.write(b"\x00" * (RECORD.size // 2))  # and a partial record
+
+    with SAMPQuery_StoreReader(tmp_path) as reader:
+        assert len(reader) == 2
+        assert [s.hostname for s in reader.between()] == ["host 0", "host 1"]
+        assert [p.name for p in reader.snapshot(1).roster] == ["player 1"]
+
+    fill(tmp_path, 2, start=5)
+    with SAMPQuery_StoreReader(tmp_path) as reader:
+        assert [(s.server, s.hostname) for s in reader.between()] == [
+            ("127.0.0.1:7777", "host 0"),
+            ("127.0.0.1:7778", "host 1"),
+            ("127.0.0.1:7782", "host 5"),
+            ("127.0.0.1:7783", "host 6"),
+        ]
+        assert [p.name for p in reader.snapshot(3).roster] == ["player 6"]
+        assert [s.hostname for s in reader.history("127.0.0.1", 7779)] == []
+
+
+def test_lost_string_index_drops_every_record(tmp_path):
+    fill(tmp_path, 3)
+    with open(tmp_path / "strings.idx", "r+b") as file:
+        file.truncate(0)
+    with SAMPQuery_StoreReader(tmp_path) as reader:
+        assert len(reader) == 0 and reader.servers() == []
+    fill(tmp_path, 1, start=7)
+    with SAMPQuery_StoreReader(tmp_path) as reader:
+        assert [s.hostname for s in reader.between()] == ["host 7"]
+        assert [p.name for p in reader.snapshot(0).roster] == ["player 7"]
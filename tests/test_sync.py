@@ -0,0 +1,30 @@
+import threading
+
+import trio
+
+from sampquery.sync import SAMPQuery_LoopThread
+
+
+def test_client_is_looked_up_on_the_loop_thread():
+    loop = SAMPQuery_LoopThread(maxclients=2)
+    try:
+        loop.run(trio.sleep, 0)  # the registry is made when the loop starts
+        threads = []
+        registry = loop._SAMPQuery_LoopThread__registry
+        lookup = registry.client
+
+        def client(host, port):
+            threads.append(threading.current_thread().name)
+            return lookup(host, port)
+
+        registry.client = client
+        first = loop.client("127.0.0.1", 7777)
+        assert loop.client("127.0.0.1", 7777) is first
+        assert threads == ["sampquery", "sampquery"]
+
+        async def inside():
+            return loop.client("127.0.0.1", 7777)
+
+        assert loop.run(inside) is first
+    finally:
+        loop.stop()
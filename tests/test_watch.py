@@ -0,0 +1,68 @@
+import pytest
+
+from sampquery.emulator import SAMPQuery_VirtualServer
+from sampquery.watch import SAMPQuery_Event, SAMPQuery_Watcher
+
+PACKET = b"SAMP\x7f\x00\x00\x01\x61\x1e"
+
+
+def reply(server, opcode):
+    """The reply of a virtual server to a query, without its header."""
+    server.invalidate()
+    (data,) = server.answer(PACKET + opcode)
+    return memoryview(data)[len(PACKET) + 1:]
+
+
+def test_player_events():
+    server = SAMPQuery_VirtualServer(players=[("Alice", 10, 50), ("Bob", 0, 80)])
+    watcher = SAMPQuery_Watcher()
+    assert watcher.update(b"d", reply(server, b"d")) == []
+    server.players = [("Alice", 12, 50), ("Bob", 0, 95), ("Carl", 0, 30)]
+    events = watcher.update(b"d", reply(server, b"d"))
+    assert events == [
+        SAMPQuery_Event("score", (0, "Alice"), 10, 12),
+        SAMPQuery_Event("ping", (1, "Bob"), 80, 95),
+        SAMPQuery_Event("join", (2, "Carl"), None, (0, 30)),
+    ]
+    # the same ID with another name is another player
+    server.players = [("Alice", 12, 50), ("Dave", 0, 95)]
+    events = watcher.update(b"d", reply(server, b"d"))
+    assert events == [
+        SAMPQuery_Event("join", (1, "Dave"), None, (0, 95)),
+        SAMPQuery_Event("leave", (1, "Bob"), (0, 95), None),
+        SAMPQuery_Event("leave", (2, "Carl"), (0, 30), None),
+    ]
+
+
+def test_identical_replies_are_skipped():
+    server = SAMPQuery_VirtualServer(players=[("Alice", 10, 50)])
+    watcher = SAMPQuery_Watcher(initial=True)
+    assert watcher.update(b"d", reply(server, b"d")) == [SAMPQuery_Event("join", (0, "Alice"), None, (10, 50))]
+    assert watcher.update(b"d", reply(server, b"d")) == []
+
+
+def test_info_and_rule_events():
+    server = SAMPQuery_VirtualServer(name="Before")
+    watcher = SAMPQuery_Watcher()
+    assert watcher.update(b"i", reply(server, b"i")) == []
+    assert watcher.update(b"r", reply(server, b"r")) == []
+    server.name, server.players = "After", [("Alice", 0, 0)]
+    assert watcher.update(b"i", reply(server, b"i")) == [
+        SAMPQuery_Event("info", "name", "Before", "After"),
+        SAMPQuery_Event("info", "players", 0, 1),
+    ]
+    server.rules = {**server.rules, "weather": "3", "weburl": "sa-mp.com"}
+    del server.rules["lagcomp"]
+    assert watcher.update(b"r", reply(server, b"r")) == [
+        SAMPQuery_Event("rule", "weather", "10", "3"),
+        SAMPQuery_Event("rule", "weburl", None, "sa-mp.com"),
+        SAMPQuery_Event("rule", "lagcomp", "On", None),
+    ]
+
+
+def test_initial_snapshot():
+    server = SAMPQuery_VirtualServer(rules={"version": "0.3.7"})
+    watcher = SAMPQuery_Watcher(initial=True)
+    assert watcher.update(b"r", reply(server, b"r")) == [SAMPQuery_Event("rule", "version", None, "0.3.7")]
+    with pytest.raises(ValueError):
+        watcher.update(b"c", reply(server, b"c"))